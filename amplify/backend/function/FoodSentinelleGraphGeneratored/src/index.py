@@ -1,172 +1,493 @@
 import boto3
-import re
-import uuid
-import io
-from collections import defaultdict, Counter
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 
 import pygal
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from pygal.style import DefaultStyle
 
-# Initialisation des clients AWS
+# Copie de src/word_stats.py (statistiques de mots partagées avec src/representation.py)
+from word_stats import (
+    SENTIMENT_MAP, S3PartialStore, WordPartial, decode_partial, encode_partial, render_within_budget, select_words,
+    update_partials
+)
+
+# Rendus et uploads concurrents (threads : pas de /dev/shm sur Lambda pour un pool de processus)
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", "8"))
+
+# Initialisation des clients AWS (client S3 partagé par les threads, un pool de connexions assez large)
 dynamodb = boto3.resource("dynamodb", region_name="eu-west-3")
 reviews_table = dynamodb.Table("Reviews")
-s3_client = boto3.client("s3")
+s3_client = boto3.client("s3", config=Config(max_pool_connections=max(10, CHART_WORKERS * 2)))
 
 CHARTS_BUCKET = "foodsentinelle-charts-2025"
 
-SENTIMENT_MAP = {
-    "POSITIVE": 1.0,
-    "NEGATIVE": -1.0,
-    "NEUTRAL": 0.0
-}
+# Partiels par jour de scoring + manifest (watermark) : chaque exécution ne lit
+# que les reviews scorées depuis la précédente
+PARTIALS_PREFIX = "partials/word_stats/"
+SCORED_DAY_INDEX = "ScoredDayIndex"
+REVIEW_PROJECTION = "#t, sentiment, sentiment_version, scored_at, previous_scored_at, restaurant_id, rating"
+
+# Un rebuild lit la table en REBUILD_SEGMENTS segments de scan et s'arrête entre deux
+# segments REBUILD_MARGIN_MS avant le timeout (écriture des partiels et des graphiques) ;
+# l'exécution suivante le reprend. Un segment doit se lire en bien moins que la marge.
+REBUILD_SEGMENTS = int(os.environ.get("REBUILD_SEGMENTS", "64"))
+REBUILD_MARGIN_MS = int(os.environ.get("REBUILD_MARGIN_MS", "12000"))
 
-def nettoyer_texte(texte):
-    texte = texte.lower()
-    # Retirer les caractères spéciaux
-    texte = re.sub(r"[^a-z0-9àâçéèêëîïôûùüÿñæœ\s]", " ", texte)
-    return texte.strip()
+# Graphiques adressés par contenu : la clé dérive des données d'entrée, et
+# charts/latest/<nom>.json pointe vers la version courante (un seul GET côté API).
+# À incrémenter quand le rendu change, pour invalider les graphiques existants.
+CHART_RENDER_VERSION = 2
 
-def lire_data_reviews():
-    response = reviews_table.scan()
-    return response.get("Items", [])
+# Nuage de points borné : top-K mots hors mots vides, grille de densité optionnelle
+# pour les autres (cases par axe, 0 = aucune) et taille maximale du SVG en octets
+SCATTER_TOP_K = int(os.environ.get("SCATTER_TOP_K", "200"))
+SCATTER_TAIL_BINS = int(os.environ.get("SCATTER_TAIL_BINS", "0"))
+CHART_MAX_BYTES = int(os.environ.get("CHART_MAX_BYTES", str(512 * 1024)))
 
-def construire_nuage_points_mots(items):
+# Histogrammes par restaurant : seulement les plus commentés, pour borner le nombre de graphiques
+RESTAURANT_CHARTS_MAX = int(os.environ.get("RESTAURANT_CHARTS_MAX", "100"))
+LATEST_PREFIX = "charts/latest/"
+
+def scan_filtre(filtre, valeurs, segment=None):
+    kwargs = {
+        "ProjectionExpression": REVIEW_PROJECTION,
+        "FilterExpression": filtre,
+        "ExpressionAttributeNames": {"#t": "text"},
+        "ExpressionAttributeValues": valeurs
+    }
+    if segment is not None:
+        kwargs["Segment"], kwargs["TotalSegments"] = segment
+    while True:
+        response = reviews_table.scan(**kwargs)
+        yield from response.get("Items", [])
+        if not response.get("LastEvaluatedKey"):
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def jours_entre(debut, fin):
+    jour = datetime.strptime(debut[:10], "%Y-%m-%d")
+    while jour.strftime("%Y-%m-%d") <= fin[:10]:
+        yield jour.strftime("%Y-%m-%d")
+        jour += timedelta(days=1)
+
+def lire_reviews_scorees(depuis, jusqu_a, version=None, segment=None):
     """
-    Construit un nuage de points (SVG) : fréquence d'apparition des mots (X)
-    vs sentiment moyen (Y). Les fichiers sont ensuite chargés sur S3.
+    Reviews labellisées avec depuis < scored_at <= jusqu_a (depuis=None : toutes,
+    du segment de scan (numéro, nombre) donné). En incrémental, une requête par
+    jour sur l'index ScoredDayIndex ; scan filtré si l'index n'existe pas.
     """
-    word_freq = Counter()
-    word_sent_sum = defaultdict(float)
-    word_sent_count = Counter()
-
-    for it in items:
-        text = it.get("text", "")
-        sentiment_label = it.get("sentiment")
-        if not text or not sentiment_label:
-            continue
-        score = SENTIMENT_MAP.get(sentiment_label, 0.0)
-
-        txt_clean = nettoyer_texte(text)
-        words = txt_clean.split()
-        for w in words:
-            word_freq[w] += 1
-            word_sent_sum[w] += score
-            word_sent_count[w] += 1
-
-    # Préparation des données
-    xy_values = []
-    labels = []
-
-    for w, freq in word_freq.items():
-        if freq < 2:
-            continue
-        nb_sent = word_sent_count[w]
-        if nb_sent == 0:
-            continue
-        avg_sent = word_sent_sum[w] / nb_sent
-        xy_values.append((freq, avg_sent))
-        labels.append(w)
-
-    if not xy_values:
-        print("Aucun mot à représenter dans le nuage de points.")
-        return None
-
-    # Création d'un graphique XY avec Pygal
-    xy_chart = pygal.XY(
-        stroke=False,  # Pas de ligne reliant les points
-        title="Nuage de points : fréquence vs sentiment moyen",
-        x_title="Fréquence (nb occurrences)",
-        y_title="Sentiment moyen (-1=négatif, +1=positif)",
-        style=DefaultStyle
-    )
+    valeurs = {":b": jusqu_a}
+    filtre_version = ""
+    if version is not None:
+        filtre_version = " AND sentiment_version = :v"
+        valeurs[":v"] = version
+    if depuis is None:
+        yield from scan_filtre("attribute_exists(sentiment) AND (attribute_not_exists(scored_at) OR scored_at <= :b)" + filtre_version,
+                               valeurs, segment)
+        return
+    valeurs[":a"] = depuis
+    try:
+        for jour in jours_entre(depuis, jusqu_a):
+            kwargs = {
+                "IndexName": SCORED_DAY_INDEX,
+                "KeyConditionExpression": "scored_day = :d AND scored_at BETWEEN :a AND :b",
+                "ProjectionExpression": REVIEW_PROJECTION,
+                "ExpressionAttributeNames": {"#t": "text"},
+                "ExpressionAttributeValues": dict(valeurs, **{":d": jour})
+            }
+            if version is not None:
+                kwargs["FilterExpression"] = "sentiment_version = :v"
+            while True:
+                response = reviews_table.query(**kwargs)
+                # BETWEEN inclut la borne basse, déjà comptée à l'exécution précédente
+                yield from (it for it in response.get("Items", []) if it.get("scored_at") != depuis)
+                if not response.get("LastEvaluatedKey"):
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ValidationException":
+            raise
+        print(f"[!] Index {SCORED_DAY_INDEX} indisponible, scan filtré à la place.")
+        yield from scan_filtre("scored_at > :a AND scored_at <= :b" + filtre_version, valeurs)
 
-    # On ajoute une seule série de points
-    points = []
-    for i, (x, y) in enumerate(xy_values):
-        points.append({
-            'value': (x, y),
-            'label': labels[i]
-        })
-    xy_chart.add("Mots", points)
+def empreinte_graphique(nom, donnees):
+    payload = json.dumps([nom, CHART_RENDER_VERSION, donnees], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
 
-    # Rendu en SVG (objet bytes)
-    svg_data = xy_chart.render()
+def lire_latest(nom):
+    try:
+        response = s3_client.get_object(Bucket=CHARTS_BUCKET, Key=f"{LATEST_PREFIX}{nom}.json")
+    except s3_client.exceptions.NoSuchKey:
+        return {}
+    return json.loads(response["Body"].read())
 
-    scatter_key = f"charts/nuage_points_freq_sent_{uuid.uuid4()}.svg"
+def objet_existe(key):
+    try:
+        s3_client.head_object(Bucket=CHARTS_BUCKET, Key=key)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
 
-    # Upload sur S3 (pas besoin de .encode(), svg_data est déjà en bytes)
+def publier_graphique(nom, donnees, rendre, content_type="image/svg+xml"):
+    """
+    Publie le graphique `nom` sous charts/<nom>_<empreinte des données>.svg.
+    `rendre()` n'est appelé (puis uploadé) que si cette version n'existe pas déjà.
+    Le pointeur latest garde aussi la version précédente (URLs présignées encore
+    valides) ; l'avant-dernière est supprimée. Renvoie (clé, rendu ou non).
+    """
+    key = f"charts/{nom}_{empreinte_graphique(nom, donnees)}.svg"
+    latest = lire_latest(nom)
+    if latest.get("key") == key:
+        return key, False
+    rendu = not objet_existe(key)
+    if rendu:
+        s3_client.put_object(Bucket=CHARTS_BUCKET, Key=key, Body=rendre(), ContentType=content_type)
     s3_client.put_object(
         Bucket=CHARTS_BUCKET,
-        Key=scatter_key,
-        Body=svg_data,
-        ContentType="image/svg+xml"
+        Key=f"{LATEST_PREFIX}{nom}.json",
+        Body=json.dumps({
+            "key": key,
+            "previous": latest.get("key"),
+            "content_type": content_type,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }),
+        ContentType="application/json",
+        CacheControl="no-cache"
     )
+    obsolete = latest.get("previous")
+    if obsolete and obsolete not in (key, latest.get("key")):
+        s3_client.delete_object(Bucket=CHARTS_BUCKET, Key=obsolete)
+    return key, rendu
 
-    return scatter_key
+# ------------------------------
+# Jobs de graphiques
+# ------------------------------
+# Accumulateurs : états fusionnables (interface de WordPartial) alimentés par la
+# même passe sur les reviews ; chaque job lit l'état total d'un accumulateur.
+ACCUMULATEURS = {}
+CHART_JOBS = []
 
-def construire_histogramme_sentiments(items):
+def accumulateur(nom):
+    def enregistrer(cls):
+        ACCUMULATEURS[nom] = cls
+        return cls
+    return enregistrer
+
+def chart_job(nom, etat):
     """
-    Construit un histogramme (SVG) montrant la répartition des sentiments.
+    Enregistre un constructeur de graphiques : `construire(etat)` reçoit l'état
+    total de l'accumulateur `etat` et renvoie [(nom du graphique, données, rendre)].
+    Le rendu et l'upload se font ensuite en parallèle (executer_jobs).
     """
-    sentiments = []
-    for it in items:
-        s = it.get("sentiment")
-        if s in ("POSITIVE", "NEGATIVE", "NEUTRAL"):
-            sentiments.append(s)
+    def enregistrer(construire):
+        CHART_JOBS.append((nom, etat, construire))
+        return construire
+    return enregistrer
 
-    if not sentiments:
-        print("Aucun sentiment trouvé, histogramme impossible.")
-        return None
+accumulateur("mots")(WordPartial)
+
+class Compteurs:
+    """
+    Nombre de reviews par clé (tuple), `cle(item)` renvoyant None pour ignorer
+    l'item. Les comptes s'additionnent : l'état est fusionnable.
+    """
+    cle = None
+
+    def __init__(self):
+        self.comptes = Counter()
+
+    @classmethod
+    def partial_kind(cls):
+        return f"{cls.__name__}-1"
+
+    def add_items(self, items):
+        for it in items:
+            cle = self.cle(it)
+            if cle is not None:
+                self.comptes[cle] += 1
+        return self
+
+    def merge(self, other):
+        self.comptes.update(other.comptes)
+        return self
+
+    def to_payload(self):
+        return [list(cle) + [n] for cle, n in self.comptes.items()]
+
+    @classmethod
+    def from_payload(cls, payload):
+        compteurs = cls()
+        compteurs.comptes = Counter({tuple(ligne[:-1]): ligne[-1] for ligne in payload})
+        return compteurs
+
+def _cle_restaurant(it):
+    if it.get("restaurant_id") and it.get("sentiment") in SENTIMENT_MAP:
+        return (it["restaurant_id"], it["sentiment"])
+    return None
+
+def _cle_note(it):
+    if it.get("rating") is not None and it.get("sentiment") in SENTIMENT_MAP:
+        return (int(it["rating"]), it["sentiment"])
+    return None
+
+@accumulateur("restaurants")
+class SentimentsParRestaurant(Compteurs):
+    cle = staticmethod(_cle_restaurant)
+
+@accumulateur("notes")
+class SentimentsParNote(Compteurs):
+    cle = staticmethod(_cle_note)
+
+class ChartPartial:
+    """
+    Partiel composite passé à update_partials : un état par accumulateur utilisé
+    par les jobs enregistrés. Ajouter un accumulateur change partial_kind, ce
+    qui reconstruit les partiels une fois.
+    """
+
+    def __init__(self, etats=None):
+        self.etats = etats or {nom: ACCUMULATEURS[nom]() for nom in self.noms()}
+        self.reviews = 0
+
+    @staticmethod
+    def noms():
+        return sorted({etat for _, etat, _ in CHART_JOBS})
+
+    @classmethod
+    def partial_kind(cls):
+        return "charts:" + ",".join(f"{nom}={ACCUMULATEURS[nom].partial_kind()}" for nom in cls.noms())
 
-    c = Counter(sentiments)
-    labels = list(c.keys())
-    values = list(c.values())
+    def add_items(self, items):
+        items = [it for it in items if it.get("sentiment")]
+        for etat in self.etats.values():
+            etat.add_items(items)
+        self.reviews += len(items)
+        return self
 
-    # Création d'un graphique à barres
+    def merge(self, other):
+        for nom, etat in self.etats.items():
+            etat.merge(other.etats[nom])
+        self.reviews += other.reviews
+        return self
+
+    def to_bytes(self):
+        return encode_partial({"reviews": self.reviews, "etats": {nom: e.to_payload() for nom, e in self.etats.items()}})
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = decode_partial(data)
+        partiel = cls({nom: ACCUMULATEURS[nom].from_payload(payload["etats"][nom]) for nom in cls.noms()})
+        partiel.reviews = payload["reviews"]
+        return partiel
+
+def executer_jobs(partiel, workers=CHART_WORKERS):
+    """
+    Construit les graphiques de tous les jobs à partir du partiel total, puis les
+    rend et les publie en parallèle (client S3 partagé). Renvoie
+    ({nom: (clé, rendu ou non)}, {nom: erreur}).
+    """
+    graphiques = []
+    erreurs = {}
+    for nom, etat, construire in CHART_JOBS:
+        try:
+            graphiques.extend(construire(partiel.etats[etat]) or [])
+        except Exception as e:
+            erreurs[nom] = f"{e.__class__.__name__}: {e}"
+    resultats = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="chart") as executor:
+        futures = {executor.submit(publier_graphique, nom, donnees, rendre): nom for nom, donnees, rendre in graphiques}
+        for future in as_completed(futures):
+            nom = futures[future]
+            try:
+                resultats[nom] = future.result()
+            except Exception as e:
+                erreurs[nom] = f"{e.__class__.__name__}: {e}"
+    return resultats, erreurs
+
+@chart_job("nuage_points", "mots")
+def construire_nuage_points_mots(partiel):
+    """
+    Construit un nuage de points (SVG) : fréquence d'apparition des mots (X)
+    vs sentiment moyen (Y). Les fichiers sont ensuite chargés sur S3.
+    Seuls les SCATTER_TOP_K mots les plus fréquents (hors mots vides) sont
+    tracés, les autres éventuellement résumés par une grille de densité : la
+    taille du SVG ne dépend plus du nombre d'avis.
+    """
+    selection = select_words(partiel, k=SCATTER_TOP_K, tail_bins=SCATTER_TAIL_BINS)
+    if not len(selection.top):
+        print("Aucun mot à représenter dans le nuage de points.")
+        return []
+
+    # Données exactes du rendu : elles déterminent la clé S3 du graphique
+    donnees = {
+        "mots": selection.top.top(len(selection.top)),
+        "densite": selection.tail,
+        "max_bytes": CHART_MAX_BYTES
+    }
+
+    def dessiner(sel):
+        # Création d'un graphique XY avec Pygal
+        xy_chart = pygal.XY(
+            stroke=False,  # Pas de ligne reliant les points
+            title="Nuage de points : fréquence vs sentiment moyen",
+            x_title="Fréquence (nb occurrences)",
+            y_title="Sentiment moyen (-1=négatif, +1=positif)",
+            style=DefaultStyle
+        )
+
+        # Une série pour les mots retenus, une pour la densité des autres (taille = nb de mots)
+        xy_chart.add("Mots", [{'value': (x, y), 'label': w} for w, x, y in sel.top.top(len(sel.top))])
+        if sel.tail:
+            xy_chart.add("Autres mots (densité)", [
+                {'value': (x, y), 'label': f"{n} mots", 'node': {'r': 2 + n ** 0.5}}
+                for x, y, n in sel.tail
+            ])
+
+        # Rendu en SVG (objet bytes, pas besoin de .encode() pour l'upload)
+        return xy_chart.render()
+
+    def rendre():
+        svg_data, dessinee = render_within_budget(dessiner, selection, CHART_MAX_BYTES)
+        if len(dessinee.top) < len(selection.top) or len(dessinee.tail) < len(selection.tail):
+            print(f"[!] Nuage de points réduit à {len(dessinee.top)} mots pour tenir dans {CHART_MAX_BYTES} octets.")
+        return svg_data
+
+    return [("nuage_points_freq_sent", donnees, rendre)]
+
+def histogramme_svg(titre, labels, values):
+    # Création d'un graphique à barres, rendu en SVG (déjà en bytes)
     bar_chart = pygal.Bar(
-        title="Répartition des sentiments",
+        title=titre,
         x_title="Sentiment",
         y_title="Nombre d'avis",
         style=DefaultStyle
     )
     bar_chart.x_labels = labels
     bar_chart.add("Sentiments", values)
+    return bar_chart.render()
 
-    svg_data = bar_chart.render()
-    histo_key = f"charts/sentiment_hist_{uuid.uuid4()}.svg"
+@chart_job("histogramme", "mots")
+def construire_histogramme_sentiments(partiel):
+    """
+    Construit un histogramme (SVG) montrant la répartition des sentiments.
+    """
+    c = partiel.labels
+    if not c:
+        print("Aucun sentiment trouvé, histogramme impossible.")
+        return []
 
-    s3_client.put_object(
-        Bucket=CHARTS_BUCKET,
-        Key=histo_key,
-        Body=svg_data,  # Déjà en bytes
-        ContentType="image/svg+xml"
-    )
+    # Ordre fixe des labels : mêmes comptes => même clé S3
+    labels = [label for label in SENTIMENT_MAP if c.get(label)]
+    values = [c[label] for label in labels]
 
-    return histo_key
+    return [("sentiment_hist", [labels, values], lambda: histogramme_svg("Répartition des sentiments", labels, values))]
 
-def handler(event, context):
+@chart_job("histogrammes_restaurants", "restaurants")
+def construire_histogrammes_restaurants(compteurs):
     """
-    Fonction Lambda qui :
-    1. Récupère tous les reviews depuis DynamoDB.
-    2. Construit un nuage de points (SVG) : fréquence vs sentiment moyen.
-    3. Construit un histogramme (SVG) : répartition des sentiments.
-    4. Upload des fichiers SVG vers S3.
+    Un histogramme des sentiments par restaurant (les RESTAURANT_CHARTS_MAX plus
+    commentés), publié sous charts/restaurants/<restaurant_id>/sentiment_hist_<empreinte>.svg.
+    """
+    par_restaurant = {}
+    for (restaurant_id, label), n in compteurs.comptes.items():
+        par_restaurant.setdefault(restaurant_id, Counter())[label] += n
+    retenus = sorted(par_restaurant, key=lambda r: (-sum(par_restaurant[r].values()), r))[:RESTAURANT_CHARTS_MAX]
+    graphiques = []
+    for restaurant_id in retenus:
+        c = par_restaurant[restaurant_id]
+        labels = [label for label in SENTIMENT_MAP if c.get(label)]
+        values = [c[label] for label in labels]
+        titre = f"Répartition des sentiments - {restaurant_id}"
+        graphiques.append((
+            f"restaurants/{restaurant_id}/sentiment_hist",
+            [labels, values],
+            lambda titre=titre, labels=labels, values=values: histogramme_svg(titre, labels, values)
+        ))
+    return graphiques
+
+@chart_job("note_vs_sentiment", "notes")
+def construire_note_vs_sentiment(compteurs):
     """
-    items = lire_data_reviews()
-    print(f"{len(items)} avis récupérés depuis la table Reviews.")
+    Barres empilées : pour chaque note Yelp (1 à 5), le nombre d'avis de chaque sentiment.
+    """
+    if not compteurs.comptes:
+        return []
+    notes = sorted({note for note, _ in compteurs.comptes})
+    series = [[label, [compteurs.comptes.get((note, label), 0) for note in notes]] for label in SENTIMENT_MAP]
+
+    def rendre():
+        chart = pygal.StackedBar(
+            title="Note vs sentiment",
+            x_title="Note (étoiles)",
+            y_title="Nombre d'avis",
+            style=DefaultStyle
+        )
+        chart.x_labels = [str(note) for note in notes]
+        for label, values in series:
+            chart.add(label, values)
+        return chart.render()
 
-    scatter_key = construire_nuage_points_mots(items)
-    if scatter_key:
-        print(f"[OK] Nuage de points généré et uploadé sur S3 : {scatter_key}")
+    return [("rating_vs_sentiment", [notes, series], rendre)]
 
-    histo_key = construire_histogramme_sentiments(items)
-    if histo_key:
-        print(f"[OK] Histogramme généré et uploadé sur S3 : {histo_key}")
+def handler(event, context):
+    """
+    Fonction Lambda qui :
+    1. Intègre aux partiels S3 les reviews scorées depuis la dernière exécution,
+       en une seule passe qui alimente tous les accumulateurs
+       (event {"rebuild": true} pour tout relire). Un rebuild s'étale sur
+       plusieurs exécutions ; sans partiels lisibles entre-temps, pas de graphiques.
+    2. Construit les graphiques des jobs enregistrés : nuage de points, histogramme
+       des sentiments, histogrammes par restaurant, note vs sentiment.
+    3. Les rend et les upload en SVG sur S3 en parallèle, sauf ceux dont les données
+       n'ont pas changé, et met à jour les pointeurs charts/latest/<nom>.json.
+    """
+    event = event or {}
+    store = S3PartialStore(s3_client, CHARTS_BUCKET, PARTIALS_PREFIX)
+    deadline = None
+    if context is not None:
+        deadline = time.monotonic() + (context.get_remaining_time_in_millis() - REBUILD_MARGIN_MS) / 1000
+    partiel, rapport = update_partials(store, lire_reviews_scorees, rebuild=bool(event.get("rebuild", False)),
+                                       partial_type=ChartPartial, deadline=deadline, rebuild_segments=REBUILD_SEGMENTS)
+    if rapport["rebuild_progress"]:
+        print(f"Reconstruction des partiels en cours : {rapport['rebuild_progress']} segments lus.")
+        if partiel is None:
+            return {
+                "statusCode": 202,
+                "body": "Reconstruction des partiels en cours, graphiques à la prochaine exécution.",
+                "rebuild_progress": rapport["rebuild_progress"]
+            }
+    else:
+        print(f"{rapport['new_reviews']} nouveaux avis intégrés ({rapport['since']} -> {rapport['until']}), "
+              f"{rapport['total_reviews']} au total, version {rapport['version']}, "
+              f"jours recomptés : {rapport['recounted_days'] or 'aucun'}.")
 
-    print("Terminé.")
+    resultats, erreurs = executer_jobs(partiel)
+    rendus = sum(1 for _, rendu in resultats.values() if rendu)
+    for nom in ("nuage_points_freq_sent", "sentiment_hist", "rating_vs_sentiment"):
+        if nom in resultats:
+            key, rendu = resultats[nom]
+            etat = "généré et uploadé sur S3" if rendu else "inchangé (déjà sur S3)"
+            print(f"[OK] {nom} {etat} : {key}")
+    for nom, erreur in erreurs.items():
+        print(f"[!] {nom} en échec : {erreur}")
+    print(f"Terminé : {len(resultats)} graphiques, {rendus} générés, {len(resultats) - rendus} inchangés, "
+          f"{len(erreurs)} en échec.")
     return {
-        "statusCode": 200,
-        "body": "Graphiques (SVG) générés et uploadés sur S3."
+        "statusCode": 200 if not erreurs else 500,
+        "body": "Graphiques (SVG) générés et uploadés sur S3.",
+        "charts": {nom: key for nom, (key, _) in resultats.items()},
+        "rendered": rendus,
+        "failed": erreurs,
+        "rebuild_progress": rapport["rebuild_progress"]
     }
 
 if __name__ == "__main__":
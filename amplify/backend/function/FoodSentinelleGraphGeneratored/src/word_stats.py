@@ -0,0 +1,594 @@
+# Word statistics shared by the chart generators. NumPy only and no src imports:
+# the FoodSentinelleGraphGeneratored Lambda ships an identical copy next to its index.py.
+import gzip
+import json
+import os
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+SENTIMENT_MAP = {
+    "POSITIVE": 1.0,
+    "NEGATIVE": -1.0,
+    "NEUTRAL": 0.0
+}
+
+PARTIALS_FORMAT = 1
+# Reviews scored less than this long ago are left for the next run, so writes
+# still in flight when the watermark moves are never skipped.
+SAFETY_LAG_SECONDS = 300
+# A rebuild reads the table in this many scan segments and can stop between two
+# of them (deadline), so it spreads over several runs when the table is large.
+REBUILD_SEGMENTS = 32
+
+# Scatter plot defaults: words drawn individually, and cells of the optional
+# density grid (per axis) that summarises the rest of the vocabulary.
+DEFAULT_TOP_K = 200
+DEFAULT_TAIL_BINS = 0
+
+# Stop-words in cleaned form: apostrophes become spaces, so "c'est" is "c" + "est".
+STOP_WORDS = frozenset("""
+a à au aux avec ce ces cet cette c ça ci d dans de des du elle elles en et eu
+il ils j je l la le les leur leurs lui m ma mais me même mes moi mon n ne ni nos
+notre nous on ou où par pas pour qu que qui s sa se ses si son sur t ta te tes
+toi ton tu un une vos votre vous y été être est sont suis es était étaient ai as
+avons avez ont avait fait faire très trop plus moins bien tout tous toute toutes
+aussi alors donc car comme quand encore déjà là ici cela ceci chez sans sous
+entre vers peu puis rien avoir
+i me my we our you your he him his she her it its they them their what which
+who this that these those am is are was were be been being have has had do
+does did doing an the and but if or because as until while of at by for with
+about against between into through during before after above below to from up
+down in out on off over under again further then once here there when where
+why how all any both each few more most other some such no nor not only own
+same so than too very s t can will just don should now ve ll re d m o didn
+doesn isn wasn weren won wouldn couldn would could also get got
+""".split())
+
+KEPT_CHARACTERS = "abcdefghijklmnopqrstuvwxyz0123456789àâçéèêëîïôûùüÿñæœ"
+
+class _CleaningTable(dict):
+    # str.translate table: kept letters and whitespace map to themselves, anything
+    # else to a space. Filled lazily, one lookup per distinct code point.
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        value = codepoint if char in KEPT_CHARACTERS or char.isspace() else 32
+        self[codepoint] = value
+        return value
+
+CLEANING_TABLE = _CleaningTable()
+
+def _byte_rule(byte):
+    # ASCII is lowercased and cleaned in the same pass; UTF-8 bytes of accented
+    # letters are left alone and handled per distinct token afterwards.
+    if byte >= 0x80:
+        return byte
+    char = chr(byte).lower()
+    if char.isspace():
+        return 32
+    return ord(char) if char in KEPT_CHARACTERS else 32
+
+BYTE_CLEANING_TABLE = bytes(_byte_rule(b) for b in range(256))
+
+def clean_text(text):
+    return text.lower().translate(CLEANING_TABLE).strip()
+
+def count_tokens(texts):
+    """
+    Counter of the cleaned words of `texts`. The joined texts go through one
+    bytes.translate (CPython's fast path) and one split; only the few distinct
+    tokens holding non-ASCII characters are re-cleaned as str.
+    """
+    raw = Counter("\n".join(texts).encode("utf-8").translate(BYTE_CLEANING_TABLE).split())
+    counts = Counter()
+    for token, n in raw.items():
+        if token.isascii():
+            counts[token.decode("ascii")] += n
+        else:
+            for word in token.decode("utf-8").lower().translate(CLEANING_TABLE).split():
+                counts[word] += n
+    return counts
+
+class WordStats:
+    """
+    Per-word occurrence count and mean review sentiment, as parallel arrays
+    sorted by decreasing frequency.
+    """
+
+    def __init__(self, words, freq, sentiment_sum):
+        order = np.lexsort((np.arange(len(words)), -freq)) if len(words) else np.arange(0)
+        self.words = [words[i] for i in order]
+        self.freq = freq[order]
+        self.mean_sentiment = sentiment_sum[order] / np.maximum(self.freq, 1)
+
+    def __len__(self):
+        return len(self.words)
+
+    def top(self, n):
+        return list(zip(self.words[:n], self.freq[:n].tolist(), self.mean_sentiment[:n].tolist()))
+
+    def head(self, n):
+        head = WordStats.__new__(WordStats)
+        head.words = self.words[:n]
+        head.freq = self.freq[:n]
+        head.mean_sentiment = self.mean_sentiment[:n]
+        return head
+
+def encode_partial(payload):
+    # Compact and deterministic (gzip mtime=0): same partial, same bytes.
+    return gzip.compress(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), mtime=0)
+
+def decode_partial(data):
+    return json.loads(gzip.decompress(data))
+
+class WordPartial:
+    """
+    Mergeable aggregate of a set of reviews: per-word frequency and sentiment
+    sum (columnar NumPy arrays indexed through `vocabulary`) plus label counts.
+    Partials of disjoint review sets add up exactly, so they can be stored per
+    day and folded together later.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.freq = np.zeros(0, dtype=np.int64)
+        self.sentiment_sum = np.zeros(0, dtype=np.float64)
+        self.labels = Counter()
+        self.reviews = 0
+
+    def _indexes(self, words):
+        vocabulary = self.vocabulary
+        index = np.fromiter((vocabulary.setdefault(w, len(vocabulary)) for w in words), dtype=np.int64, count=len(words))
+        grow = len(vocabulary) - len(self.freq)
+        if grow > 0:
+            self.freq = np.concatenate([self.freq, np.zeros(grow, dtype=np.int64)])
+            self.sentiment_sum = np.concatenate([self.sentiment_sum, np.zeros(grow, dtype=np.float64)])
+        return index
+
+    def add_items(self, items, sentiment_map=SENTIMENT_MAP):
+        # Reviews are grouped by sentiment score and each group is counted in one
+        # batch: per-word sums are a weighted sum of the group counts.
+        groups = {}
+        for it in items:
+            label = it.get("sentiment")
+            if label in SENTIMENT_MAP:
+                self.labels[label] += 1
+            text = it.get("text", "")
+            if not text or not label:
+                continue
+            self.reviews += 1
+            groups.setdefault(sentiment_map.get(label, 0.0), []).append(text)
+        for score, texts in groups.items():
+            counter = count_tokens(texts)
+            index = self._indexes(list(counter))
+            values = np.fromiter(counter.values(), dtype=np.int64, count=len(counter))
+            self.freq[index] += values
+            self.sentiment_sum[index] += score * values
+        return self
+
+    def merge(self, other):
+        index = self._indexes(list(other.vocabulary))
+        self.freq[index] += other.freq
+        self.sentiment_sum[index] += other.sentiment_sum
+        self.labels.update(other.labels)
+        self.reviews += other.reviews
+        return self
+
+    def to_word_stats(self, min_freq=2):
+        keep = np.flatnonzero(self.freq >= min_freq)
+        words = list(self.vocabulary)
+        return WordStats([words[i] for i in keep], self.freq[keep], self.sentiment_sum[keep])
+
+    @classmethod
+    def partial_kind(cls):
+        # Recorded in the manifest: stored partials of another kind are rebuilt.
+        return f"words-{PARTIALS_FORMAT}"
+
+    def to_payload(self):
+        return {
+            "reviews": self.reviews,
+            "labels": dict(self.labels),
+            "words": list(self.vocabulary),
+            "freq": self.freq.tolist(),
+            "sentiment_sum": self.sentiment_sum.tolist()
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        partial = cls()
+        partial.vocabulary = {w: i for i, w in enumerate(payload["words"])}
+        partial.freq = np.array(payload["freq"], dtype=np.int64)
+        partial.sentiment_sum = np.array(payload["sentiment_sum"], dtype=np.float64)
+        partial.labels = Counter(payload["labels"])
+        partial.reviews = payload["reviews"]
+        return partial
+
+    def to_bytes(self):
+        return encode_partial(self.to_payload())
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls.from_payload(decode_partial(data))
+
+class WordSelection:
+    """
+    What the scatter plot draws: `top`, a WordStats of the k most frequent
+    words (stop-words excluded), and `tail`, the remaining words binned on a
+    log-frequency x sentiment grid as (frequency, sentiment, word_count) cells.
+    Its size is bounded by k and the grid, whatever the vocabulary size.
+    """
+
+    def __init__(self, top, tail):
+        self.top = top
+        self.tail = tail
+
+    def truncated(self, k, cells):
+        # The k most frequent words and the `cells` densest cells of the grid.
+        tail = sorted(self.tail, key=lambda cell: -cell[2])[:cells] if cells < len(self.tail) else self.tail
+        return WordSelection(self.top.head(k), tail)
+
+def select_words(partial, k=DEFAULT_TOP_K, min_freq=2, stop_words=STOP_WORDS, tail_bins=DEFAULT_TAIL_BINS):
+    words = list(partial.vocabulary)
+    keep = np.flatnonzero(partial.freq >= min_freq)
+    if stop_words:
+        keep = keep[np.fromiter((words[i] not in stop_words for i in keep), dtype=bool, count=len(keep))]
+    # Top-k by partial sort (O(n)); only those k are then fully sorted by WordStats.
+    if len(keep) > k:
+        split = np.argpartition(-partial.freq[keep], k - 1)
+        top, rest = keep[split[:k]], keep[split[k:]]
+    else:
+        top, rest = keep, keep[:0]
+    stats = WordStats([words[i] for i in top], partial.freq[top], partial.sentiment_sum[top])
+
+    tail = []
+    if tail_bins and len(rest):
+        freq = partial.freq[rest].astype(np.float64)
+        mean = partial.sentiment_sum[rest] / freq
+        x_edges = np.geomspace(freq.min(), freq.max() * 1.000001, tail_bins + 1)
+        y_edges = np.linspace(-1.0, 1.0, tail_bins + 1)
+        counts, _, _ = np.histogram2d(freq, mean, bins=[x_edges, y_edges])
+        x_centers = np.sqrt(x_edges[:-1] * x_edges[1:])
+        y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+        for i, j in zip(*np.nonzero(counts)):
+            tail.append((float(x_centers[i]), float(y_centers[j]), int(counts[i, j])))
+    return WordSelection(stats, tail)
+
+def render_within_budget(render, selection, max_bytes, min_words=10, attempts=4):
+    """
+    Returns (data, selection drawn): `render(selection)` output, rendered again
+    with proportionally fewer words and density cells (scaled on the measured
+    size) while it exceeds `max_bytes`. The last attempt is returned as is.
+    """
+    data = render(selection)
+    for _ in range(attempts):
+        if not max_bytes or len(data) <= max_bytes:
+            break
+        scale = max_bytes / len(data) * 0.9
+        k = min(len(selection.top), max(min_words, int(len(selection.top) * scale)))
+        cells = int(len(selection.tail) * scale)
+        if k == len(selection.top) and cells == len(selection.tail):
+            break
+        selection = selection.truncated(k, cells)
+        data = render(selection)
+    return data, selection
+
+def word_sentiment_stats(items, min_freq=2, sentiment_map=SENTIMENT_MAP):
+    # Words of every review that has both a text and a sentiment.
+    return WordPartial().add_items(items, sentiment_map).to_word_stats(min_freq)
+
+def sentiment_counts(items):
+    return Counter(it.get("sentiment") for it in items if it.get("sentiment") in SENTIMENT_MAP)
+
+def utc_timestamp(moment=None):
+    # Format of scored_at: sortable as a string, second resolution.
+    return (moment or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class LocalPartialStore:
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, name):
+        try:
+            with open(os.path.join(self.root, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    def delete(self, name):
+        try:
+            os.remove(os.path.join(self.root, name))
+        except FileNotFoundError:
+            pass
+
+class S3PartialStore:
+    def __init__(self, client, bucket, prefix):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, name):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + name)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def put(self, name, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + name, Body=data)
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + name)
+
+def _read_json(store, name):
+    raw = store.get(name)
+    return json.loads(raw) if raw else None
+
+def _put_json(store, name, payload):
+    store.put(name, json.dumps(payload, indent=1).encode("utf-8"))
+
+def _fold_by_version_and_day(items, partial_type, flush_every=5000):
+    # ({(sentiment_version, day): partial}, newest scored_at per version, the
+    # previous_scored_at values met); items are added in batches of `flush_every`
+    # so a rebuild never holds more than that per bucket.
+    partials = {}
+    pending = {}
+    newest = {}
+    replaced = set()
+    for item in items:
+        scored_at = item.get("scored_at") or ""
+        key = (item.get("sentiment_version"), scored_at[:10] or "unknown")
+        newest[key[0]] = max(newest.get(key[0], ""), scored_at)
+        if item.get("previous_scored_at"):
+            replaced.add(item["previous_scored_at"])
+        bucket = pending.setdefault(key, [])
+        bucket.append(item)
+        if len(bucket) >= flush_every:
+            partials.setdefault(key, partial_type()).add_items(bucket)
+            bucket.clear()
+    for key, bucket in pending.items():
+        if bucket:
+            partials.setdefault(key, partial_type()).add_items(bucket)
+    return partials, newest, replaced
+
+def _newest_version(newest):
+    return max(newest, key=lambda v: (newest[v], v or ""))
+
+def _rebuild_step(store, load_items, previous, compatible, state, version, now, lag_seconds, partial_type,
+                  deadline, segments):
+    """
+    One step of a rebuild. The table is read in `segments` scan segments; the
+    ones not folded yet are read until `deadline` (time.monotonic(), at least one
+    per step) and added to the per (version, day) parts listed in rebuild.json.
+    The step that folds the last segment commits those parts as the new manifest.
+    """
+    kind = partial_type.partial_kind()
+    if state and (state.get("format") != PARTIALS_FORMAT or state.get("kind") != kind or
+                  (version is not None and state.get("version") != version)):
+        # Rebuild of another partial kind or scorer version: started over.
+        for _, _, name in state["parts"]:
+            store.delete(name)
+        state = None
+    if state is None:
+        until = utc_timestamp(now - timedelta(seconds=lag_seconds))
+        state = {"format": PARTIALS_FORMAT, "kind": kind, "version": version, "until": until,
+                 "run": until.replace(":", "").replace("-", ""), "segments": segments, "done": [],
+                 "parts": [], "newest": []}
+    parts = {(v, day): name for v, day, name in state["parts"]}
+    newest = dict(state["newest"])
+    done = list(state["done"])
+    step = len(done)
+
+    loaded = {}
+    for segment in range(state["segments"]):
+        if segment in done:
+            continue
+        if deadline is not None and len(done) > step and time.monotonic() >= deadline:
+            break
+        items = load_items(None, state["until"], state["version"], segment=(segment, state["segments"]))
+        partials, seen, _ = _fold_by_version_and_day(items, partial_type)
+        for key, part in partials.items():
+            loaded[key] = loaded[key].merge(part) if key in loaded else part
+        for v, scored_at in seen.items():
+            newest[v] = max(newest.get(v, ""), scored_at)
+        done.append(segment)
+
+    # Merged parts go under new names: rebuild.json keeps pointing at the old
+    # ones until it is written, so a step that dies is simply replayed.
+    obsolete = []
+    for (v, day), part in loaded.items():
+        name = parts.get((v, day))
+        if name:
+            part.merge(partial_type.from_bytes(store.get(name)))
+            obsolete.append(name)
+        parts[(v, day)] = f"days/{day}/rebuild-{state['run']}-{step}-{zlib.crc32(json.dumps(v).encode('utf-8')):08x}.json.gz"
+        store.put(parts[(v, day)], part.to_bytes())
+    state = dict(state, done=sorted(done), parts=[[v, day, name] for (v, day), name in parts.items()],
+                 newest=[[v, scored_at] for v, scored_at in newest.items()])
+    report = {
+        "version": state["version"],
+        "since": None,
+        "until": state["until"],
+        "new_reviews": 0,
+        "days": [],
+        "compacted_days": 0,
+        "recounted_days": [],
+        "total_reviews": 0,
+        "rebuilt": False,
+        "rebuild_progress": f"{len(done)}/{state['segments']}"
+    }
+
+    if len(done) < state["segments"]:
+        _put_json(store, "rebuild.json", state)
+        for name in obsolete:
+            store.delete(name)
+        # Meanwhile the previous total, when still readable, keeps the charts up.
+        total = partial_type.from_bytes(store.get(compatible["total"])) if compatible and compatible.get("total") else None
+        report["total_reviews"] = total.reviews if total is not None else 0
+        return total, report
+
+    version = state["version"]
+    if version is None and newest:
+        version = _newest_version(newest)
+    days = {}
+    total = partial_type()
+    for (v, day), name in parts.items():
+        if v != version:
+            obsolete.append(name)
+            continue
+        days[day] = [name]
+        total.merge(loaded[(v, day)] if (v, day) in loaded else partial_type.from_bytes(store.get(name)))
+    total_name = f"total-{state['run']}.json.gz"
+    store.put(total_name, total.to_bytes())
+    _put_json(store, "manifest.json", {
+        "format": PARTIALS_FORMAT, "kind": kind, "version": version, "watermark": state["until"],
+        "total": total_name, "days": days, "updated_at": utc_timestamp(now)
+    })
+    store.delete("rebuild.json")
+    if previous:
+        obsolete.extend(name for names in previous.get("days", {}).values() for name in names)
+        obsolete.extend([previous["total"]] if previous.get("total") else [])
+    live = {total_name}.union(*days.values())
+    for name in obsolete:
+        if name not in live:
+            store.delete(name)
+    report.update(version=version, new_reviews=total.reviews, days=sorted(days), total_reviews=total.reviews,
+                  rebuilt=True, rebuild_progress=None)
+    return total, report
+
+def update_partials(store, load_items, version=None, now=None, rebuild=False,
+                    lag_seconds=SAFETY_LAG_SECONDS, compact_after=8, partial_type=WordPartial,
+                    deadline=None, rebuild_segments=REBUILD_SEGMENTS):
+    """
+    Folds the reviews scored since the last watermark into the stored partials
+    and returns (total, report). `load_items(since, until, version, segment=None)`
+    yields the labelled reviews with since < scored_at <= until (since=None: all
+    of them, from scan segment `segment` = (index, count) when given), of scorer
+    `version` when it is not None.
+
+    Each run writes one part per scored_at day, a new total and then
+    manifest.json, the commit point: a run that dies before it leaves the
+    previous state intact. A day reaching `compact_after` parts is merged into a
+    single part. `partial_type` is any mergeable aggregate with the WordPartial
+    interface (add_items, merge, to_bytes/from_bytes, reviews, partial_kind).
+
+    A re-scored review carries previous_scored_at, the scoring its label
+    replaced: the day that scoring was counted in is recounted from the table
+    instead of adding the review twice. When that day is unknown (re-scored twice
+    since the last run, or labelled before scored_at existed), when reviews of
+    another scorer version show up, when the stored partials are of another kind,
+    or on `rebuild`, the partials are rebuilt from a full read of the table.
+    Without an explicit `version` they follow the scorer version of the most
+    recently scored reviews.
+
+    A rebuild reads `rebuild_segments` scan segments and stops between two of
+    them once `deadline` (time.monotonic()) has passed; the next call resumes it
+    (rebuild.json). Until it is done the previous total is returned when it is
+    still readable, else None.
+    """
+    previous = _read_json(store, "manifest.json")
+    kind = partial_type.partial_kind()
+    now = now or datetime.now(timezone.utc)
+    compatible = previous if previous and previous.get("format") == PARTIALS_FORMAT and \
+        previous.get("kind") == kind and (version is None or previous.get("version") == version) else None
+    state = _read_json(store, "rebuild.json")
+    if state or rebuild or not compatible:
+        return _rebuild_step(store, load_items, previous, compatible, state, version, now, lag_seconds, partial_type,
+                             deadline, rebuild_segments)
+
+    manifest = compatible
+    pinned = version
+    version = version if version is not None else manifest["version"]
+    since = manifest["watermark"]
+    until = max(utc_timestamp(now - timedelta(seconds=lag_seconds)), since)
+
+    loaded, newest, replaced = _fold_by_version_and_day(load_items(since, until, pinned) if until != since else (),
+                                                        partial_type)
+    if version is None and newest:
+        version = _newest_version(newest)
+    recount = set()
+    unknown_history = any(v != version for v in newest)
+    for scored_at in replaced:
+        if scored_at == "unknown":
+            unknown_history = unknown_history or "unknown" in manifest["days"]
+        elif scored_at > since:
+            # Scored again since the last run: the scoring that was counted is lost.
+            unknown_history = True
+        elif scored_at[:10] in manifest["days"]:
+            recount.add(scored_at[:10])
+    if unknown_history:
+        return _rebuild_step(store, load_items, previous, compatible, None, pinned, now, lag_seconds, partial_type,
+                             deadline, rebuild_segments)
+    by_day = {day: part for (v, day), part in loaded.items() if v == version}
+
+    run_id = until.replace(":", "").replace("-", "")
+    days = {day: list(parts) for day, parts in manifest["days"].items()}
+    obsolete = []
+    for day in sorted(recount):
+        # What the day holds now: reviews scored again since then have left it.
+        fresh, _, _ = _fold_by_version_and_day(load_items(day, min(f"{day}T23:59:59Z", since), pinned), partial_type)
+        obsolete.extend(days.pop(day))
+        if (version, day) in fresh:
+            name = f"days/{day}/recount-{run_id}.json.gz"
+            store.put(name, fresh[(version, day)].to_bytes())
+            days[day] = [name]
+    # Recounted days cannot be subtracted from the total: it is merged again from the parts.
+    total = None
+    if not recount:
+        total = partial_type.from_bytes(store.get(manifest["total"])) if manifest["total"] else partial_type()
+    new_reviews = 0
+    compacted = 0
+    for day, part in sorted(by_day.items()):
+        if total is not None:
+            total.merge(part)
+        new_reviews += part.reviews
+        parts = days.setdefault(day, [])
+        name = f"days/{day}/part-{run_id}.json.gz"
+        if len(parts) + 1 >= compact_after:
+            for old_name in parts:
+                part.merge(partial_type.from_bytes(store.get(old_name)))
+            obsolete.extend(parts)
+            parts.clear()
+            name = f"days/{day}/compact-{run_id}.json.gz"
+            compacted += 1
+        store.put(name, part.to_bytes())
+        parts.append(name)
+    if total is None:
+        total = partial_type()
+        for parts in days.values():
+            for name in parts:
+                total.merge(partial_type.from_bytes(store.get(name)))
+
+    total_name = manifest["total"]
+    if by_day or recount or total_name is None:
+        if total_name:
+            obsolete.append(total_name)
+        total_name = f"total-{run_id}.json.gz"
+        store.put(total_name, total.to_bytes())
+    manifest = dict(manifest, version=version, watermark=until, total=total_name, days=days, updated_at=utc_timestamp(now))
+    _put_json(store, "manifest.json", manifest)
+    live = {total_name}.union(*days.values())
+    for name in obsolete:
+        if name not in live:
+            store.delete(name)
+    report = {
+        "version": version,
+        "since": since,
+        "until": until,
+        "new_reviews": new_reviews,
+        "days": sorted(by_day),
+        "compacted_days": compacted,
+        "recounted_days": sorted(recount),
+        "total_reviews": total.reviews,
+        "rebuilt": False,
+        "rebuild_progress": None
+    }
+    return total, report
@@ -1,56 +1,745 @@
+import hashlib
+import json
+import marshal
+import os
+import zlib
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from vaderSentiment import vaderSentiment
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
 # Initialisation du client DynamoDB dans la région eu-west-3
 dynamodb = boto3.resource("dynamodb", region_name="eu-west-3")
 reviews_table = dynamodb.Table("Reviews")
+# Agrégats de sentiment par restaurant, maintenus par ADD atomiques
+aggregates_table = dynamodb.Table("RestaurantSentiment")
 
-# Initialisation de l'analyseur de sentiment
-analyzer = SentimentIntensityAnalyzer()
+# Nombre de segments du scan parallèle (un thread par segment)
+SCAN_SEGMENTS = int(os.environ.get("SCAN_SEGMENTS", "4"))
 
-def compute_sentiment_vader(text):
+SENTIMENT_THRESHOLD = 0.05
+
+# Lexique VADER pré-parsé (généré par amplify/hooks/pre-push.sh) : évite de relire
+# les fichiers texte du lexique à chaque cold start
+VADER_SNAPSHOT_PATH = os.environ.get(
+    "VADER_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vader_lexicon.marshal")
+)
+
+def lexicon_fingerprint():
+    # CRC des fichiers du lexique installés (bien moins coûteux que importlib.metadata)
+    package_dir = os.path.dirname(os.path.abspath(vaderSentiment.__file__))
+    fingerprint = []
+    for name in ("vader_lexicon.txt", "emoji_utf8_lexicon.txt"):
+        with open(os.path.join(package_dir, name), "rb") as f:
+            fingerprint.append(zlib.crc32(f.read()))
+    return tuple(fingerprint)
+
+def _vader_version():
+    # importlib.metadata parcourt toutes les distributions installées : seulement sans snapshot
+    from importlib import metadata
+    try:
+        return metadata.version("vaderSentiment")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def load_analyzer(path=VADER_SNAPSHOT_PATH):
     """
-    Calcule le sentiment d'un texte avec VaderSentiment.
-    Retourne "POSITIVE", "NEGATIVE" ou "NEUTRAL".
+    Construit l'analyseur depuis le snapshot marshal s'il existe et correspond
+    aux fichiers du lexique installés, sinon par le chemin normal. La version de
+    vaderSentiment (attribut vader_version) vient de l'en-tête du snapshot.
     """
-    scores = analyzer.polarity_scores(text)
-    compound = scores["compound"]
-    if compound > 0.05:
+    try:
+        with open(path, "rb") as f:
+            payload = marshal.loads(f.read())  # marshal.load(f) lit le fichier par petits morceaux
+        if payload.get("format") != 2 or payload.get("source") != lexicon_fingerprint():
+            raise ValueError(f"snapshot VADER périmé : {path}")
+        snapshot_analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        snapshot_analyzer.lexicon = payload["lexicon"]
+        snapshot_analyzer.emojis = payload["emojis"]
+        snapshot_analyzer.vader_version = payload["vader_version"]
+        return snapshot_analyzer
+    except (OSError, EOFError, ValueError, TypeError, KeyError) as e:
+        print(f"Snapshot VADER inutilisable ({e.__class__.__name__}), chargement des fichiers texte.")
+        fallback_analyzer = SentimentIntensityAnalyzer()
+        fallback_analyzer.vader_version = _vader_version()
+        return fallback_analyzer
+
+# Initialisation de l'analyseur de sentiment
+analyzer = load_analyzer()
+
+# Version du scorer stockée avec chaque label : une review n'est re-scorée que si elle change
+SENTIMENT_VERSION = f"vader-{analyzer.vader_version}-t{SENTIMENT_THRESHOLD}"
+
+# Projection minimale : "text" est un mot réservé DynamoDB
+REVIEW_PROJECTION = "review_id, restaurant_id, #t"
+REVIEW_PROJECTION_NAMES = {"#t": "text"}
+# Les scans lisent aussi le label courant (voir ancien_scored_at) ; l'index UnscoredIndex
+# ne contient que des reviews jamais labellisées
+SCAN_PROJECTION = REVIEW_PROJECTION + ", sentiment"
+
+# Index creux des reviews à labelliser : les écritures posent `unscored` (numéro de
+# shard), le scoring le retire (REMOVE), l'index ne contient donc que le backlog
+UNSCORED_INDEX = "UnscoredIndex"
+UNSCORED_SHARDS = 16
+
+# Seulement les reviews sans sentiment ou scorées par une autre version
+UNSCORED_FILTER = "attribute_not_exists(sentiment) OR attribute_not_exists(sentiment_version) OR sentiment_version <> :v"
+
+# Label + horodatage du scoring (watermark des partiels de FoodSentinelleGraphGeneratored) ;
+# previous_scored_at garde le scoring remplacé, pour que les partiels recomptent le jour
+# où il avait été compté ; la review sort de l'index UnscoredIndex
+UPDATE_EXPRESSION = ("SET sentiment = :s, sentiment_compound = :c, sentiment_version = :v, "
+                     "previous_scored_at = if_not_exists(scored_at, :prev), "
+                     "scored_at = :at, scored_day = :day REMOVE unscored")
+# Un retry d'un update passé malgré l'erreur (timeout) relirait son propre label en
+# UPDATED_OLD et annulerait le delta de l'agrégat : il est ignoré (already_applied)
+LABEL_CONDITION = "attribute_not_exists(scored_at) OR scored_at <> :at"
+
+# Write-back concurrente : débit initial/max en updates par seconde, ajusté selon le throttling
+WRITE_WORKERS = int(os.environ.get("WRITE_WORKERS", "8"))
+WRITE_RATE = float(os.environ.get("WRITE_RATE", "25"))
+MAX_WRITE_RATE = float(os.environ.get("MAX_WRITE_RATE", "0")) or None
+# Marge gardée avant le timeout Lambda pour les écritures des agrégats et la réponse
+WRITE_DEADLINE_MARGIN_MS = int(os.environ.get("WRITE_DEADLINE_MARGIN_MS", "3000"))
+
+# Cache des scores par hash du texte : LRU en mémoire (conservé entre invocations
+# à chaud) + table DynamoDB optionnelle (clé text_hash) partagée par toutes les instances
+SCORE_CACHE_SIZE = int(os.environ.get("SCORE_CACHE_SIZE", "50000"))
+SCORE_CACHE_TABLE = os.environ.get("SCORE_CACHE_TABLE", "")
+SCORE_BATCH_SIZE = 100  # BatchGetItem hard limit
+SCORE_CACHE_MAX_RETRIES = 6  # UnprocessedKeys encore là ensuite : comptés comme absents
+
+THROTTLING_ERRORS = (
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded"
+)
+
+_DONE = object()
+
+def write_deadline(context, margin_ms=WRITE_DEADLINE_MARGIN_MS):
+    # Instant (time.monotonic()) au-delà duquel on n'écrit plus ; None hors Lambda
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    return time.monotonic() + (context.get_remaining_time_in_millis() - margin_ms) / 1000
+
+def label_from_compound(compound):
+    if compound > SENTIMENT_THRESHOLD:
         return "POSITIVE"
-    elif compound < -0.05:
+    elif compound < -SENTIMENT_THRESHOLD:
         return "NEGATIVE"
     else:
         return "NEUTRAL"
 
+def scored_timestamps():
+    # scored_at (UTC, triable comme chaîne) sert de watermark aux partiels des graphiques ;
+    # scored_day est la clé de partition de l'index ScoredDayIndex.
+    scored_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return scored_at, scored_at[:10]
+
+def ancien_scored_at(item):
+    # Valeur de previous_scored_at pour une review sans scored_at : "unknown" si elle a
+    # été labellisée avant l'ajout de scored_at (jour "unknown" des partiels), sinon "".
+    return "unknown" if item.get("sentiment") else ""
+
+def compute_sentiment_vader(text):
+    """
+    Calcule le sentiment d'un texte avec VaderSentiment (via le cache des scores).
+    Retourne "POSITIVE", "NEGATIVE" ou "NEUTRAL".
+    """
+    return label_from_compound(score_texts_cached([text])[0])
+
+# ------------------------------
+# Cache des scores
+# ------------------------------
+_score_cache = OrderedDict()
+_score_cache_stats = {"memory_hits": 0, "store_hits": 0, "misses": 0}
+
+def normalize_score_text(text):
+    # Espaces seulement : VADER tient compte de la casse et de la ponctuation
+    return " ".join((text or "").split())
+
+def text_hash(text):
+    return hashlib.sha256(normalize_score_text(text).encode("utf-8")).hexdigest()
+
+def _remember_score(key, compound):
+    _score_cache[key] = compound
+    _score_cache.move_to_end(key)
+    while len(_score_cache) > SCORE_CACHE_SIZE:
+        _score_cache.popitem(last=False)
+
+def _load_stored_scores(keys):
+    """
+    Lit les scores de la table cache ; les items d'une autre version du scorer
+    comptent comme absents (et seront réécrits).
+    """
+    found = {}
+    request_items = {SCORE_CACHE_TABLE: {"Keys": [{"text_hash": k} for k in keys]}}
+    for attempt in range(SCORE_CACHE_MAX_RETRIES + 1):
+        if attempt:
+            # Backoff exponentiel avec jitter : la table throttle, inutile d'insister en boucle
+            time.sleep(random.uniform(0, min(2.0, 0.05 * (2 ** attempt))))
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        for item in response.get("Responses", {}).get(SCORE_CACHE_TABLE, []):
+            if item.get("version") == SENTIMENT_VERSION:
+                found[item["text_hash"]] = json.loads(item["scores"])["compound"]
+        request_items = response.get("UnprocessedKeys") or {}
+        if not request_items:
+            return found
+    unprocessed = len(request_items[SCORE_CACHE_TABLE]["Keys"])
+    print(f"[!] {unprocessed} scores non lus dans {SCORE_CACHE_TABLE} après {SCORE_CACHE_MAX_RETRIES} essais, recalculés.")
+    return found
+
+def _store_scores(entries):
+    with dynamodb.Table(SCORE_CACHE_TABLE).batch_writer() as batch:
+        for key, compound in entries.items():
+            batch.put_item(Item={
+                "text_hash": key,
+                "version": SENTIMENT_VERSION,
+                "scores": json.dumps({"compound": compound})
+            })
+
+def score_texts_cached(texts):
+    """
+    Retourne le compound VADER de chaque texte (au plus SCORE_BATCH_SIZE),
+    en ne calculant que les textes absents du cache mémoire et de la table cache.
+    """
+    keys = [text_hash(t) for t in texts]
+    compounds = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        if key in _score_cache:
+            _score_cache.move_to_end(key)
+            compounds[key] = _score_cache[key]
+        else:
+            missing.append(key)
+    _score_cache_stats["memory_hits"] += sum(1 for k in keys if k in compounds)
+    if missing and SCORE_CACHE_TABLE:
+        stored = _load_stored_scores(missing)
+        for key, compound in stored.items():
+            _remember_score(key, compound)
+            compounds[key] = compound
+        _score_cache_stats["store_hits"] += sum(1 for k in keys if k in stored)
+        missing = [k for k in missing if k not in stored]
+    _score_cache_stats["misses"] += sum(1 for k in keys if k not in compounds)
+    new_scores = {}
+    for text, key in zip(texts, keys):
+        if key not in compounds:
+            compounds[key] = new_scores[key] = analyzer.polarity_scores(text)["compound"]
+            _remember_score(key, compounds[key])
+    if new_scores and SCORE_CACHE_TABLE:
+        _store_scores(new_scores)
+    return [compounds[k] for k in keys]
+
+def parallel_scan(table, total_segments=SCAN_SEGMENTS, stats=None, max_buffered_pages=8, **scan_kwargs):
+    """
+    Générateur sur tous les items de la table via un scan parallèle
+    (Segment/TotalSegments) : chaque segment suit son LastEvaluatedKey dans
+    son propre thread, les pages passent par une file bornée.
+    """
+    requetes = [(table.scan, dict(scan_kwargs, Segment=segment, TotalSegments=total_segments))
+                for segment in range(total_segments)]
+    return _pages_en_parallele(requetes, stats, max_buffered_pages)
+
+def query_unscored(table, stats=None, max_buffered_pages=8, **query_kwargs):
+    """
+    Items de l'index creux UnscoredIndex (reviews pas encore labellisées) : une
+    requête par shard de `unscored`, en parallèle comme le scan.
+    """
+    noms = dict(query_kwargs.pop("ExpressionAttributeNames", {}), **{"#u": "unscored"})
+    requetes = [(table.query, dict(query_kwargs, IndexName=UNSCORED_INDEX, KeyConditionExpression="#u = :u",
+                                   ExpressionAttributeNames=noms, ExpressionAttributeValues={":u": shard}))
+                for shard in range(UNSCORED_SHARDS)]
+    return _pages_en_parallele(requetes, stats, max_buffered_pages)
+
+def _pages_en_parallele(requetes, stats, max_buffered_pages):
+    # Chaque (méthode, kwargs) suit son LastEvaluatedKey dans son propre thread.
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def offer(value):
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(methode, kwargs):
+        try:
+            while True:
+                response = methode(**kwargs)
+                if stats is not None:
+                    with lock:
+                        stats["pages"] += 1
+                        stats["scanned"] += response.get("ScannedCount", 0)
+                if not offer(response.get("Items", [])):
+                    return
+                if "LastEvaluatedKey" not in response:
+                    return
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except Exception as e:
+            offer(e)
+        finally:
+            offer(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, len(requetes)))
+    for methode, kwargs in requetes:
+        executor.submit(worker, methode, kwargs)
+    remaining = len(requetes)
+    try:
+        while remaining:
+            value = pages.get()
+            if value is _DONE:
+                remaining -= 1
+            elif isinstance(value, Exception):
+                raise value
+            else:
+                yield from value
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+# ------------------------------
+# Write-back des labels
+# ------------------------------
+class AdaptiveTokenBucket:
+    """
+    Token bucket AIMD : le débit augmente doucement tant que les écritures
+    passent et est divisé par deux (au plus une fois par seconde) quand la
+    table throttle. Le coût réel (ConsumedCapacity) est débité après coup.
+    """
+
+    def __init__(self, rate, min_rate=1.0, max_rate=None, increase=1.0, decrease=0.5, cooldown=1.0):
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate) if max_rate else float("inf")
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def record_success(self, consumed_units=1.0):
+        with self._lock:
+            self._tokens -= max(0.0, consumed_units - 1.0)
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self.capacity = max(self.capacity, self.rate)
+
+    def record_throttle(self):
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+class WriteBack:
+    """
+    Exécute les update_item depuis un pool de threads borné, cadencé par un
+    AdaptiveTokenBucket. Les clés en échec après max_retries sont retentées
+    une fois dans close() puis listées dans failed. Passé `deadline`
+    (time.monotonic()), plus rien n'est tenté : le reste part dans failed.
+    """
+
+    def __init__(self, table, workers=WRITE_WORKERS, rate=WRITE_RATE, max_rate=MAX_WRITE_RATE, max_retries=6, deadline=None):
+        self.table = table
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.limiter = AdaptiveTokenBucket(rate=rate, max_rate=max_rate)
+        self.failed = []
+        self.stats = {"updated": 0, "already_applied": 0, "throttled": 0, "retries": 0, "failed": 0, "consumed_units": 0.0}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers * 4)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, key, update_expression, values, on_updated=None, condition=None):
+        self._slots.acquire()
+        future = self._executor.submit(self._update, key, update_expression, values, on_updated, condition)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _remaining(self):
+        return float("inf") if self.deadline is None else self.deadline - time.monotonic()
+
+    def _update(self, key, update_expression, values, on_updated=None, condition=None, max_retries=None):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        extra = {"ReturnValues": "UPDATED_OLD"} if on_updated is not None else {}
+        if condition:
+            extra["ConditionExpression"] = condition
+        for attempt in range(max_retries + 1):
+            if attempt:
+                delay = random.uniform(0, min(5.0, 0.05 * (2 ** attempt)))
+                if delay >= self._remaining():
+                    break
+                self._count("retries")
+                time.sleep(delay)
+            if self._remaining() <= 0:
+                break
+            self.limiter.acquire()
+            try:
+                response = self.table.update_item(
+                    Key=key,
+                    UpdateExpression=update_expression,
+                    ExpressionAttributeValues=values,
+                    ReturnConsumedCapacity="TOTAL",
+                    **extra
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] in THROTTLING_ERRORS:
+                    self._count("throttled")
+                    self.limiter.record_throttle()
+                    continue
+                if condition and e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    # Un essai précédent en apparence échoué (timeout) était passé
+                    self._count("already_applied")
+                    return True
+                print(f"[!] update_item en échec pour {key} : {e.response['Error']['Code']}")
+                break
+            except Exception as e:
+                print(f"[!] update_item en échec pour {key} : {e.__class__.__name__}: {e}")
+                continue
+            units = float(response.get("ConsumedCapacity", {}).get("CapacityUnits", 1.0))
+            self.limiter.record_success(units)
+            self._count("updated")
+            self._count("consumed_units", units)
+            if on_updated is not None:
+                on_updated(response.get("Attributes", {}))
+            return True
+        with self._lock:
+            self.failed.append((key, update_expression, values, on_updated, condition))
+        return False
+
+    def close(self, deadline=None):
+        # Retente les échecs jusqu'à la deadline et renvoie les clés toujours en attente
+        if deadline is not None:
+            self.deadline = deadline
+        self._executor.shutdown(wait=True)
+        retry, self.failed = self.failed, []
+        for key, update_expression, values, on_updated, condition in retry:
+            self._update(key, update_expression, values, on_updated, condition, max_retries=self.max_retries * 2)
+        self.stats["failed"] = len(self.failed)
+        return [key for key, *_ in self.failed]
+
+# ------------------------------
+# Agrégats par restaurant
+# ------------------------------
+LABEL_COUNTS = {
+    "POSITIVE": "positive_count",
+    "NEGATIVE": "negative_count",
+    "NEUTRAL": "neutral_count"
+}
+AGGREGATE_FIELDS = ("review_count", "positive_count", "negative_count", "neutral_count", "compound_sum", "compound_sq_sum")
+
+# ADD n'est pas idempotent : chaque flush marque ses updates d'un jeton et ne les
+# applique que si l'item ne le porte pas déjà (retry après un timeout ambigu)
+AGGREGATE_CONDITION = "attribute_not_exists(last_batch) OR last_batch <> :batch"
+
+def to_decimal(value):
+    if isinstance(value, int):
+        return Decimal(value)
+    return Decimal(str(round(float(value), 8)))
+
+def review_contribution(sentiment, compound, sign=1):
+    # Une review compte dans l'agrégat dès qu'elle porte sentiment_compound
+    if compound is None or sentiment not in LABEL_COUNTS:
+        return {}
+    compound = float(compound)
+    return {
+        "review_count": sign,
+        LABEL_COUNTS[sentiment]: sign,
+        "compound_sum": sign * compound,
+        "compound_sq_sum": sign * compound * compound
+    }
+
+def sentiment_delta(old_attributes, sentiment, compound):
+    """
+    Variation de l'agrégat quand une review passe de old_attributes
+    (valeurs UPDATED_OLD, éventuellement vides) au nouveau label.
+    """
+    delta = review_contribution(sentiment, compound)
+    for field, value in review_contribution(old_attributes.get("sentiment"), old_attributes.get("sentiment_compound"), sign=-1).items():
+        delta[field] = delta.get(field, 0) + value
+    return delta
+
+class AggregateBuffer:
+    """
+    Cumule les deltas par restaurant et les applique au flush en un seul
+    update ADD atomique par restaurant.
+    """
+
+    def __init__(self):
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def add(self, restaurant_id, delta):
+        if not restaurant_id or not delta:
+            return
+        with self._lock:
+            totals = self._deltas.setdefault(restaurant_id, {})
+            for field, value in delta.items():
+                totals[field] = totals.get(field, 0) + value
+
+    def on_updated(self, restaurant_id, sentiment, compound):
+        return lambda old: self.add(restaurant_id, sentiment_delta(old, sentiment, compound))
+
+    def flush(self, deadline=None):
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        now = datetime.now(timezone.utc).isoformat()
+        batch = uuid.uuid4().hex
+        writeback = WriteBack(aggregates_table, workers=4, deadline=deadline)
+        try:
+            for restaurant_id, totals in deltas.items():
+                fields = [f for f in AGGREGATE_FIELDS if totals.get(f)]
+                if not fields:
+                    continue
+                values = {f":{f}": to_decimal(totals[f]) for f in fields}
+                values[":now"] = now
+                values[":batch"] = batch
+                writeback.submit(
+                    {"restaurant_id": restaurant_id},
+                    "ADD " + ", ".join(f"{f} :{f}" for f in fields) + " SET updated_at = :now, last_batch = :batch",
+                    values,
+                    condition=AGGREGATE_CONDITION
+                )
+        finally:
+            writeback.close()
+        return writeback
+
+# ------------------------------
+# Consommateur DynamoDB Streams
+# ------------------------------
+_deserializer = TypeDeserializer()
+
+def _from_stream_image(image):
+    return {k: _deserializer.deserialize(v) for k, v in (image or {}).items()}
+
+def needs_scoring(old_image, new_image):
+    """
+    Une review est à scorer si elle n'a pas de label à la version courante ou si
+    son texte a changé. Nos propres updates (sentiment seul) ne repassent donc
+    jamais : pas de boucle sur le stream.
+    """
+    if new_image.get("sentiment") and new_image.get("sentiment_version") == SENTIMENT_VERSION:
+        return old_image is not None and old_image.get("text") != new_image.get("text")
+    return True
+
+def stream_handler(event, context):
+    """
+    Handler des batches DynamoDB Streams de la table Reviews (vue NEW_AND_OLD_IMAGES).
+    - Ne traite que les INSERT/MODIFY dont le texte est nouveau ou a changé.
+    - Score les textes (cache des scores) puis écrit les labels en parallèle.
+    - Renvoie les records en échec dans batchItemFailures (ReportBatchItemFailures) :
+      Lambda reprend le batch à partir du premier d'entre eux. Un agrégat non écrit
+      n'en fait pas partie : il est journalisé (AGGREGATE_DRIFT).
+    """
+    pending = {}
+    sequence_by_key = {}
+    failures = []
+    skipped = 0
+    for record in event.get("Records", []):
+        sequence_number = record.get("dynamodb", {}).get("SequenceNumber")
+        try:
+            if record.get("eventName") not in ("INSERT", "MODIFY"):
+                skipped += 1
+                continue
+            new_image = _from_stream_image(record["dynamodb"].get("NewImage"))
+            old_image = _from_stream_image(record["dynamodb"]["OldImage"]) if "OldImage" in record["dynamodb"] else None
+            if not new_image.get("review_id") or not needs_scoring(old_image, new_image):
+                skipped += 1
+                continue
+            # Une review modifiée deux fois dans le batch n'est scorée que sur sa dernière image :
+            # deux updates du même lot partageraient le même scored_at (LABEL_CONDITION)
+            review_id = new_image["review_id"]
+            sequence_by_key.setdefault(review_id, []).append(sequence_number)
+            pending[review_id] = (sequence_number, review_id, new_image.get("restaurant_id"), new_image.get("text", ""),
+                                  ancien_scored_at(new_image))
+        except Exception as e:
+            print(f"[!] Record {sequence_number} illisible : {e.__class__.__name__}: {e}")
+            failures.append(sequence_number)
+    pending = list(pending.values())
+
+    writeback = WriteBack(reviews_table, workers=max(1, min(WRITE_WORKERS, len(pending))), max_retries=3,
+                          deadline=write_deadline(context, 2 * WRITE_DEADLINE_MARGIN_MS))
+    aggregates = AggregateBuffer()
+    try:
+        for i in range(0, len(pending), SCORE_BATCH_SIZE):
+            chunk = pending[i:i + SCORE_BATCH_SIZE]
+            try:
+                compounds = score_texts_cached([text for _, _, _, text, _ in chunk])
+            except Exception as e:
+                print(f"[!] Scoring en échec : {e.__class__.__name__}: {e}")
+                failures.extend(s for _, review_id, *_ in chunk for s in sequence_by_key[review_id])
+                continue
+            scored_at, scored_day = scored_timestamps()
+            for (_, review_id, restaurant_id, _, precedent), compound in zip(chunk, compounds):
+                sentiment = label_from_compound(compound)
+                writeback.submit(
+                    {"review_id": review_id},
+                    UPDATE_EXPRESSION,
+                    {":s": sentiment, ":c": to_decimal(compound), ":v": SENTIMENT_VERSION, ":at": scored_at, ":day": scored_day,
+                     ":prev": precedent},
+                    on_updated=aggregates.on_updated(restaurant_id, sentiment, to_decimal(compound)),
+                    condition=LABEL_CONDITION
+                )
+    finally:
+        writeback.close()
+    aggregate_writes = aggregates.flush(deadline=write_deadline(context))
+
+    for key, *_ in writeback.failed:
+        failures.extend(sequence_by_key.get(key["review_id"], []))
+    # Les labels sont écrits : rejouer leurs records ne referait pas le delta d'agrégat perdu
+    # (LABEL_CONDITION). Il est seulement journalisé ; `python -m src.aggregates --rebuild` corrige la dérive
+    for key, *_ in aggregate_writes.failed:
+        print(f"[!] Agrégat non mis à jour pour {key['restaurant_id']}")
+    if aggregate_writes.failed or writeback.stats["already_applied"]:
+        print(f"AGGREGATE_DRIFT restaurants={len(aggregate_writes.failed)} "
+              f"labels_sans_delta={writeback.stats['already_applied']}")
+
+    print(f"Stream : {len(event.get('Records', []))} records, {len(pending)} à scorer, {skipped} ignorés, "
+          f"{len(failures)} en échec. Write-back : {writeback.stats}, agrégats : {aggregate_writes.stats}.")
+    return {"batchItemFailures": [{"itemIdentifier": s} for s in dict.fromkeys(failures) if s]}
+
 def handler(event, context):
     """
     Handler principal de la Lambda.
-    - Récupère tous les items de la table Reviews.
-    - Calcule le sentiment pour chaque review.
-    - Met à jour l'item avec le sentiment.
-    """
-    # Récupération des items via un scan
-    response = reviews_table.scan()
-    items = response.get("Items", [])
-    print(f"Found {len(items)} reviews to process.")
-    
+    - Un event DynamoDB Streams ({"Records": [...]}) est délégué à stream_handler.
+    - Lit les reviews à labelliser dans l'index creux UnscoredIndex (requêtes
+      parallèles par shard) : le coût suit le nombre de nouvelles reviews, pas la
+      taille de la table. Sans l'index, ou avec {"scan": true}, un scan filtré de
+      toute la table trouve aussi les reviews d'une autre version du scorer
+      ({"full": true} pour tout re-scorer).
+    - Calcule le sentiment pour chaque review, par lots de 100, en réutilisant
+      les scores déjà calculés pour le même texte (cache mémoire + SCORE_CACHE_TABLE).
+    - Met à jour l'item avec le sentiment et la version du scorer, en parallèle
+      et à un débit adapté au throttling de la table ; les clés en échec sont
+      retentées puis renvoyées dans "failed_keys".
+    """
+    event = event or {}
+    if "Records" in event:
+        return stream_handler(event, context)
+    segments = int(event.get("segments", SCAN_SEGMENTS))
+    full = bool(event.get("full", False))
+    scan = full or bool(event.get("scan", False))
+    stats = {"pages": 0, "scanned": 0}
+
+    scan_kwargs = {
+        "ProjectionExpression": SCAN_PROJECTION,
+        "ExpressionAttributeNames": REVIEW_PROJECTION_NAMES
+    }
+    if not full:
+        scan_kwargs["FilterExpression"] = UNSCORED_FILTER
+        scan_kwargs["ExpressionAttributeValues"] = {":v": SENTIMENT_VERSION}
+
+    def reviews_a_scorer():
+        if scan:
+            yield from parallel_scan(reviews_table, total_segments=segments, stats=stats, **scan_kwargs)
+            return
+        try:
+            yield from query_unscored(reviews_table, stats=stats, ProjectionExpression=REVIEW_PROJECTION,
+                                      ExpressionAttributeNames=REVIEW_PROJECTION_NAMES)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ValidationException":
+                raise
+            print(f"[!] Index {UNSCORED_INDEX} indisponible, scan filtré à la place.")
+            yield from parallel_scan(reviews_table, total_segments=segments, stats=stats, **scan_kwargs)
+
+    # Les labels s'arrêtent une marge avant les agrégats, eux-mêmes une marge avant le timeout
+    deadline = write_deadline(context, 2 * WRITE_DEADLINE_MARGIN_MS)
+    writeback = WriteBack(reviews_table, deadline=deadline)
+    aggregates = AggregateBuffer()
     count = 0
-    for item in items:
-        review_id = item["review_id"]
-        text = item.get("text", "")
-        sentiment = compute_sentiment_vader(text)
-        
-        # Mise à jour de l'item avec le sentiment
-        reviews_table.update_item(
-            Key={"review_id": review_id},
-            UpdateExpression="SET sentiment = :s",
-            ExpressionAttributeValues={":s": sentiment}
-        )
-        count += 1
-    
-    print(f"Sentiment updated for {count} reviews.")
-    
+    interrupted = False
+
+    def flush(batch):
+        compounds = score_texts_cached([item.get("text", "") for item in batch])
+        scored_at, scored_day = scored_timestamps()
+        for item, compound in zip(batch, compounds):
+            # Mise à jour de l'item avec le sentiment ; l'ancien label (UPDATED_OLD) est retiré de l'agrégat
+            sentiment = label_from_compound(compound)
+            writeback.submit(
+                {"review_id": item["review_id"]},
+                UPDATE_EXPRESSION,
+                {":s": sentiment, ":c": to_decimal(compound), ":v": SENTIMENT_VERSION, ":at": scored_at, ":day": scored_day,
+                 ":prev": ancien_scored_at(item)},
+                on_updated=aggregates.on_updated(item.get("restaurant_id"), sentiment, to_decimal(compound)),
+                condition=LABEL_CONDITION
+            )
+
+    try:
+        batch = []
+        for item in reviews_a_scorer():
+            if deadline is not None and time.monotonic() >= deadline:
+                # Le reste de l'index sera lu par la prochaine exécution
+                interrupted = True
+                break
+            batch.append(item)
+            count += 1
+            if len(batch) == SCORE_BATCH_SIZE:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        writeback.close()
+    aggregate_writes = aggregates.flush(deadline=write_deadline(context))
+
+    skipped = stats["scanned"] - count
+    failed_keys = [key["review_id"] for key, *_ in writeback.failed]
+    print(f"Lecture ({'scan, ' + str(segments) + ' segments' if scan else UNSCORED_INDEX}) : "
+          f"{stats['pages']} pages, {stats['scanned']} items lus.")
+    print(f"Cache des scores : {_score_cache_stats}, {len(_score_cache)} entrées en mémoire.")
+    print(f"Write-back : {writeback.stats}, débit final {writeback.limiter.rate:.1f}/s.")
+    if writeback.stats["already_applied"]:
+        print(f"[!] {writeback.stats['already_applied']} labels écrits par un essai sans réponse : deltas d'agrégat "
+              f"manquants, lancer `python -m src.aggregates --rebuild`.")
+    print(f"Agrégats restaurants : {aggregate_writes.stats}.")
+    print(f"Sentiment updated for {count - len(failed_keys)} reviews, {skipped} skipped, "
+          f"{len(failed_keys)} failed (version {SENTIMENT_VERSION}).")
+
     return {
         "statusCode": 200,
-        "body": f"Sentiment updated for {count} reviews."
+        "body": f"Sentiment updated for {count - len(failed_keys)} reviews, {skipped} skipped.",
+        "scored": count - len(failed_keys),
+        "skipped": skipped,
+        "failed_keys": failed_keys,
+        "interrupted": interrupted,
+        "writes": writeback.stats,
+        "aggregate_writes": aggregate_writes.stats,
+        "score_cache": dict(_score_cache_stats)
     }
@@ -8,6 +8,9 @@ dynamodb = boto3.resource("dynamodb")
 TABLE_NAME = "Restaurants"
 table = dynamodb.Table(TABLE_NAME)
 
+# Agrégats de sentiment maintenus par la Lambda SentimentIntensityAnalyzed
+aggregates_table = dynamodb.Table("RestaurantSentiment")
+
 def handler(event, context):
 
     path = event.get("path", "")
@@ -33,6 +36,9 @@ def get_restaurant_by_id(restaurant_id):
             "body": json.dumps({"message": f"Restaurant {restaurant_id} not found"})
         }
 
+    aggregate = aggregates_table.get_item(Key={"restaurant_id": restaurant_id}).get("Item")
+    item["sentiment"] = sentiment_summary(aggregate) if aggregate else None
+
     item = decimal_to_float(item)
     return {
         "statusCode": 200,
@@ -40,6 +46,26 @@ def get_restaurant_by_id(restaurant_id):
         "body": json.dumps(item)
     }
 
+def sentiment_summary(aggregate):
+    """
+    Résumé lisible d'un agrégat : nombre de reviews par label, moyenne et
+    écart-type du score compound.
+    """
+    count = int(aggregate.get("review_count", 0))
+    mean = float(aggregate.get("compound_sum", 0)) / count if count else None
+    stddev = None
+    if count:
+        stddev = max(0.0, float(aggregate.get("compound_sq_sum", 0)) / count - mean * mean) ** 0.5
+    return {
+        "review_count": count,
+        "positive": int(aggregate.get("positive_count", 0)),
+        "neutral": int(aggregate.get("neutral_count", 0)),
+        "negative": int(aggregate.get("negative_count", 0)),
+        "compound_mean": mean,
+        "compound_stddev": stddev,
+        "updated_at": aggregate.get("updated_at")
+    }
+
 def decimal_to_float(obj):
     """
     Convertit récursivement les valeurs decimal.Decimal en float,
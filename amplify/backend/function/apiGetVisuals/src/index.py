@@ -5,6 +5,9 @@ import decimal
 
 s3_client = boto3.client("s3")
 
+# Pointeurs écrits par FoodSentinelleGraphGeneratored vers la version courante de chaque graphique
+LATEST_PREFIX = "charts/latest/"
+
 def handler(event, context):
     path = event.get("path", "")
     http_method = event.get("httpMethod", "")
@@ -20,6 +23,16 @@ def handler(event, context):
         "headers": {"Content-Type": "application/json"}
     }
 
+def find_latest_chart(bucket, name):
+    # Un seul GET sur charts/latest/<name>.json, sans listing du bucket
+    if name.startswith('charts/'):
+        name = name[len('charts/'):]
+    try:
+        resp = s3_client.get_object(Bucket=bucket, Key=f"{LATEST_PREFIX}{name}.json")
+        return json.loads(resp["Body"].read()).get("key")
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
 def find_s3_object_with_prefix(bucket, prefix):
     # Assurons-nous que le préfixe commence par 'charts/'
     if not prefix.startswith('charts/'):
@@ -51,7 +64,20 @@ def get_presigned_url_with_prefix(file_key):
             "headers": {"Content-Type": "application/json"}
         }
 
-    matched_key = find_s3_object_with_prefix(BUCKET_NAME, file_key)
+    # Pointeur latest d'abord ; le listing par préfixe ne sert plus qu'aux anciens graphiques
+    try:
+        matched_key = find_latest_chart(BUCKET_NAME, file_key) or find_s3_object_with_prefix(BUCKET_NAME, file_key)
+    except Exception as e:
+        # Un pointeur illisible n'est pas un graphique absent : pas de 404
+        return {
+            "statusCode": 500,
+            "body": json.dumps({
+                "error": str(e),
+                "bucket": BUCKET_NAME,
+                "searched_prefix": f"charts/{file_key}"
+            }),
+            "headers": {"Content-Type": "application/json"}
+        }
     if not matched_key:
         return {
             "statusCode": 404,
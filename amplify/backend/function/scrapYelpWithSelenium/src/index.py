@@ -1,9 +1,16 @@
 import json
+import os
+import queue
+import random
+import threading
 import time
 import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 import requests
 
@@ -11,6 +18,9 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
 
 # ------------------------------
@@ -19,9 +29,40 @@ from selenium.webdriver.chrome.options import Options
 REGION_NAME = "eu-west-3"
 RESTAURANTS_TABLE_NAME = "Restaurants"
 REVIEWS_TABLE_NAME = "Reviews"
+# Index creux UnscoredIndex : chaque nouvelle review porte `unscored` (numéro de shard)
+# jusqu'à ce que SentimentIntensityAnalyzed la labellise
+UNSCORED_SHARDS = 16
 SECRET_NAME = "yelp_api_key"  # Le nom (ARN) du secret dans AWS Secrets Manager
-CHROME_BINARY_PATH = "/opt/bin/headless-chromium"
-CHROME_DRIVER_PATH = "/opt/bin/chromedriver"
+CHROME_BINARY_PATH = os.environ.get("CHROME_BINARY_PATH", "/opt/bin/headless-chromium")
+CHROME_DRIVER_PATH = os.environ.get("CHROME_DRIVER_PATH", "/opt/bin/chromedriver")
+YELP_WEB_URL = os.environ.get("YELP_WEB_URL", "https://www.yelp.com")
+PAGE_TIMEOUT = float(os.environ.get("PAGE_TIMEOUT", "10"))  # Secondes max pour charger une page et ses reviews
+
+# Réutilisation du driver entre invocations "warm" et budget de temps par invocation
+MAX_DRIVER_PAGES = int(os.environ.get("MAX_DRIVER_PAGES", "50"))  # Recyclage du driver après N pages
+TIME_SAFETY_MARGIN_MS = int(os.environ.get("TIME_SAFETY_MARGIN_MS", "5000"))  # Marge gardée avant le timeout Lambda
+
+# Profil navigateur : "default" (page complète) ou "lean" (eager, sans images/médias ni trackers)
+BROWSER_PROFILE = os.environ.get("BROWSER_PROFILE", "default")
+LEAN_WINDOW_SIZE = os.environ.get("LEAN_WINDOW_SIZE", "1280,900")
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*scorecardresearch.com*", "*bat.bing.com*", "*adsrvr.org*",
+]
+BLOCKED_URL_PATTERNS = [
+    pattern.strip()
+    for pattern in os.environ.get("BLOCKED_URL_PATTERNS", ",".join(DEFAULT_BLOCKED_URL_PATTERNS)).split(",")
+    if pattern.strip()
+]
+
+REVIEW_XPATH = '//p[contains(@class,"comment__09f24__D0cxf")]'
+RATING_XPATH = './/div[@role="img" and contains(@aria-label,"star rating")]'
+# Note et date sont cherchées dans l'élément de liste de chaque review, jamais appariées par position
+REVIEW_CONTAINER_XPATH = './ancestor::li[1]'
+DATE_XPATH = './/span[contains(@class, "css-1e4fdj9")]'
 
 # ------------------------------
 # Clients AWS
@@ -46,18 +87,243 @@ def put_restaurant(restaurant_id, name, address, rating):
     }
     restaurants_table.put_item(Item=item)
 
-def put_review(review_id, restaurant_id, text, rating, time_created):
+BATCH_SIZE = 25  # Limite de BatchWriteItem
+TABLE_KEYS = {
+    RESTAURANTS_TABLE_NAME: "restaurant_id",
+    REVIEWS_TABLE_NAME: "review_id"
+}
+THROTTLING_ERRORS = (
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded"
+)
+
+_deserializer = TypeDeserializer()
+
+class BatchWriter:
     """
-    Insert or update a record in 'Reviews' table.
+    Regroupe les put_item en BatchWriteItem de 25 éléments, envoyés par un thread
+    en arrière-plan pendant que Selenium continue de scraper.
+    Les UnprocessedItems et erreurs de throttling sont rejoués avec un backoff
+    exponentiel aléatoire ; ce qui échoue encore après `max_retries` va dans `failed`.
+    À utiliser en context manager pour vider le buffer avant la fin du handler.
+    BatchWriteItem n'accepte pas de condition : les items mis avec `if_absent` sont
+    écrits par des put_item conditionnels (en parallèle) ; un item déjà présent
+    n'est pas écrasé et va dans `existing`.
     """
-    item = {
-        "review_id": review_id,
-        "restaurant_id": restaurant_id,
-        "text": text,
-        "rating": rating,
-        "time_created": time_created
-    }
-    reviews_table.put_item(Item=item)
+
+    def __init__(self, max_retries=8, backoff_base=0.05, backoff_max=5.0, conditional_workers=8):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failed = []
+        self.existing = []
+        self.stats = {"items": 0, "batches": 0, "retries": 0, "failed": 0, "existing": 0, "consumed_capacity": {}}
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._conditional = ThreadPoolExecutor(max_workers=conditional_workers)
+        self._batches = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def put(self, table_name, item, if_absent=False):
+        with self._lock:
+            self._buffer.append((table_name, item, if_absent))
+            if len(self._buffer) < BATCH_SIZE:
+                return
+            batch, self._buffer = self._buffer, []
+        self._batches.put(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._batches.put(batch)
+        self._batches.join()
+
+    def close(self):
+        self.flush()
+        self._batches.put(None)
+        self._worker.join()
+        self._conditional.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        while True:
+            batch = self._batches.get()
+            try:
+                if batch is None:
+                    return
+                self._write_batch(batch)
+            finally:
+                self._batches.task_done()
+
+    def _compter(self, nom, n=1):
+        with self._stats_lock:
+            self.stats[nom] += n
+
+    def _echec(self, table_name, item):
+        with self._stats_lock:
+            self.failed.append((table_name, item))
+            self.stats["failed"] += 1
+
+    def _write_batch(self, batch):
+        conditionnels = [(table_name, item) for table_name, item, if_absent in batch if if_absent]
+        simples = [(table_name, item) for table_name, item, if_absent in batch if not if_absent]
+        if conditionnels:
+            list(self._conditional.map(self._put_if_absent, conditionnels))
+        if simples:
+            try:
+                self._batch_write(simples)
+            except Exception as e:
+                print(f"Échec d'écriture batch : {e}")
+                for table_name, item in simples:
+                    self._echec(table_name, item)
+
+    def _put_if_absent(self, entry):
+        table_name, item = entry
+        cle = TABLE_KEYS[table_name]
+        table = dynamodb.Table(table_name)
+        ambigu = False
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._compter("retries")
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+            try:
+                response = table.put_item(
+                    Item=item,
+                    ConditionExpression=f"attribute_not_exists({cle})",
+                    ReturnConsumedCapacity="TOTAL",
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD"
+                )
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                if code == "ConditionalCheckFailedException":
+                    # Après une erreur ambiguë, retrouver notre item veut dire que cet essai était passé
+                    ancien = {k: _deserializer.deserialize(v) for k, v in e.response.get("Item", {}).items()}
+                    if ambigu and ancien == item:
+                        self._compter("items")
+                    else:
+                        with self._stats_lock:
+                            self.existing.append(entry)
+                            self.stats["existing"] += 1
+                    return
+                if code in THROTTLING_ERRORS:
+                    continue
+                print(f"Échec du put conditionnel de {item.get(cle)} : {code}")
+                break
+            except Exception as e:
+                # Ambigu (le put a pu passer) : on retente, la condition tranchera
+                print(f"Put conditionnel de {item.get(cle)} interrompu ({e.__class__.__name__}), nouvel essai.")
+                ambigu = True
+                continue
+            unites = float(response.get("ConsumedCapacity", {}).get("CapacityUnits", 0))
+            with self._stats_lock:
+                consumed = self.stats["consumed_capacity"]
+                consumed[table_name] = consumed.get(table_name, 0.0) + unites
+                self.stats["items"] += 1
+            return
+        self._echec(table_name, item)
+
+    def _batch_write(self, batch):
+        # BatchWriteItem refuse deux requêtes sur la même clé : on garde la dernière
+        latest = {}
+        for table_name, item in batch:
+            latest[(table_name, item.get(TABLE_KEYS.get(table_name), id(item)))] = (table_name, item)
+        request_items = {}
+        for table_name, item in latest.values():
+            request_items.setdefault(table_name, []).append({"PutRequest": {"Item": item}})
+        self.stats["batches"] += 1
+        pending = len(latest)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+            try:
+                response = dynamodb.batch_write_item(RequestItems=request_items, ReturnConsumedCapacity="TOTAL")
+            except ClientError as e:
+                if e.response["Error"]["Code"] in THROTTLING_ERRORS:
+                    continue
+                raise
+            with self._stats_lock:
+                for entry in response.get("ConsumedCapacity", []):
+                    consumed = self.stats["consumed_capacity"]
+                    consumed[entry["TableName"]] = consumed.get(entry["TableName"], 0.0) + float(entry.get("CapacityUnits", 0))
+            unprocessed = response.get("UnprocessedItems") or {}
+            remaining = sum(len(put_requests) for put_requests in unprocessed.values())
+            self._compter("items", pending - remaining)
+            pending = remaining
+            if not unprocessed:
+                return
+            request_items = unprocessed
+        for table_name, put_requests in request_items.items():
+            for request in put_requests:
+                self._echec(table_name, request["PutRequest"]["Item"])
+
+# ------------------------------
+# Déduplication des reviews
+# ------------------------------
+# Namespace fixe (le même que src/dedup.py) : un même (restaurant, texte, date) donne toujours le même review_id
+REVIEW_ID_NAMESPACE = uuid.UUID("6f1c3d2e-8a4b-5c9d-9e0f-1a2b3c4d5e6f")
+BATCH_GET_SIZE = 100  # Limite de BatchGetItem
+
+# IDs déjà écrits ou vus en base, conservés tant que le conteneur reste chaud
+_seen_review_ids = set()
+
+def make_restaurant_id(alias):
+    return str(uuid.uuid5(REVIEW_ID_NAMESPACE, f"alias:{alias}"))
+
+def unscored_shard(review_id):
+    return zlib.crc32(review_id.encode("utf-8")) % UNSCORED_SHARDS
+
+def make_review_id(restaurant_id, text, time_created):
+    normalized = " ".join((text or "").split()).lower()
+    name = "\x1f".join([restaurant_id, normalized, (time_created or "").strip()])
+    return str(uuid.uuid5(REVIEW_ID_NAMESPACE, name))
+
+def existing_review_ids(review_ids):
+    """
+    Retourne les review_id déjà présents dans la table (BatchGetItem, projection sur la clé).
+    """
+    review_ids = list(dict.fromkeys(review_ids))
+    found = set()
+    for i in range(0, len(review_ids), BATCH_GET_SIZE):
+        request_items = {
+            REVIEWS_TABLE_NAME: {
+                "Keys": [{"review_id": r} for r in review_ids[i:i + BATCH_GET_SIZE]],
+                "ProjectionExpression": "review_id"
+            }
+        }
+        attempt = 0
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get("Responses", {}).get(REVIEWS_TABLE_NAME, []):
+                found.add(item["review_id"])
+            request_items = response.get("UnprocessedKeys") or {}
+            if request_items:
+                attempt += 1
+                time.sleep(random.uniform(0, min(5.0, 0.05 * (2 ** attempt))))
+    return found
+
+def filter_new_reviews(items):
+    """
+    Écarte les reviews déjà connues : doublons du lot, set local du conteneur,
+    puis vérification en base. Retourne (nouvelles reviews, nombre écartées).
+    """
+    unique = {}
+    for item in items:
+        unique.setdefault(item["review_id"], item)
+    candidates = [item for review_id, item in unique.items() if review_id not in _seen_review_ids]
+    remote = existing_review_ids([item["review_id"] for item in candidates]) if candidates else set()
+    _seen_review_ids.update(remote)
+    new_items = [item for item in candidates if item["review_id"] not in remote]
+    return new_items, len(items) - len(new_items)
 
 # ------------------------------
 # Secrets Manager : Récupérer la clé Yelp
@@ -76,117 +342,292 @@ def get_yelp_api_key():
 # ------------------------------
 # Selenium : Configuration
 # ------------------------------
-def get_selenium_driver():
+def get_selenium_driver(profile=None):
     """
     Initialise un WebDriver Chrome (headless).
     Assure-toi que /opt/chromedriver et /opt/headless-chromium existent dans la Layer.
+
+    Le profil "lean" (BROWSER_PROFILE=lean) rend la main dès le DOMContentLoaded,
+    n'affiche ni images ni médias, désactive les extensions, limite la taille de
+    fenêtre et bloque les URLs de BLOCKED_URL_PATTERNS (fonts, trackers...).
     """
+    profile = profile or BROWSER_PROFILE
     chrome_options = Options()
     chrome_options.binary_location = CHROME_BINARY_PATH
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
 
+    if profile == "lean":
+        chrome_options.page_load_strategy = "eager"
+        chrome_options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+
     # Utiliser le chromedriver inclus dans la Layer
     service = Service(CHROME_DRIVER_PATH)
     driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    if profile == "lean" and BLOCKED_URL_PATTERNS:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            print(f"Blocage d'URLs indisponible sur ce Chrome : {e}")
     return driver
 
+# ------------------------------
+# Selenium : Attente explicite
+# ------------------------------
+def wait_for_reviews(driver, timeout=PAGE_TIMEOUT):
+    """
+    Attend l'apparition des reviews dans le DOM (sortie dès le premier noeud trouvé).
+    Retourne [] si rien n'apparaît avant `timeout`.
+    """
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            EC.presence_of_all_elements_located((By.XPATH, REVIEW_XPATH))
+        )
+    except TimeoutException:
+        return []
+
+# ------------------------------
+# Selenium : Driver conservé entre invocations
+# ------------------------------
+_warm_driver = None
+_warm_driver_pages = 0
+
+def driver_is_alive(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        # Un chromedriver mort (conteneur dégelé) lève des erreurs urllib3/connexion, pas WebDriverException
+        return False
+
+def discard_warm_driver():
+    global _warm_driver, _warm_driver_pages
+    if _warm_driver is not None:
+        try:
+            _warm_driver.quit()
+        except Exception:
+            pass
+    _warm_driver = None
+    _warm_driver_pages = 0
+
+def get_warm_driver():
+    """
+    Retourne le driver du conteneur (créé au cold start puis réutilisé tant que
+    le conteneur reste chaud). Il est recréé s'il ne répond plus ou s'il a déjà
+    servi MAX_DRIVER_PAGES pages.
+    """
+    global _warm_driver, _warm_driver_pages
+    if _warm_driver is not None:
+        if _warm_driver_pages >= MAX_DRIVER_PAGES or not driver_is_alive(_warm_driver):
+            print("Driver périmé, recréation.")
+            discard_warm_driver()
+    if _warm_driver is None:
+        _warm_driver = get_selenium_driver()
+    _warm_driver_pages += 1
+    return _warm_driver
+
 # ------------------------------
 # Scraper Yelp (Selenium)
 # ------------------------------
-def scrape_yelp_business(alias):
+def scrape_yelp_business(alias, timings=None, timeout=PAGE_TIMEOUT, driver=None):
     """
     Ex : alias = "le-sushi-bar-paris" => https://www.yelp.com/biz/le-sushi-bar-paris
     Scrap les reviews, rating, etc.
+    Si `timings` est un dict, il est rempli avec la durée des étapes navigate / ready / extract.
+    Si `driver` est fourni, il n'est pas fermé à la fin (driver warm).
     """
     if not alias:
         return []
 
-    url = f"https://www.yelp.com/biz/{alias}"
-    driver = get_selenium_driver()
+    url = f"{YELP_WEB_URL}/biz/{alias}"
+    owns_driver = driver is None
+    if owns_driver:
+        driver = get_selenium_driver()
     reviews_data = []
+    stages = {}
 
     try:
-        driver.get(url)
-        time.sleep(4)  # Laisse le temps à la page de charger
+        driver.set_page_load_timeout(timeout)
+        start = time.perf_counter()
+        try:
+            driver.get(url)
+        except TimeoutException:
+            print(f"Timeout de chargement ({timeout}s) pour {alias}, on continue avec le DOM partiel.")
+        stages["navigate"] = round(time.perf_counter() - start, 4)
 
-        # Ex de récupération de reviews par XPATH
-        review_elements = driver.find_elements(By.XPATH, '//p[contains(@class,"comment__09f24__D0cxf")]')
-        rating_elements = driver.find_elements(By.XPATH, './/div[@role="img" and contains(@aria-label,"star rating")]')
-        date_elements = driver.find_elements(By.XPATH, './/span[contains(@class, "css-1e4fdj9")]')
+        # Attente explicite des reviews au lieu d'un sleep fixe
+        start = time.perf_counter()
+        review_elements = wait_for_reviews(driver, timeout=timeout)
+        stages["ready"] = round(time.perf_counter() - start, 4)
 
-        max_reviews = min(len(review_elements), 5)
-        for i in range(max_reviews):
-            text = review_elements[i].text or ""
+        start = time.perf_counter()
+        for element in review_elements[:5]:
+            text = element.text or ""
+            containers = element.find_elements(By.XPATH, REVIEW_CONTAINER_XPATH)
+            container = containers[0] if containers else element
+            rating_elements = container.find_elements(By.XPATH, RATING_XPATH)
+            date_elements = container.find_elements(By.XPATH, DATE_XPATH)
             rating_str = "0"
-            if i < len(rating_elements):
-                aria_label = rating_elements[i].get_attribute("aria-label")
+            if rating_elements:
+                aria_label = rating_elements[0].get_attribute("aria-label")
                 if aria_label:
                     rating_str = aria_label.split(" ")[0]  # "4" if "4 star rating"
 
-            date_str = date_elements[i].text if i < len(date_elements) else ""
+            date_str = date_elements[0].text if date_elements else ""
 
             reviews_data.append({
                 "text": text,
                 "rating": Decimal(rating_str),
                 "time_created": date_str
             })
+        stages["extract"] = round(time.perf_counter() - start, 4)
     finally:
-        driver.quit()
+        if owns_driver:
+            driver.quit()
+        if timings is not None:
+            timings.update(stages)
 
     return reviews_data
 
+# ------------------------------
+# Traitement d'un alias
+# ------------------------------
+def process_alias(alias, writer, queued_ids, timeout=PAGE_TIMEOUT):
+    """
+    Scrap un alias avec le driver warm puis met en file le restaurant et ses reviews
+    dans le BatchWriter (IDs des reviews ajoutés à `queued_ids`).
+    Retourne (nombre de reviews, timings).
+    """
+    timings = {}
+    try:
+        reviews = scrape_yelp_business(alias, timings=timings, timeout=timeout, driver=get_warm_driver())
+    except Exception as e:
+        # Le driver a planté (WebDriverException, ou erreur de connexion si chromedriver
+        # est mort) : on le jette et on retente une fois avec un driver neuf
+        print(f"Driver en échec sur {alias} ({e.__class__.__name__}), nouvel essai.")
+        discard_warm_driver()
+        timings = {}
+        reviews = scrape_yelp_business(alias, timings=timings, timeout=timeout, driver=get_warm_driver())
+    print(f"Found {len(reviews)} reviews for {alias}. Timings: {timings}")
+
+    # Enregistrez par ex. le restaurant
+    # (ID dérivé de l'alias : relancer le même alias réécrit le même restaurant)
+    rest_id = make_restaurant_id(alias)
+    writer.put(RESTAURANTS_TABLE_NAME, {
+        "restaurant_id": rest_id,
+        "name": f"Fake Restaurant from alias {alias}",
+        "address": "Paris, 75000",
+        "rating": Decimal("0")
+    })
+
+    # Enregistrez les reviews (seulement celles qui ne sont pas déjà en base)
+    items = []
+    for rev in reviews:
+        review_id = make_review_id(rest_id, rev["text"], rev["time_created"])
+        items.append({
+            "review_id": review_id,
+            "restaurant_id": rest_id,
+            "text": rev["text"],
+            "rating": rev["rating"],
+            "time_created": rev["time_created"],
+            "unscored": unscored_shard(review_id)
+        })
+    new_items, skipped = filter_new_reviews(items)
+    for item in new_items:
+        # Dernière garde : une exécution concurrente n'écrase jamais une review déjà stockée (et scorée)
+        writer.put(REVIEWS_TABLE_NAME, item, if_absent=True)
+        queued_ids.append(item["review_id"])
+        print(f"Queued review {item['review_id']}")
+    if skipped:
+        print(f"{skipped} reviews déjà connues ignorées pour {alias}.")
+
+    return len(new_items), timings
+
+def remaining_time_ms(context):
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return float("inf")
+    return context.get_remaining_time_in_millis()
+
 # ------------------------------
 # Handler principal
 # ------------------------------
 def lambda_handler(event, context):
     """
     1. Récupère la clé Yelp (facultatif, si vous voulez aussi appeler l'API Yelp)
-    2. Scrap en Selenium la page Yelp d'un business
+    2. Scrap en Selenium les pages Yelp d'une liste de business avec un driver
+       conservé entre invocations
     3. Stocke dans DynamoDB
+    4. Renvoie dans "continuation" les alias qui ne tiennent pas dans le temps restant,
+       et ceux encore en échec après leur nouvel essai
     """
-    # Param dans 'event', ex: event = {"alias": "le-sushi-bar-paris"}
-    alias = event.get("alias", "le-sushi-bar-paris")
-    print(f"Scraping Yelp alias: {alias}")
+    # Param dans 'event', ex: event = {"aliases": ["le-sushi-bar-paris", "chez-janou-paris"]}
+    # (l'ancien format {"alias": "le-sushi-bar-paris"} reste accepté)
+    aliases = event.get("aliases")
+    if aliases is None:
+        aliases = [event.get("alias", "le-sushi-bar-paris")]
+    print(f"Scraping {len(aliases)} Yelp aliases: {aliases}")
 
     # (Facultatif) : Récupération de la clé Yelp
     # yelp_key = get_yelp_api_key()
     # ... vous pourriez l'utiliser pour faire un call API, etc.
 
-    # Scrap
-    reviews = scrape_yelp_business(alias)
-    print(f"Found {len(reviews)} reviews.")
-
-    # Enregistrez par ex. le restaurant
-    # (Ici, on a besoin d'un 'restaurant_id' unique)
-    # Mettez un ID fixe ou construisez-en un
-    rest_id = str(uuid.uuid4())
-    put_restaurant(
-        restaurant_id=rest_id,
-        name=f"Fake Restaurant from alias {alias}",
-        address="Paris, 75000",
-        rating=Decimal("0")
-    )
-
-    # Enregistrez les reviews
-    for rev in reviews:
-        rev_id = str(uuid.uuid4())
-        put_review(
-            review_id=rev_id,
-            restaurant_id=rest_id,
-            text=rev["text"],
-            rating=rev["rating"],
-            time_created=rev["time_created"]
-        )
-        print(f"Inserted review {rev_id}")
+    results = {}
+    timings = {}
+    continuation = []
+    observed_ms = []
+    queued_ids = []
+    with BatchWriter() as writer:
+        for i, alias in enumerate(aliases):
+            # Coût estimé d'un alias : pire durée observée, sinon le timeout de page x2 (navigate + ready)
+            estimated_ms = max(observed_ms) if observed_ms else 2 * PAGE_TIMEOUT * 1000
+            budget_ms = remaining_time_ms(context) - TIME_SAFETY_MARGIN_MS
+            if budget_ms < estimated_ms:
+                continuation.extend(aliases[i:])
+                print(f"Budget de temps insuffisant ({budget_ms:.0f} ms), {len(aliases) - i} alias renvoyés en continuation.")
+                break
+            start = time.perf_counter()
+            try:
+                results[alias], timings[alias] = process_alias(alias, writer, queued_ids)
+            except Exception as e:
+                print(f"[!] {alias} en échec après un nouvel essai ({e.__class__.__name__}: {e}), renvoyé en continuation.")
+                discard_warm_driver()
+                continuation.append(alias)
+                continue
+            observed_ms.append((time.perf_counter() - start) * 1000)
+    # Vues seulement une fois le buffer vidé : une review dont l'écriture a échoué sera retentée
+    failed_ids = {item["review_id"] for table_name, item in writer.failed if table_name == REVIEWS_TABLE_NAME}
+    _seen_review_ids.update(r for r in queued_ids if r not in failed_ids)
+    print(f"Écritures DynamoDB : {writer.stats}")
 
+    total = sum(results.values())
     return {
         "statusCode": 200,
-        "body": f"Scraped {len(reviews)} reviews for alias '{alias}'."
+        "body": f"Stored {total} new reviews for {len(results)} aliases.",
+        "results": results,
+        "timings": timings,
+        "continuation": continuation,
+        "writes": {"items": writer.stats["items"], "failed": writer.stats["failed"], "existing": writer.stats["existing"],
+                   "consumed_capacity": writer.stats["consumed_capacity"]}
     }
 
 if __name__ == "__main__":
     # Test local
-    test_event = {"alias": "le-sushi-bar-paris"}
+    test_event = {"aliases": ["le-sushi-bar-paris"]}
     print(lambda_handler(test_event, None))
+    discard_warm_driver()
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Rebuilds the precompiled VADER lexicon shipped with the sentiment Lambda.
+set -e
+cd "$(dirname "$0")/../.."
+python -m src.lexicon_snapshot amplify/backend/function/SentimentIntensityAnalyzed/src/vader_lexicon.marshal
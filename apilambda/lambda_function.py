@@ -6,6 +6,8 @@ import decimal
 dynamodb = boto3.resource("dynamodb")
 s3_client = boto3.client("s3")
 
+LATEST_PREFIX = "charts/latest/"
+
 def lambda_handler(event, context):
     path = event.get("path", "")
     http_method = event.get("httpMethod", "")
@@ -42,6 +44,16 @@ def get_restaurants():
         "headers": {"Content-Type": "application/json"}
     }
 
+def find_latest_chart(bucket, name):
+    # charts/latest/<name>.json points at the current content-addressed chart: one GET, no listing
+    if name.startswith("charts/"):
+        name = name[len("charts/"):]
+    try:
+        resp = s3_client.get_object(Bucket=bucket, Key=f"{LATEST_PREFIX}{name}.json")
+        return json.loads(resp["Body"].read()).get("key")
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
 def find_s3_object_with_prefix(bucket, prefix):
     resp = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)
     if "Contents" not in resp:
@@ -62,7 +74,15 @@ def get_presigned_url_with_prefix(file_key):
             "body": json.dumps({"error": "Missing ?file= param"}),
             "headers": {"Content-Type": "application/json"}
         }
-    matched_key = find_s3_object_with_prefix(bucket_name, file_key)
+    try:
+        matched_key = find_latest_chart(bucket_name, file_key) or find_s3_object_with_prefix(bucket_name, file_key)
+    except Exception as e:
+        # Un pointeur illisible n'est pas un graphique absent
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+            "headers": {"Content-Type": "application/json"}
+        }
     if not matched_key:
         return {
             "statusCode": 404,
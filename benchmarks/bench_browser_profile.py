@@ -0,0 +1,114 @@
+"""
+Compare page load time and Chrome RSS between the "default" and "lean"
+profiles of get_selenium_driver in the scrapYelpWithSelenium Lambda.
+
+By default pages come from benchmarks/fixtures on a local server; pass
+--base-url https://www.yelp.com --alias <alias> to measure real pages.
+Point CHROME_BINARY_PATH / CHROME_DRIVER_PATH at a local Chrome when the
+Lambda layer paths (/opt/bin) do not exist.
+
+    python -m benchmarks.bench_browser_profile --repeat 3
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import time
+
+from benchmarks.bench_scrapers import list_aliases, start_fixture_server
+
+LAMBDA_INDEX = os.path.join(
+    os.path.dirname(__file__), "..", "amplify", "backend", "function", "scrapYelpWithSelenium", "src", "index.py"
+)
+
+
+def load_lambda_module():
+    spec = importlib.util.spec_from_file_location("scrap_yelp_lambda", LAMBDA_INDEX)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def process_tree_rss_kb(root_pid):
+    # Sum VmRSS of root_pid and all its descendants (chromedriver -> chrome -> renderers).
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def bench_profile(module, profile, urls, repeat):
+    load_times = []
+    peak_rss = 0
+    start = time.perf_counter()
+    driver = module.get_selenium_driver(profile=profile)
+    startup = time.perf_counter() - start
+    try:
+        for _ in range(repeat):
+            for url in urls:
+                start = time.perf_counter()
+                try:
+                    driver.get(url)
+                except module.TimeoutException:
+                    pass
+                module.wait_for_reviews(driver, timeout=module.PAGE_TIMEOUT)
+                load_times.append(time.perf_counter() - start)
+                peak_rss = max(peak_rss, process_tree_rss_kb(driver.service.process.pid))
+    finally:
+        driver.quit()
+    return {
+        "startup_ms": startup * 1000,
+        "median_load_ms": statistics.median(load_times) * 1000,
+        "p90_load_ms": sorted(load_times)[int(0.9 * (len(load_times) - 1))] * 1000,
+        "peak_rss_mb": peak_rss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--base-url", default=None, help="Defaults to a local server over benchmarks/fixtures.")
+    parser.add_argument("--alias", action="append", help="Alias to load (repeatable). Defaults to every fixture.")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_fixture_server()
+    aliases = args.alias or list_aliases()
+    urls = [f"{base_url}/biz/{alias}" for alias in aliases]
+
+    module = load_lambda_module()
+    print(f"{'profile':<9} {'startup (ms)':>13} {'median load (ms)':>17} {'p90 load (ms)':>14} {'peak RSS (MB)':>14}")
+    try:
+        for profile in ("default", "lean"):
+            r = bench_profile(module, profile, urls, args.repeat)
+            print(f"{profile:<9} {r['startup_ms']:>13.1f} {r['median_load_ms']:>17.1f} "
+                  f"{r['p90_load_ms']:>14.1f} {r['peak_rss_mb']:>14.1f}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare VADER cold starts (fresh interpreter: import + analyzer build + first
+score) with and without the precompiled lexicon snapshot.
+
+    python -m benchmarks.bench_cold_start --runs 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from src.lexicon_snapshot import build_snapshot
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from src.lexicon_snapshot import load_analyzer
+analyzer = load_analyzer(sys.argv[1])
+loaded = time.perf_counter()
+analyzer.polarity_scores("The sushi was great but the service was painfully slow :(")
+scored = time.perf_counter()
+print(json.dumps({"load_ms": (loaded - start) * 1000, "total_ms": (scored - start) * 1000,
+                  "snapshot": not hasattr(analyzer, "lexicon_full_filepath")}))
+"""
+
+
+def cold_start(snapshot_path):
+    out = subprocess.run([sys.executable, "-c", PROBE, snapshot_path], check=True, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(out.stdout)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "vader_lexicon.marshal")
+        build_snapshot(snapshot)
+        paths = {"text files": os.path.join(tmp, "missing.marshal"), "snapshot": snapshot}
+        results = {name: [] for name in paths}
+        # Interleave the two paths so page cache and CPU frequency affect both equally.
+        for _ in range(args.runs):
+            for name, path in paths.items():
+                run = cold_start(path)
+                if run["snapshot"] != (name == "snapshot"):
+                    raise SystemExit(f"{name} run did not take the expected path")
+                results[name].append(run)
+
+    print(f"{args.runs} cold starts per path, Python {sys.version.split()[0]}")
+    print(f"{'path':<11} {'load p50':>9} {'total p50':>10} {'total p99':>10} {'total max':>10}")
+    for name, runs in results.items():
+        load = [r["load_ms"] for r in runs]
+        total = [r["total_ms"] for r in runs]
+        print(f"{name:<11} {statistics.median(load):>7.1f}ms {statistics.median(total):>8.1f}ms "
+              f"{percentile(total, 0.99):>8.1f}ms {max(total):>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Time simulate_restaurants on synthetic label counts against a fixed budget,
+for each number of processes, and check the results do not depend on it.
+
+    python -m benchmarks.bench_montecarlo --restaurants 10000 --draws 10000 --workers 1 2 4 --budget 60
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.montecarlo import DEFAULT_CHUNK, simulate_restaurants
+
+
+def synthetic_counts(n, seed=42):
+    # Heavy-tailed review counts (most restaurants have a few reviews, some
+    # have thousands) split over skewed sentiment mixes.
+    rng = np.random.default_rng(seed)
+    totals = np.minimum((rng.pareto(1.2, size=n) * 5).astype(np.int64) + 1, 5000)
+    mixes = rng.dirichlet([4.0, 1.0, 1.5], size=n)
+    return rng.multinomial(totals, mixes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=10000)
+    parser.add_argument("--draws", type=int, default=10000)
+    parser.add_argument("--horizon", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    parser.add_argument("--budget", type=float, default=60.0, help="Seconds allowed per run.")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    counts = synthetic_counts(args.restaurants)
+    distinct = len(np.unique(counts, axis=0))
+    print(f"{args.restaurants} synthetic restaurants ({distinct} distinct count vectors, "
+          f"{int(counts.sum())} reviews), {args.draws} draws, {os.cpu_count()} CPUs, budget {args.budget:.0f}s")
+    print(f"{'workers':>7} {'seconds':>9} {'restaurants/s':>14} {'speedup':>8} {'budget':>7}")
+    baseline = None
+    reference = None
+    failed = False
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = simulate_restaurants(counts, draws=args.draws, horizon=args.horizon, seed=7,
+                                      workers=workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = result
+        elif any(not np.array_equal(result[key], reference[key]) for key in reference):
+            raise SystemExit(f"Results differ with {workers} workers")
+        baseline = baseline or elapsed
+        within = elapsed <= args.budget
+        failed = failed or not within
+        print(f"{workers:>7} {elapsed:>9.2f} {args.restaurants / elapsed:>14.0f} {baseline / elapsed:>7.2f}x "
+              f"{'PASS' if within else 'FAIL':>7}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
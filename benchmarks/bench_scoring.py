@@ -0,0 +1,60 @@
+"""
+Measure how score_many scales with the number of processes on a synthetic
+review corpus.
+
+    python -m benchmarks.bench_scoring --reviews 50000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import time
+
+from src.scoring import score_many
+
+POSITIVE = ["great", "delicious", "friendly", "amazing", "love", "excellent", "fresh", "perfect", "cozy", "tasty"]
+NEGATIVE = ["awful", "cold", "rude", "slow", "dirty", "bland", "terrible", "overpriced", "disappointing", "noisy"]
+NEUTRAL = ["the", "food", "service", "table", "we", "ordered", "waiter", "dinner", "menu", "restaurant",
+           "was", "and", "a", "very", "with", "our", "sushi", "pasta", "wine", "dessert"]
+EXTRAS = ["!", "not", "but", "really", ":)", "never again", "highly recommend"]
+
+
+def synthetic_corpus(n, seed=42):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        words = rng.choices(NEUTRAL, k=rng.randint(8, 40))
+        words += rng.choices(POSITIVE + NEGATIVE, k=rng.randint(1, 5))
+        words += rng.choices(EXTRAS, k=rng.randint(0, 2))
+        rng.shuffle(words)
+        corpus.append(" ".join(words).capitalize() + ".")
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--chunksize", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.reviews)
+    print(f"{args.reviews} synthetic reviews, chunksize {args.chunksize}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'seconds':>9} {'reviews/s':>11} {'speedup':>8}")
+    baseline = None
+    reference = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        results = score_many(corpus, workers=workers, chunksize=args.chunksize)
+        elapsed = time.perf_counter() - start
+        labels = [r["label"] for r in results]
+        if reference is None:
+            reference = labels
+        elif labels != reference:
+            raise SystemExit(f"Results differ with {workers} workers")
+        baseline = baseline or elapsed
+        print(f"{workers:>7} {elapsed:>9.2f} {args.reviews / elapsed:>11.0f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
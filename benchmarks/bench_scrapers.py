@@ -0,0 +1,87 @@
+"""
+Compare the browserless HTTP fast path with the Selenium path on the saved
+Yelp fixtures in benchmarks/fixtures, served from a local HTTP server.
+
+    python -m benchmarks.bench_scrapers --repeat 5
+    python -m benchmarks.bench_scrapers --no-selenium
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from src.http_scraper import fetch_reviews_http
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    # /biz/<alias> -> fixtures/<alias>.html
+    def translate_path(self, path):
+        alias = path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        return os.path.join(FIXTURES_DIR, f"{alias}.html")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FixtureHandler, directory=FIXTURES_DIR))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def list_aliases():
+    return sorted(f[:-len(".html")] for f in os.listdir(FIXTURES_DIR) if f.endswith(".html"))
+
+
+def time_call(fn, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-selenium", action="store_true", help="Only measure the HTTP path.")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server()
+    driver = None
+    if not args.no_selenium:
+        from src.driver_pool import build_headless_driver
+        driver = build_headless_driver()
+
+    print(f"{'alias':<28} {'http (ms)':>10} {'http n':>9} {'selenium (ms)':>14} {'selenium n':>11} {'speedup':>8}")
+    try:
+        for alias in list_aliases():
+            http_s, http_reviews = time_call(
+                lambda: fetch_reviews_http(alias, base_url=base_url), args.repeat
+            )
+            http_n = "fallback" if http_reviews is None else str(len(http_reviews))
+            sel_col, sel_n, speedup = "-", "-", "-"
+            if driver is not None:
+                from src.main import scrape_reviews_selenium
+                sel_s, sel_reviews = time_call(
+                    lambda: scrape_reviews_selenium(alias, driver=driver, timeout=5, base_url=base_url), args.repeat
+                )
+                sel_col, sel_n = f"{sel_s * 1000:.1f}", str(len(sel_reviews))
+                speedup = f"{sel_s / http_s:.1f}x" if http_reviews is not None else "-"
+            print(f"{alias:<28} {http_s * 1000:>10.1f} {http_n:>9} {sel_col:>14} {sel_n:>11} {speedup:>8}")
+    finally:
+        if driver is not None:
+            driver.quit()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
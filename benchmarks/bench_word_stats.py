@@ -0,0 +1,79 @@
+"""
+Compare the per-token loop formerly used by the chart generators with the
+batched word_sentiment_stats engine on a synthetic labelled corpus.
+
+    python -m benchmarks.bench_word_stats --reviews 200000
+"""
+import argparse
+import random
+import re
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from benchmarks.bench_scoring import synthetic_corpus
+from src.word_stats import SENTIMENT_MAP, word_sentiment_stats
+
+
+def legacy_word_stats(items):
+    # The original construire_nuage_points_mots aggregation, kept as the baseline.
+    word_freq = Counter()
+    word_sent_sum = defaultdict(float)
+    word_sent_count = Counter()
+    for it in items:
+        text = it.get("text", "")
+        sentiment_label = it.get("sentiment")
+        if not text or not sentiment_label:
+            continue
+        score = SENTIMENT_MAP.get(sentiment_label, 0.0)
+        txt_clean = re.sub(r"[^a-z0-9àâçéèêëîïôûùüÿñæœ\s]", " ", text.lower()).strip()
+        for w in txt_clean.split():
+            word_freq[w] += 1
+            word_sent_sum[w] += score
+            word_sent_count[w] += 1
+    return {w: (freq, word_sent_sum[w] / word_sent_count[w]) for w, freq in word_freq.items() if freq >= 2}
+
+
+def labelled_corpus(n, seed=7, vocabulary=20000):
+    # synthetic_corpus has a tiny vocabulary: add a long tail of rarer words and punctuation.
+    rng = random.Random(seed)
+    labels = list(SENTIMENT_MAP)
+    items = []
+    for text in synthetic_corpus(n, seed=seed):
+        tail = " ".join(f"mot{int(rng.paretovariate(1.2)) % vocabulary}" for _ in range(rng.randint(2, 8)))
+        items.append({"text": f"{text} {tail}, déjà-vu!", "sentiment": rng.choice(labels)})
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    items = labelled_corpus(args.reviews)
+    timings = {"legacy loop": [], "word_stats": []}
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        legacy = legacy_word_stats(items)
+        timings["legacy loop"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        stats = word_sentiment_stats(items)
+        timings["word_stats"].append(time.perf_counter() - start)
+
+    if set(legacy) != set(stats.words):
+        raise SystemExit("Vocabularies differ")
+    expected = np.array([legacy[w] for w in stats.words])
+    if not (np.array_equal(expected[:, 0], stats.freq) and np.allclose(expected[:, 1], stats.mean_sentiment)):
+        raise SystemExit("Frequencies or mean sentiments differ")
+
+    print(f"{args.reviews} reviews, {len(stats)} words kept, best of {args.repeat}")
+    baseline = min(timings["legacy loop"])
+    for name, values in timings.items():
+        best = min(values)
+        print(f"{name:<12} {best:>7.2f}s {args.reviews / best:>10.0f} reviews/s {baseline / best:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
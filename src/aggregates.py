@@ -0,0 +1,174 @@
+import argparse
+import threading
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from src.db import REVIEWS_TABLE_NAME, SENTIMENT_AGGREGATES_TABLE_NAME, BatchWriter, dynamodb
+from src.scan import ScanStats, parallel_scan
+from src.writeback import WriteBack
+
+aggregates_table = dynamodb.Table(SENTIMENT_AGGREGATES_TABLE_NAME)
+
+LABEL_COUNTS = {
+    "POSITIVE": "positive_count",
+    "NEGATIVE": "negative_count",
+    "NEUTRAL": "neutral_count"
+}
+AGGREGATE_FIELDS = ("review_count", "positive_count", "negative_count", "neutral_count", "compound_sum", "compound_sq_sum")
+
+def to_decimal(value):
+    if isinstance(value, int):
+        return Decimal(value)
+    return Decimal(str(round(float(value), 8)))
+
+def review_contribution(sentiment, compound, sign=1):
+    # A review counts in its restaurant's aggregate once it carries sentiment_compound.
+    if compound is None or sentiment not in LABEL_COUNTS:
+        return {}
+    compound = float(compound)
+    return {
+        "review_count": sign,
+        LABEL_COUNTS[sentiment]: sign,
+        "compound_sum": sign * compound,
+        "compound_sq_sum": sign * compound * compound
+    }
+
+def sentiment_delta(old_attributes, sentiment, compound):
+    """
+    Change to apply to the restaurant aggregate when a review goes from
+    `old_attributes` (UPDATED_OLD values, possibly empty) to the new label.
+    """
+    delta = review_contribution(sentiment, compound)
+    old = review_contribution(old_attributes.get("sentiment"), old_attributes.get("sentiment_compound"), sign=-1)
+    for field, value in old.items():
+        delta[field] = delta.get(field, 0) + value
+    return delta
+
+def aggregate_summary(item):
+    # Mean and standard deviation of the compound score from an aggregate item.
+    count = int(item.get("review_count", 0))
+    if count <= 0:
+        return {"review_count": 0, "mean": None, "stddev": None}
+    mean = float(item.get("compound_sum", 0)) / count
+    variance = max(0.0, float(item.get("compound_sq_sum", 0)) / count - mean * mean)
+    return {"review_count": count, "mean": mean, "stddev": variance ** 0.5}
+
+# An ADD is not idempotent: each flush stamps its updates with a token and only
+# applies them if the item does not carry that token yet, so a retry of an update
+# that went through (ambiguous timeout) is not counted twice.
+AGGREGATE_CONDITION = "attribute_not_exists(last_batch) OR last_batch <> :batch"
+
+class AggregateBuffer:
+    """
+    Collects per-review deltas and applies them as one atomic ADD update per
+    restaurant on flush(), so a run costs O(restaurants) aggregate writes.
+    """
+
+    def __init__(self, table=aggregates_table):
+        self.table = table
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def add(self, restaurant_id, delta):
+        if not restaurant_id or not delta:
+            return
+        with self._lock:
+            totals = self._deltas.setdefault(restaurant_id, {})
+            for field, value in delta.items():
+                totals[field] = totals.get(field, 0) + value
+
+    def on_updated(self, restaurant_id, sentiment, compound):
+        # WriteBack callback: UPDATED_OLD holds the previous label/compound, so a rescore moves buckets.
+        return lambda old: self.add(restaurant_id, sentiment_delta(old, sentiment, compound))
+
+    def flush(self, workers=4, rate=25.0, deadline=None):
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        now = datetime.now(timezone.utc).isoformat()
+        batch = uuid.uuid4().hex
+        writeback = WriteBack(self.table, workers=workers, rate=rate, deadline=deadline)
+        try:
+            for restaurant_id, totals in deltas.items():
+                fields = [f for f in AGGREGATE_FIELDS if totals.get(f)]
+                if not fields:
+                    continue
+                values = {f":{f}": to_decimal(totals[f]) for f in fields}
+                values[":now"] = now
+                values[":batch"] = batch
+                writeback.submit(
+                    {"restaurant_id": restaurant_id},
+                    "ADD " + ", ".join(f"{f} :{f}" for f in fields) + " SET updated_at = :now, last_batch = :batch",
+                    values,
+                    condition=AGGREGATE_CONDITION
+                )
+        finally:
+            writeback.close()
+        return writeback
+
+def rebuild_aggregates(segments=4, resource=dynamodb):
+    """
+    Recomputes every aggregate from the Reviews table and overwrites the
+    aggregates table; restaurants without scored reviews are deleted.
+    """
+    stats = ScanStats()
+    totals = {}
+    for review in parallel_scan(
+        resource.Table(REVIEWS_TABLE_NAME),
+        total_segments=segments,
+        projection="restaurant_id, sentiment, sentiment_compound",
+        filter_expression="attribute_exists(sentiment_compound)",
+        stats=stats
+    ):
+        contribution = review_contribution(review.get("sentiment"), review.get("sentiment_compound"))
+        if not contribution:
+            continue
+        restaurant_totals = totals.setdefault(review.get("restaurant_id", ""), dict.fromkeys(AGGREGATE_FIELDS, 0))
+        for field, value in contribution.items():
+            restaurant_totals[field] += value
+    totals.pop("", None)
+
+    now = datetime.now(timezone.utc).isoformat()
+    table = resource.Table(SENTIMENT_AGGREGATES_TABLE_NAME)
+    stale = [item["restaurant_id"] for item in parallel_scan(table, total_segments=1, projection="restaurant_id")
+             if item["restaurant_id"] not in totals]
+    with BatchWriter(resource) as writer:
+        for restaurant_id, restaurant_totals in totals.items():
+            item = {field: to_decimal(value) for field, value in restaurant_totals.items()}
+            item["restaurant_id"] = restaurant_id
+            item["updated_at"] = now
+            writer.put(SENTIMENT_AGGREGATES_TABLE_NAME, item)
+    for restaurant_id in stale:
+        table.delete_item(Key={"restaurant_id": restaurant_id})
+    return {"scan": stats, "restaurants": len(totals), "deleted": len(stale), "writes": writer}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Per-restaurant sentiment aggregates.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every aggregate from the Reviews table.")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments for --rebuild.")
+    parser.add_argument("restaurant_ids", nargs="*", help="Restaurants to show.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.rebuild:
+        result = rebuild_aggregates(segments=args.segments)
+        print(f"Scan: {result['scan']}")
+        print(f"Rebuilt {result['restaurants']} aggregates, deleted {result['deleted']} stale ones.")
+        print(f"DynamoDB writes: {result['writes'].summary()}")
+    for restaurant_id in args.restaurant_ids:
+        item = aggregates_table.get_item(Key={"restaurant_id": restaurant_id}).get("Item")
+        if not item:
+            print(f"{restaurant_id}: no aggregate")
+            continue
+        summary = aggregate_summary(item)
+        if not summary["review_count"]:
+            print(f"{restaurant_id}: no scored reviews")
+            continue
+        print(f"{restaurant_id}: {summary['review_count']} reviews, "
+              f"{int(item.get('positive_count', 0))} positive / {int(item.get('neutral_count', 0))} neutral / "
+              f"{int(item.get('negative_count', 0))} negative, mean compound {summary['mean']:.3f} "
+              f"(sd {summary['stddev']:.3f}), updated {item.get('updated_at', '?')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.config import INGEST_CHECKPOINT_PATH
+from src.db import BatchWriter
+from src.dedup import SeenReviews
+from src.driver_pool import DriverPool
+from src.main import IngestContext, add_ingest_arguments, build_yelp_client, ingest_city, remember_written_reviews
+from src.ratelimit import TokenBucket
+
+class Checkpoint:
+    """
+    JSON file recording, per city, the restaurants whose reviews are safely in
+    DynamoDB and whether the whole city is done. Restaurants are first marked
+    pending and only committed after the BatchWriter has been flushed.
+    """
+
+    def __init__(self, path=INGEST_CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.state = {"cities": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def _city(self, city):
+        return self.state["cities"].setdefault(city, {"done": False, "restaurants": []})
+
+    def is_city_done(self, city):
+        with self._lock:
+            return self.state["cities"].get(city, {}).get("done", False)
+
+    def done_restaurants(self, city):
+        with self._lock:
+            return set(self.state["cities"].get(city, {}).get("restaurants", []))
+
+    def mark_pending(self, city, restaurant_id):
+        with self._lock:
+            self._pending.setdefault(city, set()).add(restaurant_id)
+
+    def commit(self, city, city_done=False, failed=()):
+        # Restaurants in `failed` lost a write: they are dropped from pending so a
+        # resume redoes them, and the city cannot be marked done. Returns False then.
+        with self._lock:
+            pending = self._pending.pop(city, set())
+            lost = pending & set(failed)
+            entry = self._city(city)
+            entry["restaurants"] = sorted(set(entry["restaurants"]) | (pending - lost))
+            entry["done"] = entry["done"] or (city_done and not lost)
+            self._save()
+            return not lost
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def failed_restaurants(writer):
+    # Cities share the writer, so a failure is attributed through the restaurant_id
+    # carried by both restaurant and review items, not through the failure counter.
+    return {item.get("restaurant_id") for _, item in list(writer.failed)}
+
+def flush_and_commit(ctx, checkpoint, city, city_done=False):
+    ctx.writer.flush()
+    remember_written_reviews(ctx)
+    return checkpoint.commit(city, city_done=city_done, failed=failed_restaurants(ctx.writer))
+
+def run_city(ctx, checkpoint, city, flush_every):
+    if checkpoint.is_city_done(city):
+        print(f"[=] {city} already done in checkpoint, skipping.")
+        return None
+    done = checkpoint.done_restaurants(city)
+    completed = [0]
+    intact = [True]
+
+    def on_restaurant_done(restaurant_id):
+        checkpoint.mark_pending(city, restaurant_id)
+        completed[0] += 1
+        if completed[0] % flush_every == 0:
+            intact[0] = flush_and_commit(ctx, checkpoint, city) and intact[0]
+
+    stats = ingest_city(ctx, city, done_restaurants=done, on_restaurant_done=on_restaurant_done)
+    city_done = stats["failures"] == 0 and intact[0]
+    stats["complete"] = flush_and_commit(ctx, checkpoint, city, city_done=city_done) and city_done
+    return stats
+
+def read_cities(args):
+    cities = list(args.cities)
+    if args.cities_file:
+        with open(args.cities_file) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    cities.append(line)
+    return list(dict.fromkeys(cities))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest Yelp restaurants and reviews for many cities in parallel, with checkpoint/resume.")
+    parser.add_argument("cities", nargs="*", help="City names.")
+    parser.add_argument("--cities-file", help="File with one city per line (# starts a comment).")
+    parser.add_argument("--city-workers", type=int, default=4, help="Number of cities processed concurrently.")
+    parser.add_argument("--rate", type=float, default=5.0, help="Yelp API calls per second, shared by every city.")
+    parser.add_argument("--checkpoint", default=INGEST_CHECKPOINT_PATH, help="Checkpoint file used to resume an interrupted run.")
+    parser.add_argument("--reset", action="store_true", help="Ignore and overwrite an existing checkpoint.")
+    parser.add_argument("--flush-every", type=int, default=10, help="Flush writes and checkpoint every N restaurants of a city.")
+    add_ingest_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    cities = read_cities(args)
+    if not cities:
+        print("No cities given.")
+        return
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint)
+    client = build_yelp_client(args, rate_limiter=TokenBucket(rate=args.rate, capacity=args.rate))
+    workers = max(1, args.workers)
+    totals = {"cities_done": 0, "cities_skipped": 0, "cities_failed": 0,
+              "restaurants": 0, "reviews": 0, "failures": 0}
+    start = time.perf_counter()
+    with DriverPool(size=workers, max_pages=args.max_pages_per_driver) as pool, \
+            ThreadPoolExecutor(max_workers=workers) as executor, \
+            BatchWriter() as writer:
+        ctx = IngestContext(client, pool, executor, writer, SeenReviews(), args)
+        with ThreadPoolExecutor(max_workers=max(1, args.city_workers)) as city_executor:
+            futures = {
+                city_executor.submit(run_city, ctx, checkpoint, city, max(1, args.flush_every)): city
+                for city in cities
+            }
+            for future in as_completed(futures):
+                city = futures[future]
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    totals["cities_failed"] += 1
+                    print(f"[!] City {city} failed: {e.__class__.__name__}: {e}")
+                    continue
+                if stats is None:
+                    totals["cities_skipped"] += 1
+                    continue
+                totals["cities_done" if stats["complete"] else "cities_failed"] += 1
+                for key in ("restaurants", "reviews", "failures"):
+                    totals[key] += stats[key]
+                print(f"[OK] {city}: {stats}")
+    elapsed = time.perf_counter() - start
+    print("---- Throughput report ----")
+    print(f"Cities: {totals['cities_done']} done, {totals['cities_skipped']} skipped, {totals['cities_failed']} failed")
+    print(f"Restaurants: {totals['restaurants']} ({totals['restaurants'] / elapsed:.2f}/s)")
+    print(f"Reviews: {totals['reviews']} ({totals['reviews'] / elapsed:.2f}/s)")
+    print(f"Scraping failures: {totals['failures']}, write failures: {writer.stats['failed']}")
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"DynamoDB writes: {writer.summary()}")
+    if client.cache is not None:
+        print(f"Yelp cache: {client.cache.stats} (hit ratio {client.cache.hit_ratio():.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import YELP_CACHE_PATH
+
+DEFAULT_TTLS = {
+    "search": 24 * 3600,
+    "reviews": 6 * 3600
+}
+
+def normalize_params(params):
+    normalized = {}
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.lower().split())
+        normalized[str(key)] = value
+    return normalized
+
+def make_cache_key(endpoint, path, params):
+    payload = json.dumps([endpoint, path, normalize_params(params)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed cache for decoded JSON responses, keyed by endpoint + path +
+    normalized params. Entries expire after the endpoint TTL and the least
+    recently used ones are evicted above `max_entries`.
+    """
+
+    def __init__(self, path=YELP_CACHE_PATH, ttls=None, default_ttl=3600, max_entries=5000):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, body TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint, path, params=None):
+        key = make_cache_key(endpoint, path, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            body, created_at = row
+            if now - created_at > self.ttl_for(endpoint):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return json.loads(body)
+
+    def set(self, endpoint, path, params, value):
+        key = make_cache_key(endpoint, path, params)
+        now = time.time()
+        body = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, body, now, now)
+            )
+            self.stats["writes"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.stats["evictions"] += overflow
+
+    def hit_ratio(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
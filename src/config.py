@@ -5,3 +5,10 @@ load_dotenv()
 
 YELP_API_KEY = os.environ.get("YELP_API_KEY", "")
 BASE_YELP_URL = "https://api.yelp.com/v3"
+YELP_WEB_URL = "https://www.yelp.com"
+YELP_CACHE_PATH = os.environ.get("YELP_CACHE_PATH", ".cache/yelp_responses.sqlite")
+SEEN_REVIEWS_PATH = os.environ.get("SEEN_REVIEWS_PATH", ".cache/seen_reviews.txt")
+INGEST_CHECKPOINT_PATH = os.environ.get("INGEST_CHECKPOINT_PATH", ".cache/ingest_checkpoint.json")
+SCORE_CACHE_PATH = os.environ.get("SCORE_CACHE_PATH", ".cache/sentiment_scores.sqlite")
+VADER_SNAPSHOT_PATH = os.environ.get("VADER_SNAPSHOT_PATH", ".cache/vader_lexicon.marshal")
+WORD_PARTIALS_DIR = os.environ.get("WORD_PARTIALS_DIR", ".cache/word_partials")
@@ -1,26 +1,287 @@
+import queue
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource("dynamodb", region_name="eu-west-3")
 
-restaurants_table = dynamodb.Table("Restaurants")
-reviews_table = dynamodb.Table("Reviews")
+RESTAURANTS_TABLE_NAME = "Restaurants"
+REVIEWS_TABLE_NAME = "Reviews"
+SENTIMENT_AGGREGATES_TABLE_NAME = "RestaurantSentiment"
 
-def put_restaurant(restaurant_id, name, address, rating, yelp_id):
-    item = {
+restaurants_table = dynamodb.Table(RESTAURANTS_TABLE_NAME)
+reviews_table = dynamodb.Table(REVIEWS_TABLE_NAME)
+
+TABLE_KEYS = {
+    RESTAURANTS_TABLE_NAME: "restaurant_id",
+    REVIEWS_TABLE_NAME: "review_id",
+    SENTIMENT_AGGREGATES_TABLE_NAME: "restaurant_id"
+}
+
+# Sparse GSI of the reviews still waiting for a label: writers set `unscored` to a
+# shard number, scorers REMOVE it, so the index only holds the scoring backlog.
+UNSCORED_INDEX = "UnscoredIndex"
+UNSCORED_SHARDS = 16
+
+BATCH_SIZE = 25  # BatchWriteItem hard limit
+BATCH_GET_SIZE = 100  # BatchGetItem hard limit
+THROTTLING_ERRORS = (
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded"
+)
+
+def restaurant_item(restaurant_id, name, address, rating, yelp_id):
+    return {
         "restaurant_id": restaurant_id,
         "name": name,
         "address": address,
         "rating": rating,
         "yelp_id": yelp_id
     }
-    restaurants_table.put_item(Item=item)
 
-def put_review(review_id, restaurant_id, text, rating, time_created):
-    item = {
+def unscored_shard(review_id):
+    # Spreads the backlog over several index partitions (one query thread each).
+    return zlib.crc32(review_id.encode("utf-8")) % UNSCORED_SHARDS
+
+def review_item(review_id, restaurant_id, text, rating, time_created):
+    return {
         "review_id": review_id,
         "restaurant_id": restaurant_id,
         "text": text,
         "rating": rating,
-        "time_created": time_created
+        "time_created": time_created,
+        "unscored": unscored_shard(review_id)
     }
-    reviews_table.put_item(Item=item)
+
+def put_restaurant(restaurant_id, name, address, rating, yelp_id):
+    item = restaurant_item(restaurant_id, name, address, rating, yelp_id)
+    restaurants_table.put_item(Item=item)
+
+def existing_review_ids(review_ids, resource=dynamodb):
+    review_ids = list(dict.fromkeys(review_ids))
+    found = set()
+    for i in range(0, len(review_ids), BATCH_GET_SIZE):
+        request_items = {
+            REVIEWS_TABLE_NAME: {
+                "Keys": [{"review_id": r} for r in review_ids[i:i + BATCH_GET_SIZE]],
+                "ProjectionExpression": "review_id"
+            }
+        }
+        attempt = 0
+        while request_items:
+            response = resource.batch_get_item(RequestItems=request_items)
+            for item in response.get("Responses", {}).get(REVIEWS_TABLE_NAME, []):
+                found.add(item["review_id"])
+            request_items = response.get("UnprocessedKeys") or {}
+            if request_items:
+                attempt += 1
+                time.sleep(random.uniform(0, min(5.0, 0.05 * (2 ** attempt))))
+    return found
+
+_deserializer = TypeDeserializer()
+
+def _deserialize(attributes):
+    # Error responses carry the item in the low-level (typed) format.
+    return {name: _deserializer.deserialize(value) for name, value in attributes.items()}
+
+class BatchWriter:
+    """
+    Buffers put requests and sends them as 25-item BatchWriteItem calls from a
+    background thread. UnprocessedItems and throttling errors are retried with
+    jittered exponential backoff; items still unprocessed after `max_retries`
+    end up in `failed`. Use as a context manager so the tail is flushed.
+
+    BatchWriteItem cannot carry a condition, so items put with `if_absent` are
+    written by conditional put_item calls (`conditional_workers` threads): an
+    item whose key is already stored is left untouched and listed in `existing`.
+    """
+
+    def __init__(self, resource=dynamodb, max_retries=8, backoff_base=0.05, backoff_max=5.0, max_pending_batches=40,
+                 conditional_workers=8):
+        self.resource = resource
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failed = []
+        self.existing = []
+        self.stats = {"items": 0, "batches": 0, "retries": 0, "failed": 0, "existing": 0, "consumed_capacity": {}}
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._conditional = ThreadPoolExecutor(max_workers=conditional_workers, thread_name_prefix="dynamodb-conditional-put")
+        self._batches = queue.Queue(maxsize=max_pending_batches)
+        self._worker = threading.Thread(target=self._run, name="dynamodb-batch-writer", daemon=True)
+        self._worker.start()
+
+    def put(self, table_name, item, if_absent=False):
+        with self._lock:
+            self._buffer.append((table_name, item, if_absent))
+            if len(self._buffer) < BATCH_SIZE:
+                return
+            batch, self._buffer = self._buffer, []
+        self._batches.put(batch)
+
+    def put_restaurant(self, restaurant_id, name, address, rating, yelp_id):
+        self.put(RESTAURANTS_TABLE_NAME, restaurant_item(restaurant_id, name, address, rating, yelp_id))
+
+    def put_review(self, review_id, restaurant_id, text, rating, time_created):
+        # A review already stored (and its sentiment) is never overwritten.
+        self.put(REVIEWS_TABLE_NAME, review_item(review_id, restaurant_id, text, rating, time_created), if_absent=True)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._batches.put(batch)
+        self._batches.join()
+
+    def close(self):
+        self.flush()
+        self._batches.put(None)
+        self._worker.join()
+        self._conditional.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        while True:
+            batch = self._batches.get()
+            try:
+                if batch is None:
+                    return
+                self._write_batch(batch)
+            finally:
+                self._batches.task_done()
+
+    def _to_request_items(self, batch):
+        # BatchWriteItem rejects two requests on the same key: keep the last one.
+        latest = {}
+        for table_name, item in batch:
+            key_attr = TABLE_KEYS.get(table_name)
+            key = (table_name, item[key_attr]) if key_attr in item else (table_name, id(item))
+            latest[key] = (table_name, item)
+        request_items = {}
+        for table_name, item in latest.values():
+            request_items.setdefault(table_name, []).append({"PutRequest": {"Item": item}})
+        return request_items
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    def _record_capacity(self, response):
+        # BatchWriteItem returns a list of entries, PutItem a single one.
+        entries = response.get("ConsumedCapacity", [])
+        with self._stats_lock:
+            consumed = self.stats["consumed_capacity"]
+            for entry in [entries] if isinstance(entries, dict) else entries:
+                table_name = entry.get("TableName")
+                consumed[table_name] = consumed.get(table_name, 0.0) + float(entry.get("CapacityUnits", 0))
+
+    def _record_failed(self, request_items):
+        with self._stats_lock:
+            for table_name, requests in request_items.items():
+                for request in requests:
+                    self.failed.append((table_name, request["PutRequest"]["Item"]))
+                    self.stats["failed"] += 1
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def _write_batch(self, batch):
+        conditional = [(table_name, item) for table_name, item, if_absent in batch if if_absent]
+        plain = [(table_name, item) for table_name, item, if_absent in batch if not if_absent]
+        if conditional:
+            list(self._conditional.map(self._put_if_absent, conditional))
+        if plain:
+            try:
+                self._batch_write(plain)
+            except Exception as e:
+                print(f"[!] Batch write failed: {e}")
+                self._record_failed(self._to_request_items(plain))
+
+    def _put_if_absent(self, entry):
+        table_name, item = entry
+        key_attr = TABLE_KEYS[table_name]
+        table = self.resource.Table(table_name)
+        ambiguous = False
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(self._backoff(attempt))
+            try:
+                response = table.put_item(
+                    Item=item,
+                    ConditionExpression=f"attribute_not_exists({key_attr})",
+                    ReturnConsumedCapacity="TOTAL",
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD"
+                )
+            except ClientError as e:
+                code = e.response["Error"]["Code"]
+                if code == "ConditionalCheckFailedException":
+                    # After an ambiguous error, finding our own item means that attempt went through.
+                    if ambiguous and _deserialize(e.response.get("Item", {})) == item:
+                        self._count("items")
+                    else:
+                        with self._stats_lock:
+                            self.existing.append(entry)
+                            self.stats["existing"] += 1
+                    return
+                if code in THROTTLING_ERRORS:
+                    continue
+                print(f"[!] Conditional put failed for {item.get(key_attr)}: {code}")
+                break
+            except Exception as e:
+                # Ambiguous (the put may have been applied): retried, the condition tells.
+                print(f"[!] Conditional put of {item.get(key_attr)} interrupted: {e.__class__.__name__}, retrying.")
+                ambiguous = True
+                continue
+            self._record_capacity(response)
+            self._count("items")
+            return
+        self._record_failed({table_name: [{"PutRequest": {"Item": item}}]})
+
+    def _batch_write(self, batch):
+        request_items = self._to_request_items(batch)
+        self.stats["batches"] += 1
+        pending = sum(len(requests) for requests in request_items.values())
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                time.sleep(self._backoff(attempt))
+            try:
+                response = self.resource.batch_write_item(
+                    RequestItems=request_items,
+                    ReturnConsumedCapacity="TOTAL"
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] in THROTTLING_ERRORS:
+                    continue
+                raise
+            self._record_capacity(response)
+            unprocessed = response.get("UnprocessedItems") or {}
+            remaining = sum(len(requests) for requests in unprocessed.values())
+            self.stats["items"] += pending - remaining
+            pending = remaining
+            if not unprocessed:
+                return
+            request_items = unprocessed
+        self._record_failed(request_items)
+
+    def summary(self):
+        capacity = ", ".join(f"{t}: {u:.1f} WCU" for t, u in self.stats["consumed_capacity"].items()) or "n/a"
+        return (f"{self.stats['items']} items in {self.stats['batches']} batches, "
+                f"{self.stats['retries']} retries, {self.stats['failed']} failed, "
+                f"{self.stats['existing']} already stored, consumed {capacity}")
@@ -0,0 +1,66 @@
+import os
+import threading
+import uuid
+
+from src.config import SEEN_REVIEWS_PATH
+from src.db import existing_review_ids
+
+# Fixed namespace: the same (restaurant, text, date) always maps to the same review_id.
+REVIEW_ID_NAMESPACE = uuid.UUID("6f1c3d2e-8a4b-5c9d-9e0f-1a2b3c4d5e6f")
+
+def normalize_review_text(text):
+    return " ".join((text or "").split()).lower()
+
+def make_review_id(restaurant_id, text, time_created):
+    name = "\x1f".join([restaurant_id, normalize_review_text(text), (time_created or "").strip()])
+    return str(uuid.uuid5(REVIEW_ID_NAMESPACE, name))
+
+class SeenReviews:
+    """
+    Append-only file of review IDs already written, loaded into a set at
+    startup so known reviews are dropped before any DynamoDB call.
+    """
+
+    def __init__(self, path=SEEN_REVIEWS_PATH):
+        self.path = path
+        self._ids = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self._ids.update(line.strip() for line in f if line.strip())
+
+    def __contains__(self, review_id):
+        return review_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add_many(self, review_ids):
+        with self._lock:
+            new_ids = [r for r in review_ids if r not in self._ids]
+            if not new_ids:
+                return
+            self._ids.update(new_ids)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write("\n".join(new_ids) + "\n")
+
+def filter_new_reviews(items, seen):
+    # items are review items carrying a deterministic review_id.
+    # Returns (new_items, stats); IDs found in DynamoDB are remembered locally.
+    unique = {}
+    for item in items:
+        unique.setdefault(item["review_id"], item)
+    candidates = [item for review_id, item in unique.items() if review_id not in seen]
+    remote = existing_review_ids([item["review_id"] for item in candidates]) if candidates else set()
+    if remote:
+        seen.add_many(remote)
+    new_items = [item for item in candidates if item["review_id"] not in remote]
+    stats = {
+        "scraped": len(items),
+        "duplicates": len(items) - len(unique),
+        "skipped_local": len(unique) - len(candidates),
+        "skipped_remote": len(remote),
+        "new": len(new_items)
+    }
+    return new_items, stats
@@ -0,0 +1,123 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+
+def build_headless_driver():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=options)
+
+
+def is_driver_alive(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        # A dead chromedriver surfaces as urllib3/connection errors, not WebDriverException.
+        return False
+
+
+class DriverPool:
+    """
+    Keeps `size` long-lived Chrome drivers and hands them out to worker threads.
+    Slots start empty so the first drivers boot in parallel on first use.
+    A driver is recycled after `max_pages` pages and replaced when it crashes.
+    """
+
+    def __init__(self, size=2, max_pages=20, driver_factory=build_headless_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory
+        self._slots = queue.Queue()
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"created": 0, "recycled": 0, "replaced": 0, "closed": 0, "pages": 0}
+        for _ in range(size):
+            self._slots.put(None)
+
+    def _create(self):
+        driver = self.driver_factory()
+        with self._lock:
+            self._pages[id(driver)] = 0
+            self.stats["created"] += 1
+        return driver
+
+    def _discard(self, driver, reason):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+            self.stats[reason] += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        driver = self._slots.get()
+        acquired = None
+        try:
+            if driver is not None and not is_driver_alive(driver):
+                self._discard(driver, "replaced")
+                driver = None
+            acquired = driver if driver is not None else self._create()
+        finally:
+            if acquired is None:
+                # Whatever failed, the slot goes back so acquire() cannot starve.
+                self._slots.put(None)
+        return acquired
+
+    def release(self, driver, broken=False):
+        with self._lock:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+            self.stats["pages"] += 1
+            pages = self._pages[id(driver)]
+        try:
+            if broken:
+                self._discard(driver, "replaced")
+                driver = None
+            elif pages >= self.max_pages:
+                self._discard(driver, "recycled")
+                driver = None
+            if self._closed and driver is not None:
+                self._discard(driver, "closed")
+                driver = None
+        finally:
+            self._slots.put(driver)
+
+    @contextmanager
+    def driver(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception as e:
+            self.release(driver, broken=isinstance(e, WebDriverException) or not is_driver_alive(driver))
+            raise
+        except BaseException:
+            self.release(driver)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if driver is not None:
+                self._discard(driver, "closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
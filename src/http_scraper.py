@@ -0,0 +1,78 @@
+import time
+from decimal import Decimal, InvalidOperation
+
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+
+from src.config import YELP_WEB_URL
+from src.readiness import DATE_XPATH, RATING_XPATH, REVIEW_CONTAINER_XPATH, REVIEW_XPATH
+
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+_session = None
+
+def get_session(pool_size=10):
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(HTTP_HEADERS)
+        _session = session
+    return _session
+
+def _rating_from_label(label):
+    try:
+        return Decimal(label.split(" ")[0])
+    except (AttributeError, IndexError, InvalidOperation):
+        return Decimal("0")
+
+def parse_reviews_html(page_html, max_reviews=5):
+    # Returns None when the review selectors are missing so callers can fall back to Selenium.
+    if not page_html or not page_html.strip():
+        return None  # lxml raises ParserError on an empty document
+    tree = lxml_html.fromstring(page_html)
+    review_elements = tree.xpath(REVIEW_XPATH)
+    if not review_elements:
+        return None
+    reviews_data = []
+    for element in review_elements[:max_reviews]:
+        container = next(iter(element.xpath(REVIEW_CONTAINER_XPATH)), element)
+        ratings = container.xpath(RATING_XPATH)
+        dates = container.xpath(DATE_XPATH)
+        reviews_data.append({
+            "text": element.text_content().strip(),
+            "rating": _rating_from_label(ratings[0].get("aria-label") if ratings else None),
+            "time_created": dates[0].text_content().strip() if dates else ""
+        })
+    return reviews_data
+
+def fetch_reviews_http(yelp_alias_or_slug, max_reviews=5, session=None, timeout=10, base_url=YELP_WEB_URL, timings=None):
+    if not yelp_alias_or_slug:
+        return []
+    session = session or get_session()
+    url = f"{base_url}/biz/{yelp_alias_or_slug}"
+    start = time.perf_counter()
+    try:
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"    [!] HTTP fetch failed for {yelp_alias_or_slug}: {e.__class__.__name__}")
+        return None
+    finally:
+        if timings is not None:
+            timings["fetch"] = round(time.perf_counter() - start, 4)
+    start = time.perf_counter()
+    reviews = parse_reviews_html(response.content, max_reviews=max_reviews)
+    if timings is not None:
+        timings["parse"] = round(time.perf_counter() - start, 4)
+    return reviews
@@ -0,0 +1,85 @@
+import argparse
+import marshal
+import os
+import zlib
+
+from vaderSentiment import vaderSentiment
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from src.config import VADER_SNAPSHOT_PATH
+
+SNAPSHOT_FORMAT = 2
+
+LEXICON_FILES = ("vader_lexicon.txt", "emoji_utf8_lexicon.txt")
+
+def lexicon_fingerprint():
+    # CRC of the installed lexicon files: much cheaper than importlib.metadata,
+    # and stable across installs of the same vaderSentiment release.
+    package_dir = os.path.dirname(os.path.abspath(vaderSentiment.__file__))
+    fingerprint = []
+    for name in LEXICON_FILES:
+        with open(os.path.join(package_dir, name), "rb") as f:
+            fingerprint.append(zlib.crc32(f.read()))
+    return tuple(fingerprint)
+
+def vader_version():
+    # importlib.metadata scans every installed distribution: only called when
+    # building a snapshot, or when none can be loaded.
+    from importlib import metadata
+    try:
+        return metadata.version("vaderSentiment")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def build_snapshot(path=VADER_SNAPSHOT_PATH):
+    # Parses the lexicon text files once and dumps the resulting dicts with marshal.
+    analyzer = SentimentIntensityAnalyzer()
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "source": lexicon_fingerprint(),
+        "vader_version": vader_version(),
+        "lexicon": analyzer.lexicon,
+        "emojis": analyzer.emojis
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(payload, f)
+    os.replace(tmp_path, path)
+    return len(analyzer.lexicon), len(analyzer.emojis)
+
+def load_snapshot_analyzer(path=VADER_SNAPSHOT_PATH):
+    # Raises when the snapshot is missing, unreadable or built from other lexicon files.
+    with open(path, "rb") as f:
+        payload = marshal.loads(f.read())  # marshal.load(f) reads the file in tiny chunks
+    if payload.get("format") != SNAPSHOT_FORMAT or payload.get("source") != lexicon_fingerprint():
+        raise ValueError(f"stale VADER snapshot {path}")
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon = payload["lexicon"]
+    analyzer.emojis = payload["emojis"]
+    analyzer.vader_version = payload["vader_version"]
+    return analyzer
+
+def load_analyzer(path=VADER_SNAPSHOT_PATH):
+    """
+    Returns a SentimentIntensityAnalyzer built from the marshal snapshot when it
+    is usable, otherwise through the regular text-file parsing. Either way its
+    `vader_version` attribute holds the vaderSentiment release.
+    """
+    try:
+        return load_snapshot_analyzer(path)
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        analyzer = SentimentIntensityAnalyzer()
+        analyzer.vader_version = vader_version()
+        return analyzer
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the precompiled VADER lexicon snapshot.")
+    parser.add_argument("output", nargs="*", default=[VADER_SNAPSHOT_PATH], help="Snapshot files to write.")
+    args = parser.parse_args(argv)
+    for path in args.output:
+        words, emojis = build_snapshot(path)
+        print(f"Wrote {path}: {words} lexicon entries, {emojis} emojis, {os.path.getsize(path)} bytes.")
+
+if __name__ == "__main__":
+    main()
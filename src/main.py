@@ -1,63 +1,148 @@
-import sys
-import uuid
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal
-import time
 
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 
-from src.yelp_api import get_restaurants_by_location
-from src.db import put_restaurant, put_review
+from src.config import YELP_WEB_URL
+from src.cache import ResponseCache
+from src.yelp_api import YelpClient
+from src.db import REVIEWS_TABLE_NAME, BatchWriter, review_item
+from src.dedup import SeenReviews, filter_new_reviews, make_review_id
+from src.driver_pool import DriverPool
+from src.http_scraper import fetch_reviews_http
+from src.readiness import (
+    DATE_XPATH, DEFAULT_READY_TIMEOUT, RATING_XPATH, REVIEW_CONTAINER_XPATH, StageTimer, wait_for_reviews
+)
 
-def scrape_reviews_selenium(yelp_alias_or_slug, max_reviews=5):
+def scrape_reviews_selenium(yelp_alias_or_slug, max_reviews=5, driver=None, timeout=DEFAULT_READY_TIMEOUT, timings=None, base_url=YELP_WEB_URL):
     reviews_data = []
     if not yelp_alias_or_slug:
         return reviews_data
-    url = f"https://www.yelp.com/biz/{yelp_alias_or_slug}"
-    driver = webdriver.Chrome()
+    url = f"{base_url}/biz/{yelp_alias_or_slug}"
+    timer = StageTimer()
+    owns_driver = driver is None
+    if owns_driver:
+        driver = webdriver.Chrome()
     try:
-        driver.get(url)
-        time.sleep(3)
-        review_elements = driver.find_elements(By.XPATH, '//p[contains(@class, "comment__09f24__D0cxf")]')
-        for element in review_elements[:max_reviews]:
+        driver.set_page_load_timeout(timeout)
+        with timer.stage("navigate"):
             try:
-                review_text = element.text
-            except:
-                review_text = ""
-            try:
-                rating_el = element.find_element(By.XPATH, './/div[@role="img" and contains(@aria-label,"star rating")]')
-                rating_str = rating_el.get_attribute("aria-label")
-                rating_value = rating_str.split(" ")[0]
-            except:
-                rating_value = "0"
-            try:
-                date_el = element.find_element(By.XPATH, './/span[contains(@class, "css-1e4fdj9")]')
-                time_created = date_el.text
-            except:
-                time_created = ""
-            try:
-                rating_decimal = Decimal(rating_value)
-            except:
-                rating_decimal = Decimal("0")
-            reviews_data.append({
-                "text": review_text,
-                "rating": rating_decimal,
-                "time_created": time_created
-            })
+                driver.get(url)
+            except TimeoutException:
+                print(f"    [!] Page load timed out after {timeout}s for {yelp_alias_or_slug}, using partial DOM.")
+        with timer.stage("ready"):
+            review_elements = wait_for_reviews(driver, timeout=timeout)
+        with timer.stage("extract"):
+            for element in review_elements[:max_reviews]:
+                try:
+                    review_text = element.text
+                except:
+                    review_text = ""
+                try:
+                    container = element.find_element(By.XPATH, REVIEW_CONTAINER_XPATH)
+                except:
+                    container = element
+                try:
+                    rating_el = container.find_element(By.XPATH, RATING_XPATH)
+                    rating_str = rating_el.get_attribute("aria-label")
+                    rating_value = rating_str.split(" ")[0]
+                except:
+                    rating_value = "0"
+                try:
+                    date_el = container.find_element(By.XPATH, DATE_XPATH)
+                    time_created = date_el.text
+                except:
+                    time_created = ""
+                try:
+                    rating_decimal = Decimal(rating_value)
+                except:
+                    rating_decimal = Decimal("0")
+                reviews_data.append({
+                    "text": review_text,
+                    "rating": rating_decimal,
+                    "time_created": time_created
+                })
     finally:
-        driver.quit()
+        if owns_driver:
+            driver.quit()
+        if timings is not None:
+            timings.update(timer.timings)
     return reviews_data
 
-def main():
-    if len(sys.argv) > 1:
-        location = sys.argv[1]
-    else:
-        location = "Paris"
+def scrape_with_pool(pool, alias, max_reviews=5, retries=1, timeout=DEFAULT_READY_TIMEOUT):
+    # Raises the last driver error once retries are exhausted: callers must not
+    # mistake a crashed scrape for a restaurant without reviews.
+    for attempt in range(retries + 1):
+        timings = {}
+        try:
+            with pool.driver() as driver:
+                reviews = scrape_reviews_selenium(alias, max_reviews=max_reviews, driver=driver, timeout=timeout, timings=timings)
+                return {"reviews": reviews, "timings": timings, "path": "selenium"}
+        except WebDriverException as e:
+            print(f"    [!] Driver failure on {alias} (attempt {attempt + 1}): {e.__class__.__name__}")
+            if attempt == retries:
+                raise
+
+def scrape_alias(pool, alias, max_reviews=5, mode="selenium", timeout=DEFAULT_READY_TIMEOUT):
+    # "auto" tries the browserless fast path first and only boots Chrome when the
+    # review selectors are missing from the raw HTML; "http" never falls back.
+    if mode in ("http", "auto"):
+        timings = {}
+        reviews = fetch_reviews_http(alias, max_reviews=max_reviews, timeout=timeout, timings=timings)
+        if reviews is not None or mode == "http":
+            return {"reviews": reviews or [], "timings": timings, "path": "http"}
+        print(f"    [~] Review selectors missing in HTML for {alias}, falling back to Selenium.")
+    return scrape_with_pool(pool, alias, max_reviews=max_reviews, timeout=timeout)
+
+def add_ingest_arguments(parser):
+    parser.add_argument("--limit", type=int, default=10, help="Number of restaurants to fetch per city (paginated past 50).")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk Yelp response cache.")
+    parser.add_argument("--refresh", action="store_true", help="Re-fetch Yelp responses and overwrite the cache.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of concurrent Chrome drivers used for scraping.")
+    parser.add_argument("--max-pages-per-driver", type=int, default=20, help="Recycle a driver after this many pages.")
+    parser.add_argument("--mode", choices=("selenium", "http", "auto"), default="selenium",
+                        help="Scraper path: Chrome only, raw HTTP only, or raw HTTP with a Selenium fallback.")
+    parser.add_argument("--page-timeout", type=float, default=DEFAULT_READY_TIMEOUT, help="Seconds to wait for a page and its reviews.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch Yelp restaurants for a city and scrape their reviews into DynamoDB.")
+    parser.add_argument("location", nargs="?", default="Paris")
+    add_ingest_arguments(parser)
+    return parser.parse_args(argv)
+
+def build_yelp_client(args, rate_limiter=None):
+    cache = None if args.no_cache else ResponseCache()
+    return YelpClient(cache=cache, refresh=args.refresh, rate_limiter=rate_limiter)
+
+class IngestContext:
+    # Resources shared by every city of a run: Yelp client, drivers, scrape threads, writer, seen-set.
+    def __init__(self, client, pool, executor, writer, seen, args):
+        self.client = client
+        self.pool = pool
+        self.executor = executor
+        self.writer = writer
+        self.seen = seen
+        self.args = args
+        self.dedup_totals = {"scraped": 0, "duplicates": 0, "skipped_local": 0, "skipped_remote": 0, "new": 0}
+        self.queued_ids = []
+        self.lock = threading.Lock()
+
+def ingest_city(ctx, location, done_restaurants=(), on_restaurant_done=None):
+    args = ctx.args
+    stats = {"restaurants": 0, "reviews": 0, "failures": 0, "skipped_restaurants": 0}
     print(f"Fetching restaurants for location: {location}")
-    restaurants = get_restaurants_by_location(location=location, limit=10)
+    restaurants = ctx.client.search_businesses(location=location, total=args.limit)
     print(f"Found {len(restaurants)} restaurants.")
+    futures = {}
     for r in restaurants:
         restaurant_id = r["id"]
+        if restaurant_id in done_restaurants:
+            stats["skipped_restaurants"] += 1
+            continue
         alias = r.get("alias", "")
         name = r.get("name", "")
         address = ""
@@ -66,34 +151,83 @@ def main():
         rating_float = r.get("rating", 0)
         rating = Decimal(str(rating_float))
         yelp_id = restaurant_id
-        put_restaurant(
+        ctx.writer.put_restaurant(
             restaurant_id=restaurant_id,
             name=name,
             address=address,
             rating=rating,
             yelp_id=yelp_id
         )
-        print(f"[+] Inserted Restaurant: {name} (ID: {restaurant_id})")
+        stats["restaurants"] += 1
+        print(f"[+] Queued Restaurant: {name} (ID: {restaurant_id})")
         if alias:
             print(f"    [*] Scraping reviews for alias: {alias} ...")
-            reviews = scrape_reviews_selenium(alias, max_reviews=5)
-            print(f"      -> Found {len(reviews)} reviews via Selenium for {name}.")
+            future = ctx.executor.submit(scrape_alias, ctx.pool, alias, 5, mode=args.mode, timeout=args.page_timeout)
+            futures[future] = (restaurant_id, name)
         else:
             print(f"    [!] No alias found for {name}. Skipping scraping.")
-            reviews = []
-        for rev in reviews:
-            review_id = str(uuid.uuid4())
-            text = rev.get("text", "")
-            review_rating = rev.get("rating", Decimal("0"))
-            time_created = rev.get("time_created", "")
-            put_review(
-                review_id=review_id,
+            if on_restaurant_done:
+                on_restaurant_done(restaurant_id)
+    for future in as_completed(futures):
+        restaurant_id, name = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            stats["failures"] += 1
+            print(f"    [!] Scraping failed for {name}: {e.__class__.__name__}: {e}")
+            continue
+        reviews = result["reviews"]
+        print(f"      -> Found {len(reviews)} reviews via {result['path']} for {name}. Timings: {result['timings']}")
+        items = [
+            review_item(
+                review_id=make_review_id(restaurant_id, rev.get("text", ""), rev.get("time_created", "")),
                 restaurant_id=restaurant_id,
-                text=text,
-                rating=review_rating,
-                time_created=time_created
+                text=rev.get("text", ""),
+                rating=rev.get("rating", Decimal("0")),
+                time_created=rev.get("time_created", "")
             )
-            print(f"    [++] Inserted Review: {review_id}")
+            for rev in reviews
+        ]
+        new_items, dedup_stats = filter_new_reviews(items, ctx.seen)
+        with ctx.lock:
+            for key in ctx.dedup_totals:
+                ctx.dedup_totals[key] += dedup_stats[key]
+            ctx.queued_ids.extend(item["review_id"] for item in new_items)
+        for item in new_items:
+            # Final duplicate guard: a run racing past the check above never overwrites a stored (scored) review.
+            ctx.writer.put(REVIEWS_TABLE_NAME, item, if_absent=True)
+            print(f"    [++] Queued Review: {item['review_id']}")
+        stats["reviews"] += len(new_items)
+        skipped = dedup_stats["skipped_local"] + dedup_stats["skipped_remote"] + dedup_stats["duplicates"]
+        if skipped:
+            print(f"    [=] Skipped {skipped} already known reviews for {name}.")
+        if on_restaurant_done:
+            on_restaurant_done(restaurant_id)
+    return stats
+
+def remember_written_reviews(ctx):
+    # Call after the writer has been flushed: queued IDs that did not fail are now in DynamoDB
+    # (written by this run, or already stored and left untouched).
+    failed_ids = {item["review_id"] for table_name, item in ctx.writer.failed if table_name == REVIEWS_TABLE_NAME}
+    with ctx.lock:
+        queued_ids, ctx.queued_ids = ctx.queued_ids, []
+    ctx.seen.add_many(r for r in queued_ids if r not in failed_ids)
+
+def main(argv=None):
+    args = parse_args(argv)
+    client = build_yelp_client(args)
+    workers = max(1, args.workers)
+    with DriverPool(size=workers, max_pages=args.max_pages_per_driver) as pool, \
+            ThreadPoolExecutor(max_workers=workers) as executor, \
+            BatchWriter() as writer:
+        ctx = IngestContext(client, pool, executor, writer, SeenReviews(), args)
+        ingest_city(ctx, args.location)
+        print(f"Driver pool stats: {pool.stats}")
+    remember_written_reviews(ctx)
+    if client.cache is not None:
+        print(f"Yelp cache: {client.cache.stats} (hit ratio {client.cache.hit_ratio():.0%})")
+    print(f"Review dedup: {ctx.dedup_totals}")
+    print(f"DynamoDB writes: {writer.summary()}")
     print("Done inserting data into DynamoDB.")
 
 if __name__ == "__main__":
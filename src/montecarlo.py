@@ -0,0 +1,171 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+LABELS = ("POSITIVE", "NEUTRAL", "NEGATIVE")
+LABEL_COUNTS = ("positive_count", "neutral_count", "negative_count")
+
+DEFAULT_DRAWS = 10000
+DEFAULT_HORIZON = 50
+DEFAULT_CHUNK = 128
+
+def _interval(samples, ci, axis):
+    # Equal-tailed interval (nearest rank) as (low, high) on a new last axis. A
+    # plain sort of the draws is several times cheaper than np.quantile here.
+    n = samples.shape[axis]
+    tail = (1.0 - ci) / 2
+    ordered = np.sort(samples, axis=axis)
+    low = np.take(ordered, int(np.floor(tail * (n - 1))), axis=axis)
+    high = np.take(ordered, int(np.ceil((1.0 - tail) * (n - 1))), axis=axis)
+    return np.stack([low, high], axis=-1)
+
+def simulate_mix(counts, draws=DEFAULT_DRAWS, horizon=DEFAULT_HORIZON, prior=1.0, ci=0.95, rng=None):
+    """
+    Vectorized simulation for restaurants given their (R, 3) label counts
+    (positive, neutral, negative). Returns arrays indexed like `counts`:
+    - observed: current sentiment mix;
+    - share_ci: bootstrap interval of that mix (reviews resampled from the
+      observed counts), shape (R, 3, 2);
+    - projected, projected_ci: mix after `horizon` more reviews, drawn from the
+      Dirichlet(counts + prior) posterior, then multinomial future reviews;
+    - net_ci: interval of projected positive share minus negative share.
+    Memory grows as R x draws x 3: callers chunk restaurants (see simulate_restaurants).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, len(LABELS))
+    totals = counts.sum(axis=1)
+    observed = counts / np.maximum(totals, 1)[:, None]
+
+    # Intervals are taken on the integer draws, then scaled: shares are monotonic in the counts.
+    resampled = rng.multinomial(totals[:, None], observed[:, None, :], size=(len(counts), draws))
+    share_ci = _interval(resampled, ci, axis=1) / np.maximum(totals, 1)[:, None, None]
+
+    mix = rng.standard_gamma(counts[:, None, :] + prior, size=(len(counts), draws, len(LABELS)))
+    mix /= mix.sum(axis=2, keepdims=True)
+    future = rng.multinomial(horizon, mix)
+    scale = (totals + horizon)[:, None]
+    return {
+        "observed": observed,
+        "share_ci": share_ci,
+        "projected": (counts + future.mean(axis=1)) / scale,
+        "projected_ci": (counts[:, :, None] + _interval(future, ci, axis=1)) / scale[:, :, None],
+        "net_ci": ((counts[:, :1] - counts[:, 2:]) + _interval(future[:, :, 0] - future[:, :, 2], ci, axis=1)) / scale
+    }
+
+def _simulate_chunk(args):
+    counts, draws, horizon, prior, ci, seed = args
+    return simulate_mix(counts, draws=draws, horizon=horizon, prior=prior, ci=ci, rng=np.random.default_rng(seed))
+
+def simulate_restaurants(counts, draws=DEFAULT_DRAWS, horizon=DEFAULT_HORIZON, prior=1.0, ci=0.95, seed=None,
+                         workers=None, chunk_size=DEFAULT_CHUNK):
+    """
+    simulate_mix over many restaurants. Restaurants with the same label counts
+    have the same distribution, so each distinct count vector is simulated once
+    (most restaurants have a handful of reviews). Distinct vectors run
+    `chunk_size` at a time on a process pool (`workers=1` runs in-process),
+    each chunk on its own stream spawned from `seed`: results depend on the
+    seed and chunk size, not on the worker count.
+    """
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, len(LABELS))
+    distinct, inverse = np.unique(counts, axis=0, return_inverse=True)
+    chunks = [distinct[i:i + chunk_size] for i in range(0, len(distinct), chunk_size)] or [distinct]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(chunk, draws, horizon, prior, ci, s) for chunk, s in zip(chunks, seeds)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = [_simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    inverse = inverse.reshape(-1)
+    return {key: np.concatenate([r[key] for r in results])[inverse] for key in results[0]}
+
+def bootstrap_compound(scores, draws=DEFAULT_DRAWS, ci=0.95, rng=None, max_block=4_000_000):
+    """
+    Bootstrap interval of the mean compound score of one restaurant's reviews.
+    Resampling is done `max_block` indexes at a time to cap memory.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores):
+        return float("nan"), (float("nan"), float("nan"))
+    per_block = max(1, max_block // len(scores))
+    means = np.concatenate([
+        scores[rng.integers(0, len(scores), size=(min(per_block, draws - start), len(scores)))].mean(axis=1)
+        for start in range(0, draws, per_block)
+    ])
+    low, high = _interval(means, ci, axis=0)
+    return float(scores.mean()), (float(low), float(high))
+
+def load_label_counts(restaurant_ids=None, segments=4):
+    # (restaurant ids, (R, 3) counts) from the RestaurantSentiment aggregates.
+    from src.aggregates import aggregates_table
+    from src.scan import parallel_scan
+    if restaurant_ids:
+        items = [aggregates_table.get_item(Key={"restaurant_id": r}).get("Item") for r in restaurant_ids]
+        items = [item for item in items if item]
+    else:
+        items = parallel_scan(aggregates_table, total_segments=segments,
+                              projection="restaurant_id, " + ", ".join(LABEL_COUNTS))
+    ids, counts = [], []
+    for item in items:
+        row = [int(item.get(field, 0)) for field in LABEL_COUNTS]
+        if sum(row):
+            ids.append(item["restaurant_id"])
+            counts.append(row)
+    return ids, np.array(counts, dtype=np.int64).reshape(-1, len(LABELS))
+
+def load_compound_scores(restaurant_ids, segments=4):
+    # {restaurant_id: [compound, ...]} for the given restaurants, from the Reviews table.
+    from src.db import reviews_table
+    from src.scan import parallel_scan
+    wanted = set(restaurant_ids)
+    scores = {r: [] for r in restaurant_ids}
+    for item in parallel_scan(reviews_table, total_segments=segments,
+                              projection="restaurant_id, sentiment_compound",
+                              filter_expression="attribute_exists(sentiment_compound)"):
+        if item.get("restaurant_id") in wanted:
+            scores[item["restaurant_id"]].append(float(item["sentiment_compound"]))
+    return scores
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo projection of restaurant sentiment mixes.")
+    parser.add_argument("restaurant_ids", nargs="*", help="Restaurants to simulate (default: every aggregate).")
+    parser.add_argument("--draws", type=int, default=DEFAULT_DRAWS, help="Simulations per restaurant.")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="Future reviews to project.")
+    parser.add_argument("--ci", type=float, default=0.95, help="Confidence level of the intervals.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible runs.")
+    parser.add_argument("--workers", type=int, default=None, help="Simulation processes (default: all CPUs).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK, help="Restaurants per process task.")
+    parser.add_argument("--compound", action="store_true",
+                        help="Also bootstrap the mean compound score (scans the Reviews table).")
+    parser.add_argument("--top", type=int, default=20, help="Restaurants printed, by review count.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    ids, counts = load_label_counts(args.restaurant_ids)
+    if not ids:
+        print("No scored restaurants to simulate.")
+        return
+    result = simulate_restaurants(counts, draws=args.draws, horizon=args.horizon, ci=args.ci, seed=args.seed,
+                                  workers=args.workers, chunk_size=args.chunk_size)
+    shown = sorted(range(len(ids)), key=lambda i: -counts[i].sum())[:args.top]
+    compounds = load_compound_scores([ids[i] for i in shown]) if args.compound else {}
+    rng = np.random.default_rng(args.seed)
+    print(f"{len(ids)} restaurants, {args.draws} draws, {args.horizon} projected reviews, {args.ci:.0%} intervals")
+    for i in shown:
+        low, high = result["projected_ci"][i, 0]
+        line = (f"{ids[i]}: {counts[i].sum()} reviews, positive {result['observed'][i, 0]:.1%} "
+                f"[{result['share_ci'][i, 0, 0]:.1%}, {result['share_ci'][i, 0, 1]:.1%}] -> projected "
+                f"{result['projected'][i, 0]:.1%} [{low:.1%}, {high:.1%}], net "
+                f"[{result['net_ci'][i, 0]:+.2f}, {result['net_ci'][i, 1]:+.2f}]")
+        if ids[i] in compounds:
+            mean, (c_low, c_high) = bootstrap_compound(compounds[ids[i]], draws=args.draws, ci=args.ci, rng=rng)
+            line += f", compound {mean:+.3f} [{c_low:+.3f}, {c_high:+.3f}]"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import queue
+import threading
+import time
+from decimal import Decimal
+
+from src.db import RESTAURANTS_TABLE_NAME, REVIEWS_TABLE_NAME, BatchWriter, restaurant_item, review_item
+from src.dedup import SeenReviews, filter_new_reviews, make_review_id
+from src.driver_pool import DriverPool
+from src.main import add_ingest_arguments, build_yelp_client, scrape_alias
+from src.aggregates import AggregateBuffer, sentiment_delta, to_decimal
+from src.ratelimit import TokenBucket
+from src.scoring import label_from_compound, scored_timestamps
+from src.sentiment import SENTIMENT_VERSION, compute_sentiment_compound
+
+_STOP = object()
+
+class Stage:
+    """
+    One pipeline stage: `workers` threads read from a bounded input queue, call
+    `fn(record)` and push every record it yields to the next stage's queue.
+    A full downstream queue blocks the stage (backpressure).
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=100):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.next = None
+        self.metrics = {"in": 0, "out": 0, "errors": 0, "busy_s": 0.0, "max_queue": 0}
+        self._lock = threading.Lock()
+        self._alive = self.workers
+        self._first = None
+        self._last = None
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, record):
+        self.inbox.put(record)
+        size = self.inbox.qsize()
+        if size > self.metrics["max_queue"]:
+            self.metrics["max_queue"] = size
+
+    def close(self):
+        for _ in range(self.workers):
+            self.inbox.put(_STOP)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            record = self.inbox.get()
+            if record is _STOP:
+                break
+            start = time.perf_counter()
+            outputs = 0
+            try:
+                for output in self.fn(record) or ():
+                    outputs += 1
+                    if self.next is not None:
+                        self.next.put(output)
+                errors = 0
+            except Exception as e:
+                errors = 1
+                print(f"[!] {self.name} failed: {e.__class__.__name__}: {e}")
+            end = time.perf_counter()
+            with self._lock:
+                self.metrics["in"] += 1
+                self.metrics["out"] += outputs
+                self.metrics["errors"] += errors
+                self.metrics["busy_s"] += end - start
+                self._first = self._first or start
+                self._last = end
+        with self._lock:
+            self._alive -= 1
+            last_worker = self._alive == 0
+        if last_worker and self.next is not None:
+            self.next.close()
+
+    def report(self):
+        elapsed = (self._last - self._first) if self._first else 0.0
+        rate = self.metrics["in"] / elapsed if elapsed > 0 else 0.0
+        return (f"{self.name:<7} workers={self.workers:<3} in={self.metrics['in']:<6} out={self.metrics['out']:<6} "
+                f"errors={self.metrics['errors']:<4} {rate:8.2f} rec/s  busy={self.metrics['busy_s']:.1f}s  "
+                f"max_queue={self.metrics['max_queue']}")
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.next = downstream
+
+    def run(self, records):
+        for stage in self.stages:
+            stage.start()
+        for record in records:
+            self.stages[0].put(record)
+        self.stages[0].close()
+        for stage in self.stages:
+            stage.join()
+
+def build_pipeline(args, client, pool, writer, seen, written_reviews):
+    def fetch(city):
+        for r in client.search_businesses(location=city, total=args.limit):
+            yield r
+
+    def scrape(r):
+        restaurant_id = r["id"]
+        address = ", ".join(r.get("location", {}).get("display_address", []))
+        yield (RESTAURANTS_TABLE_NAME, restaurant_item(
+            restaurant_id=restaurant_id,
+            name=r.get("name", ""),
+            address=address,
+            rating=Decimal(str(r.get("rating", 0))),
+            yelp_id=restaurant_id
+        ))
+        alias = r.get("alias", "")
+        if not alias:
+            return
+        result = scrape_alias(pool, alias, 5, mode=args.mode, timeout=args.page_timeout)
+        items = [
+            review_item(
+                review_id=make_review_id(restaurant_id, rev.get("text", ""), rev.get("time_created", "")),
+                restaurant_id=restaurant_id,
+                text=rev.get("text", ""),
+                rating=rev.get("rating", Decimal("0")),
+                time_created=rev.get("time_created", "")
+            )
+            for rev in result["reviews"]
+        ]
+        new_items, _ = filter_new_reviews(items, seen)
+        for item in new_items:
+            yield (REVIEWS_TABLE_NAME, item)
+
+    def score(record):
+        table_name, item = record
+        if table_name == REVIEWS_TABLE_NAME:
+            compound = compute_sentiment_compound(item.get("text", ""))
+            item["sentiment"] = label_from_compound(compound)
+            item["sentiment_compound"] = to_decimal(compound)
+            item["sentiment_version"] = SENTIMENT_VERSION
+            item["scored_at"], item["scored_day"] = scored_timestamps()
+            item.pop("unscored", None)  # stored already labelled: keep it out of the UnscoredIndex
+        yield record
+
+    def write(record):
+        table_name, item = record
+        # Reviews are stored only if absent: a stored review keeps its label and is not counted again.
+        writer.put(table_name, item, if_absent=table_name == REVIEWS_TABLE_NAME)
+        if table_name == REVIEWS_TABLE_NAME:
+            written_reviews.append(item)
+        yield item
+
+    return Pipeline([
+        Stage("fetch", fetch, workers=args.fetch_workers, queue_size=args.queue_size),
+        Stage("scrape", scrape, workers=max(1, args.workers), queue_size=args.queue_size),
+        Stage("score", score, workers=args.score_workers, queue_size=args.queue_size),
+        Stage("write", write, workers=1, queue_size=args.queue_size)
+    ])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stream cities through fetch -> scrape -> score -> write with bounded queues.")
+    parser.add_argument("cities", nargs="+")
+    parser.add_argument("--fetch-workers", type=int, default=2, help="Concurrent Yelp search calls.")
+    parser.add_argument("--score-workers", type=int, default=1, help="Concurrent VADER scorers.")
+    parser.add_argument("--queue-size", type=int, default=100, help="Capacity of each inter-stage queue.")
+    parser.add_argument("--rate", type=float, default=5.0, help="Yelp API calls per second.")
+    add_ingest_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    client = build_yelp_client(args, rate_limiter=TokenBucket(rate=args.rate, capacity=args.rate))
+    workers = max(1, args.workers)
+    seen = SeenReviews()
+    start = time.perf_counter()
+    written_reviews = []
+    with DriverPool(size=workers, max_pages=args.max_pages_per_driver) as pool, \
+            BatchWriter() as writer:
+        pipeline = build_pipeline(args, client, pool, writer, seen, written_reviews)
+        pipeline.run(args.cities)
+    failed_ids = {item["review_id"] for table_name, item in writer.failed if table_name == REVIEWS_TABLE_NAME}
+    existing_ids = {item["review_id"] for table_name, item in writer.existing if table_name == REVIEWS_TABLE_NAME}
+    seen.add_many(item["review_id"] for item in written_reviews if item["review_id"] not in failed_ids)
+    # Reviews found already stored were counted when they were first written.
+    stored = [item for item in written_reviews if item["review_id"] not in failed_ids | existing_ids]
+    # Reviews are stored already scored, so the stream consumer skips them: count them here.
+    aggregates = AggregateBuffer()
+    for item in stored:
+        aggregates.add(item["restaurant_id"], sentiment_delta({}, item["sentiment"], item["sentiment_compound"]))
+    aggregate_writes = aggregates.flush()
+    elapsed = time.perf_counter() - start
+    print("---- Pipeline report ----")
+    for stage in pipeline.stages:
+        print(stage.report())
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"DynamoDB writes: {writer.summary()}")
+    print(f"Restaurant aggregates: {aggregate_writes.summary()}")
+
+if __name__ == "__main__":
+    main()
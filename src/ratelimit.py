@@ -0,0 +1,71 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    One instance can be shared by every thread talking to the same API.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket whose rate follows the table: additive increase while writes
+    succeed, multiplicative decrease when the table throttles. Callers pre-pay
+    one token per request and report the real ConsumedCapacity afterwards.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=1.0, max_rate=None, increase=1.0, decrease=0.5, cooldown=1.0):
+        super().__init__(rate, capacity)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate) if max_rate else float("inf")
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._last_decrease = 0.0
+
+    def record_success(self, consumed_units=1.0):
+        with self._lock:
+            self._tokens -= max(0.0, consumed_units - 1.0)
+            # +`increase` tokens/s per second of sustained success
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self.capacity = max(self.capacity, self.rate)
+
+    def record_throttle(self):
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            # Concurrent workers hit the same throttling window: back off once per cooldown.
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
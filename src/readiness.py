@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+REVIEW_XPATH = '//p[contains(@class, "comment__09f24__D0cxf")]'
+RATING_XPATH = './/div[@role="img" and contains(@aria-label,"star rating")]'
+DATE_XPATH = './/span[contains(@class, "css-1e4fdj9")]'
+# Each review sits in its own list item with its rating and date: those are looked
+# up inside that item, never paired with the review by position in the page.
+REVIEW_CONTAINER_XPATH = './ancestor::li[1]'
+
+DEFAULT_READY_TIMEOUT = 10
+DEFAULT_POLL_FREQUENCY = 0.1
+
+def wait_for_reviews(driver, timeout=DEFAULT_READY_TIMEOUT, poll_frequency=DEFAULT_POLL_FREQUENCY):
+    # Returns as soon as the first review node is in the DOM, or [] on timeout.
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(
+            EC.presence_of_all_elements_located((By.XPATH, REVIEW_XPATH))
+        )
+    except TimeoutException:
+        return []
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+
+    def total(self):
+        return round(sum(self.timings.values()), 4)
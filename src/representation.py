@@ -1,121 +1,226 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
 import boto3
-import re
 import matplotlib.pyplot as plt
-import uuid
-from collections import defaultdict, Counter
+from botocore.exceptions import ClientError
+
+from src.config import WORD_PARTIALS_DIR
+from src.scan import parallel_scan
+from src.word_stats import (
+    DEFAULT_TAIL_BINS, DEFAULT_TOP_K, SENTIMENT_MAP, LocalPartialStore, render_within_budget, select_words, update_partials
+)
 
 dynamodb = boto3.resource("dynamodb", region_name="eu-west-3")
 reviews_table = dynamodb.Table("Reviews")
 
-SENTIMENT_MAP = {
-    "POSITIVE": 1.0,
-    "NEGATIVE": -1.0,
-    "NEUTRAL": 0.0
-}
-
-SCATTER_FILE = f"charts/nuage_points_freq_sent_{uuid.uuid4()}.png"
-HISTO_FILE = f"charts/sentiment_hist_{uuid.uuid4()}.png"
-
-def nettoyer_texte(texte):
-    texte = texte.lower()
-    texte = re.sub(r"[^a-z0-9àâçéèêëîïôûùüÿñæœ\s]", " ", texte)
-    return texte.strip()
-
-def lire_data_reviews():
-    response = reviews_table.scan()
-    items = response.get("Items", [])
-    return items
-
-def construire_nuage_points_mots(items):
-    word_freq = Counter()
-    word_sent_sum = defaultdict(float)
-    word_sent_count = Counter()
-
-    for it in items:
-        text = it.get("text", "")
-        sentiment_label = it.get("sentiment")
-        if not text or not sentiment_label:
-            continue
-        score = SENTIMENT_MAP.get(sentiment_label, 0.0)
-
-        txt_clean = nettoyer_texte(text)
-        words = txt_clean.split()
-        for w in words:
-            word_freq[w] += 1
-            word_sent_sum[w] += score
-            word_sent_count[w] += 1
-
-    X = []
-    Y = []
-    labels = []
-    for w, freq in word_freq.items():
-        if freq < 2:
-            continue
-        nb_sent = word_sent_count[w]
-        if nb_sent == 0:
-            continue
-        avg_sent = word_sent_sum[w] / nb_sent
-        X.append(freq)
-        Y.append(avg_sent)
-        labels.append(w)
-
-    if not X:
+# Graphiques adressés par contenu (charts/<nom>_<empreinte des données>.png) ;
+# charts/latest/<nom>.json pointe vers la version courante
+CHARTS_DIR = "charts"
+CHART_RENDER_VERSION = 2
+# Taille maximale d'un graphique rendu (octets) ; 0 = pas de limite
+CHART_MAX_BYTES = 512 * 1024
+
+# Index global (PK scored_day, SK scored_at) qui permet de ne lire que les reviews
+# scorées depuis le dernier passage ; sans lui on retombe sur un scan filtré.
+SCORED_DAY_INDEX = "ScoredDayIndex"
+REVIEW_PROJECTION = "#t, sentiment, sentiment_version, scored_at, previous_scored_at"
+
+def jours_entre(debut, fin):
+    jour = datetime.strptime(debut[:10], "%Y-%m-%d")
+    while jour.strftime("%Y-%m-%d") <= fin[:10]:
+        yield jour.strftime("%Y-%m-%d")
+        jour += timedelta(days=1)
+
+def lire_reviews_scorees(depuis, jusqu_a, version=None, segment=None, segments=4):
+    """
+    Reviews labellisées avec depuis < scored_at <= jusqu_a (depuis=None : toutes,
+    y compris celles scorées avant l'ajout de scored_at, du segment (numéro, nombre)
+    de scan donné), de la version donnée.
+    """
+    noms = {"#t": "text"}
+    valeurs = {":b": jusqu_a}
+    filtre_version = ""
+    if version is not None:
+        filtre_version = " AND sentiment_version = :v"
+        valeurs[":v"] = version
+    if depuis is None:
+        # Le segment du rebuild est lu par `segments` threads (sous-segments d'un scan plus fin)
+        numero, nombre = segment or (0, 1)
+        yield from parallel_scan(
+            reviews_table,
+            total_segments=nombre * segments,
+            segments=range(numero * segments, (numero + 1) * segments),
+            projection=REVIEW_PROJECTION,
+            filter_expression="attribute_exists(sentiment) AND (attribute_not_exists(scored_at) OR scored_at <= :b)" + filtre_version,
+            expression_attribute_names=noms,
+            expression_attribute_values=valeurs
+        )
+        return
+    valeurs[":a"] = depuis
+    try:
+        for jour in jours_entre(depuis, jusqu_a):
+            kwargs = {
+                "IndexName": SCORED_DAY_INDEX,
+                "KeyConditionExpression": "scored_day = :d AND scored_at BETWEEN :a AND :b",
+                "ProjectionExpression": REVIEW_PROJECTION,
+                "ExpressionAttributeNames": noms,
+                "ExpressionAttributeValues": dict(valeurs, **{":d": jour})
+            }
+            if version is not None:
+                kwargs["FilterExpression"] = "sentiment_version = :v"
+            while True:
+                response = reviews_table.query(**kwargs)
+                # BETWEEN inclut la borne basse, déjà comptée au passage précédent
+                yield from (it for it in response.get("Items", []) if it.get("scored_at") != depuis)
+                if not response.get("LastEvaluatedKey"):
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ValidationException":
+            raise
+        print(f"[!] Index {SCORED_DAY_INDEX} indisponible, scan filtré à la place.")
+        yield from parallel_scan(
+            reviews_table,
+            total_segments=segments,
+            projection=REVIEW_PROJECTION,
+            filter_expression="scored_at > :a AND scored_at <= :b" + filtre_version,
+            expression_attribute_names=noms,
+            expression_attribute_values=valeurs
+        )
+
+def empreinte_graphique(nom, donnees):
+    payload = json.dumps([nom, CHART_RENDER_VERSION, donnees], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+def publier_graphique(nom, donnees, rendre):
+    """
+    Écrit le graphique `nom` dans charts/<nom>_<empreinte>.png en n'appelant
+    `rendre()` (qui renvoie le PNG) que si ce fichier n'existe pas encore, puis met à jour
+    charts/latest/<nom>.json (qui garde aussi la version précédente ; la
+    version d'avant est supprimée). Renvoie (chemin, rendu ou non).
+    """
+    chemin = os.path.join(CHARTS_DIR, f"{nom}_{empreinte_graphique(nom, donnees)}.png")
+    pointeur = os.path.join(CHARTS_DIR, "latest", f"{nom}.json")
+    try:
+        with open(pointeur, encoding="utf-8") as f:
+            latest = json.load(f)
+    except (OSError, ValueError):
+        latest = {}
+    rendu = not os.path.exists(chemin)
+    if rendu:
+        os.makedirs(CHARTS_DIR, exist_ok=True)
+        with open(chemin, "wb") as f:
+            f.write(rendre())
+    if latest.get("key") != chemin:
+        os.makedirs(os.path.dirname(pointeur), exist_ok=True)
+        with open(pointeur, "w", encoding="utf-8") as f:
+            json.dump({"key": chemin, "previous": latest.get("key"), "updated_at": datetime.now(timezone.utc).isoformat()}, f)
+        obsolete = latest.get("previous")
+        if obsolete and obsolete not in (chemin, latest.get("key")) and os.path.exists(obsolete):
+            os.remove(obsolete)
+    return chemin, rendu
+
+def construire_nuage_points_mots(partiel, top_k=DEFAULT_TOP_K, tail_bins=DEFAULT_TAIL_BINS, max_bytes=CHART_MAX_BYTES):
+    """
+    Les `top_k` mots les plus fréquents (hors mots vides), plus en option une
+    grille de densité pour les autres : la taille du graphique ne dépend plus
+    du nombre d'avis.
+    """
+    selection = select_words(partiel, k=top_k, tail_bins=tail_bins)
+    if not len(selection.top):
         print("Aucun mot à représenter dans le nuage de points.")
         return None
 
-    plt.figure(figsize=(10,6))
-    plt.scatter(X, Y, alpha=0.7)
-    plt.title("Nuage de points : fréquence vs sentiment moyen des mots")
-    plt.xlabel("Fréquence du mot (nb d'occurrences)")
-    plt.ylabel("Sentiment moyen (-1 = négatif, +1 = positif)")
-    plt.grid(True)
-
-    data_sorted = sorted(zip(X, Y, labels), key=lambda e: e[0], reverse=True)
-    for i, (xv, yv, w) in enumerate(data_sorted[:10]):
-        plt.annotate(w, (xv, yv), fontsize=9)
-
-    plt.tight_layout()
-    plt.savefig(SCATTER_FILE)
-    plt.close()
-    return SCATTER_FILE
-
-def construire_histogramme_sentiments(items):
-    sentiments = []
-    for it in items:
-        s = it.get("sentiment")
-        if s in ("POSITIVE", "NEGATIVE", "NEUTRAL"):
-            sentiments.append(s)
-    if not sentiments:
+    donnees = {
+        "mots": selection.top.top(len(selection.top)),
+        "densite": selection.tail,
+        "max_bytes": max_bytes
+    }
+
+    def dessiner(sel):
+        plt.figure(figsize=(10,6))
+        if sel.tail:
+            plt.scatter([x for x, _, _ in sel.tail], [y for _, y, _ in sel.tail],
+                        s=[8 + 4 * n ** 0.5 for _, _, n in sel.tail], color="lightgray", alpha=0.6,
+                        label="Autres mots (densité)")
+        plt.scatter(sel.top.freq, sel.top.mean_sentiment, alpha=0.7, label=f"{len(sel.top)} mots les plus fréquents")
+        plt.title("Nuage de points : fréquence vs sentiment moyen des mots")
+        plt.xlabel("Fréquence du mot (nb d'occurrences)")
+        plt.ylabel("Sentiment moyen (-1 = négatif, +1 = positif)")
+        plt.grid(True)
+        if sel.tail:
+            plt.legend()
+
+        # Les 10 mots les plus fréquents (la sélection est déjà triée par fréquence décroissante)
+        for w, xv, yv in sel.top.top(10):
+            plt.annotate(w, (xv, yv), fontsize=9)
+
+        plt.tight_layout()
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format="png")
+        plt.close()
+        return buffer.getvalue()
+
+    def rendre():
+        data, dessinee = render_within_budget(dessiner, selection, max_bytes)
+        if len(dessinee.top) < len(selection.top) or len(dessinee.tail) < len(selection.tail):
+            print(f"[!] Nuage de points réduit à {len(dessinee.top)} mots pour tenir dans {max_bytes} octets.")
+        return data
+
+    return publier_graphique("nuage_points_freq_sent", donnees, rendre)
+
+def construire_histogramme_sentiments(partiel):
+    c = partiel.labels
+    if not c:
         print("Aucun sentiment trouvé, histogramme impossible.")
         return None
 
-    c = Counter(sentiments)
-    labels = list(c.keys())
-    values = list(c.values())
-
-    plt.figure(figsize=(6,4))
-    color_map = {"POSITIVE": "green", "NEGATIVE": "red", "NEUTRAL": "gray"}
-    colors = [color_map.get(l, "blue") for l in labels]
-    plt.bar(labels, values, color=colors)
-    plt.title("Répartition des sentiments")
-    plt.xlabel("Sentiment")
-    plt.ylabel("Nombre d'avis")
-    plt.tight_layout()
-    plt.savefig(HISTO_FILE)
-    plt.close()
-    return HISTO_FILE
-
-def main():
-    items = lire_data_reviews()
-    print(f"{len(items)} avis récupérés depuis la table Reviews.")
-
-    scatter_file = construire_nuage_points_mots(items)
-    if scatter_file:
-        print(f"[OK] Nuage de points généré : {scatter_file}")
-
-    histo_file = construire_histogramme_sentiments(items)
-    if histo_file:
-        print(f"[OK] Histogramme généré : {histo_file}")
+    # Ordre fixe des labels : mêmes comptes => même fichier
+    labels = [label for label in SENTIMENT_MAP if c.get(label)]
+    values = [c[label] for label in labels]
+
+    def rendre():
+        plt.figure(figsize=(6,4))
+        color_map = {"POSITIVE": "green", "NEGATIVE": "red", "NEUTRAL": "gray"}
+        colors = [color_map.get(l, "blue") for l in labels]
+        plt.bar(labels, values, color=colors)
+        plt.title("Répartition des sentiments")
+        plt.xlabel("Sentiment")
+        plt.ylabel("Nombre d'avis")
+        plt.tight_layout()
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format="png")
+        plt.close()
+        return buffer.getvalue()
+
+    return publier_graphique("sentiment_hist", [labels, values], rendre)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Graphiques des reviews, à partir des partiels incrémentaux.")
+    parser.add_argument("--rebuild", action="store_true", help="Repartir de zéro (relit toute la table Reviews).")
+    parser.add_argument("--partials-dir", default=WORD_PARTIALS_DIR, help="Dossier des partiels et du manifest.")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Mots tracés individuellement dans le nuage de points.")
+    parser.add_argument("--tail-bins", type=int, default=DEFAULT_TAIL_BINS,
+                        help="Cases par axe de la grille de densité des autres mots (0 = pas de grille).")
+    parser.add_argument("--max-bytes", type=int, default=CHART_MAX_BYTES, help="Taille maximale d'un graphique (0 = sans limite).")
+    args = parser.parse_args(argv)
+
+    # Sans limite de temps en local : un rebuild se fait en une seule passe
+    partiel, rapport = update_partials(LocalPartialStore(args.partials_dir), lire_reviews_scorees, rebuild=args.rebuild,
+                                       rebuild_segments=1)
+    print(f"{rapport['new_reviews']} nouveaux avis intégrés ({rapport['since']} -> {rapport['until']}), "
+          f"{rapport['total_reviews']} au total, version {rapport['version']}.")
+
+    for nom, resultat in (("Nuage de points", construire_nuage_points_mots(partiel, args.top_k, args.tail_bins, args.max_bytes)),
+                          ("Histogramme", construire_histogramme_sentiments(partiel))):
+        if resultat:
+            chemin, rendu = resultat
+            print(f"[OK] {nom} {'généré' if rendu else 'inchangé'} : {chemin}")
 
     print("Terminé.")
 
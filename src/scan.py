@@ -0,0 +1,135 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+def scan_segment(table, segment=None, total_segments=None, stats=None, **scan_kwargs):
+    # Follows LastEvaluatedKey until the segment (or the whole table) is exhausted.
+    if total_segments:
+        scan_kwargs["Segment"] = segment
+        scan_kwargs["TotalSegments"] = total_segments
+    while True:
+        response = table.scan(**scan_kwargs)
+        if stats is not None:
+            stats.add_page(response)
+        yield response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+class ScanStats:
+    def __init__(self):
+        self.pages = 0
+        self.scanned = 0
+        self.returned = 0
+        self._lock = threading.Lock()
+
+    def add_page(self, response):
+        with self._lock:
+            self.pages += 1
+            self.scanned += response.get("ScannedCount", 0)
+            self.returned += response.get("Count", len(response.get("Items", [])))
+
+    def __repr__(self):
+        return f"{self.pages} pages, {self.scanned} scanned, {self.returned} returned"
+
+def parallel_scan(table, total_segments=4, projection=None, filter_expression=None,
+                  expression_attribute_names=None, expression_attribute_values=None,
+                  stats=None, max_buffered_pages=8, segments=None):
+    """
+    Streams the items of `table` using a DynamoDB parallel scan: one thread per
+    segment, each following its own LastEvaluatedKey. Pages go through a bounded
+    queue so memory stays flat whatever the table size. `segments` restricts the
+    scan to some of the `total_segments` segments.
+    """
+    scan_kwargs = {}
+    if projection:
+        scan_kwargs["ProjectionExpression"] = projection
+    if filter_expression:
+        scan_kwargs["FilterExpression"] = filter_expression
+    if expression_attribute_names:
+        scan_kwargs["ExpressionAttributeNames"] = expression_attribute_names
+    if expression_attribute_values:
+        scan_kwargs["ExpressionAttributeValues"] = expression_attribute_values
+
+    return _merge_pages(
+        [lambda segment=segment: scan_segment(table, segment, total_segments, stats=stats, **dict(scan_kwargs))
+         for segment in (range(total_segments) if segments is None else segments)],
+        max_buffered_pages,
+        thread_name_prefix="scan-segment"
+    )
+
+def query_partition(table, stats=None, **query_kwargs):
+    # Same as scan_segment for one partition of a Query.
+    while True:
+        response = table.query(**query_kwargs)
+        if stats is not None:
+            stats.add_page(response)
+        yield response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        query_kwargs["ExclusiveStartKey"] = last_key
+
+def parallel_query(table, index_name, key_name, key_values, projection=None,
+                   expression_attribute_names=None, stats=None, max_buffered_pages=8):
+    """
+    Streams the items of every `key_name = value` partition of `index_name`,
+    one thread per value, through the same bounded queue as parallel_scan.
+    """
+    query_kwargs = {
+        "IndexName": index_name,
+        "KeyConditionExpression": "#pk = :pk",
+        "ExpressionAttributeNames": dict(expression_attribute_names or {}, **{"#pk": key_name})
+    }
+    if projection:
+        query_kwargs["ProjectionExpression"] = projection
+    return _merge_pages(
+        [lambda value=value: query_partition(table, stats=stats, ExpressionAttributeValues={":pk": value}, **query_kwargs)
+         for value in key_values],
+        max_buffered_pages,
+        thread_name_prefix="query-partition"
+    )
+
+def _merge_pages(sources, max_buffered_pages, thread_name_prefix):
+    # Runs each page generator in its own thread and yields their items as pages arrive.
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+
+    def offer(value):
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(source):
+        try:
+            for items in source():
+                if not offer(items):
+                    return
+        except Exception as e:
+            offer(e)
+        finally:
+            offer(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, len(sources)), thread_name_prefix=thread_name_prefix)
+    for source in sources:
+        executor.submit(worker, source)
+    remaining = len(sources)
+    try:
+        while remaining:
+            value = pages.get()
+            if value is _DONE:
+                remaining -= 1
+            elif isinstance(value, Exception):
+                raise value
+            else:
+                yield from value
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.config import SCORE_CACHE_PATH
+
+def normalize_score_text(text):
+    # Whitespace only: VADER reads case and punctuation ("GREAT!!!" != "great").
+    return " ".join((text or "").split())
+
+def text_hash(text):
+    return hashlib.sha256(normalize_score_text(text).encode("utf-8")).hexdigest()
+
+class SqliteScoreStore:
+    """
+    Persistent tier on local disk. Rows written by another scorer version are
+    dropped by `invalidate`, which ScoreCache calls when it is built.
+    """
+
+    def __init__(self, path=SCORE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " text_hash TEXT PRIMARY KEY, version TEXT NOT NULL, scores TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def invalidate(self, version):
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM scores WHERE version <> ?", (version,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def get_many(self, hashes, version):
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, scores FROM scores WHERE version = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [version] + chunk
+                ).fetchall()
+                found.update((h, json.loads(body)) for h, body in rows)
+        return found
+
+    def put_many(self, entries, version):
+        rows = [(h, version, json.dumps(scores, separators=(",", ":"))) for h, scores in entries.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO scores (text_hash, version, scores) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+class DynamoScoreStore:
+    """
+    Persistent tier shared by every machine and Lambda invocation: a DynamoDB
+    table keyed by text_hash. Items from another scorer version read as misses
+    and are overwritten.
+    """
+
+    def __init__(self, table_name, resource=None, max_retries=6):
+        import boto3
+        self.table_name = table_name
+        self.max_retries = max_retries
+        self.resource = resource or boto3.resource("dynamodb", region_name="eu-west-3")
+        self.table = self.resource.Table(table_name)
+
+    def invalidate(self, version):
+        # Stale items are filtered on read and overwritten on write.
+        return 0
+
+    def get_many(self, hashes, version):
+        found = {}
+        hashes = list(dict.fromkeys(hashes))
+        for i in range(0, len(hashes), 100):
+            request_items = {self.table_name: {"Keys": [{"text_hash": h} for h in hashes[i:i + 100]]}}
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    time.sleep(random.uniform(0, min(2.0, 0.05 * (2 ** attempt))))
+                response = self.resource.batch_get_item(RequestItems=request_items)
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    if item.get("version") == version:
+                        found[item["text_hash"]] = json.loads(item["scores"])
+                request_items = response.get("UnprocessedKeys") or {}
+                if not request_items:
+                    break
+            else:
+                # Still throttled: the remaining hashes read as misses and are rescored.
+                print(f"[!] {len(request_items[self.table_name]['Keys'])} scores not read from {self.table_name}.")
+        return found
+
+    def put_many(self, entries, version):
+        with self.table.batch_writer() as batch:
+            for h, scores in entries.items():
+                batch.put_item(Item={
+                    "text_hash": h,
+                    "version": version,
+                    "scores": json.dumps(scores, separators=(",", ":"))
+                })
+
+    def close(self):
+        pass
+
+class ScoreCache:
+    """
+    Memoizes VADER scores by normalized-text hash: an in-memory LRU of
+    `max_entries` in front of an optional persistent `store`. Stored scores are
+    tagged with the scorer version and only read back under the same version,
+    so bumping SENTIMENT_VERSION invalidates everything.
+    """
+
+    def __init__(self, version, max_entries=50000, store=None):
+        self.version = version
+        self.max_entries = max_entries
+        self.store = store
+        self.stats = {"memory_hits": 0, "store_hits": 0, "misses": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if store is not None:
+            self.stats["invalidated"] = store.invalidate(version)
+
+    def _remember(self, key, scores):
+        # Caller holds the lock.
+        self._entries[key] = scores
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_many(self, texts):
+        # Returns {index: scores} for the texts found in either tier.
+        found = {}
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = text_hash(text)
+                scores = self._entries.get(key)
+                if scores is not None:
+                    self._entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    found[i] = scores
+                else:
+                    missing.setdefault(key, []).append(i)
+        if missing and self.store is not None:
+            stored = self.store.get_many(missing, self.version)
+            with self._lock:
+                for key, scores in stored.items():
+                    self._remember(key, scores)
+                    for i in missing.pop(key):
+                        found[i] = scores
+                        self.stats["store_hits"] += 1
+        with self._lock:
+            self.stats["misses"] += sum(len(indexes) for indexes in missing.values())
+        return found
+
+    def put_many(self, texts, scores_list):
+        entries = {text_hash(text): scores for text, scores in zip(texts, scores_list)}
+        with self._lock:
+            for key, scores in entries.items():
+                self._remember(key, scores)
+        if self.store is not None and entries:
+            self.store.put_many(entries, self.version)
+
+    def get_or_score(self, texts, score_fn):
+        """
+        Returns the scores of `texts` in order, calling `score_fn(list_of_texts)`
+        once with the distinct texts missing from both tiers.
+        """
+        texts = list(texts)
+        found = self.get_many(texts)
+        misses = list(dict.fromkeys(normalize_score_text(texts[i]) for i in range(len(texts)) if i not in found))
+        if misses:
+            scored = dict(zip(misses, score_fn(misses)))
+            self.put_many(misses, [scored[t] for t in misses])
+        else:
+            scored = {}
+        return [found[i] if i in found else scored[normalize_score_text(text)] for i, text in enumerate(texts)]
+
+    def hit_ratio(self):
+        lookups = self.stats["memory_hits"] + self.stats["store_hits"] + self.stats["misses"]
+        return (self.stats["memory_hits"] + self.stats["store_hits"]) / lookups if lookups else 0.0
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from src.lexicon_snapshot import load_analyzer
+
+SENTIMENT_THRESHOLD = 0.05
+DEFAULT_CHUNKSIZE = 256
+
+def label_from_compound(compound, threshold=SENTIMENT_THRESHOLD):
+    if compound > threshold:
+        return "POSITIVE"
+    elif compound < -threshold:
+        return "NEGATIVE"
+    else:
+        return "NEUTRAL"
+
+def scored_timestamps(moment=None):
+    # scored_at orders reviews for the incremental chart partials (string-sortable,
+    # same format as word_stats.utc_timestamp); scored_day is the ScoredDayIndex key.
+    scored_at = (moment or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return scored_at, scored_at[:10]
+
+def previous_scored_at(item):
+    # Stored in previous_scored_at when the review has no scored_at yet: "unknown"
+    # if it was labelled before scored_at existed (the partials' "unknown" day).
+    return "unknown" if item.get("sentiment") else ""
+
+def score_text(analyzer, text):
+    scores = analyzer.polarity_scores(text or "")
+    scores["label"] = label_from_compound(scores["compound"])
+    return scores
+
+# One analyzer per process, built once by the pool initializer (or lazily in the parent).
+_process_analyzer = None
+
+def _get_process_analyzer():
+    global _process_analyzer
+    if _process_analyzer is None:
+        _process_analyzer = load_analyzer()
+    return _process_analyzer
+
+def _init_worker():
+    _get_process_analyzer()
+
+def _score_chunk(texts):
+    analyzer = _get_process_analyzer()
+    return [score_text(analyzer, text) for text in texts]
+
+def _pool_context():
+    # ProcessPoolExecutor starts its workers on the first submit, when the scan and
+    # write-back threads are already running: forking then can copy a held lock.
+    # Workers come from a clean forkserver (spawn where it does not exist) instead.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def make_scoring_pool(workers=None):
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=_pool_context(),
+                               initializer=_init_worker)
+
+def score_many(texts, workers=None, chunksize=DEFAULT_CHUNKSIZE, pool=None):
+    """
+    Scores `texts` with VADER and returns, in input order, one dict per text with
+    compound/pos/neu/neg and the label. Chunks of `chunksize` texts are spread over
+    a process pool (pass `pool` to reuse one across calls); workers=1 stays in-process.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if pool is None and (workers == 1 or len(texts) <= chunksize):
+        return _score_chunk(texts)
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+    own_pool = pool is None
+    if own_pool:
+        pool = make_scoring_pool(workers)
+    try:
+        results = []
+        for chunk_scores in pool.map(_score_chunk, chunks):
+            results.extend(chunk_scores)
+        return results
+    finally:
+        if own_pool:
+            pool.shutdown()
@@ -1,40 +1,178 @@
+import argparse
+
 import boto3
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from botocore.exceptions import ClientError
+
+from src.aggregates import AggregateBuffer, to_decimal
+from src.lexicon_snapshot import load_analyzer
+from src.db import UNSCORED_INDEX, UNSCORED_SHARDS
+from src.scan import ScanStats, parallel_query, parallel_scan
+from src.score_cache import DynamoScoreStore, ScoreCache, SqliteScoreStore
+from src.scoring import (
+    SENTIMENT_THRESHOLD, label_from_compound, make_scoring_pool, previous_scored_at, score_many, scored_timestamps
+)
+from src.writeback import WriteBack
 
 dynamodb = boto3.resource("dynamodb", region_name="eu-west-3")
 reviews_table = dynamodb.Table("Reviews")
 
-analyzer = SentimentIntensityAnalyzer()
+# Loaded from the marshal snapshot when one was built (python -m src.lexicon_snapshot).
+analyzer = load_analyzer()
+
+# Stored next to each label: a review is rescored only when this changes. The
+# release comes from the snapshot header, not from a metadata lookup at import.
+SENTIMENT_VERSION = f"vader-{analyzer.vader_version}-t{SENTIMENT_THRESHOLD}"
+
+# Only what the scorer and the aggregates need; "text" is a DynamoDB reserved word.
+REVIEW_PROJECTION = "review_id, restaurant_id, #t"
+REVIEW_PROJECTION_NAMES = {"#t": "text"}
+# Scans also read the current label (see previous_scored_at); the UnscoredIndex only holds unlabelled reviews.
+SCAN_PROJECTION = REVIEW_PROJECTION + ", sentiment"
+
+UNSCORED_FILTER = "attribute_not_exists(sentiment) OR attribute_not_exists(sentiment_version) OR sentiment_version <> :v"
+
+# Labelling a review also takes it out of the UnscoredIndex backlog. previous_scored_at
+# keeps the scoring this label replaces, so the chart partials recount the day it was counted in.
+UPDATE_EXPRESSION = ("SET sentiment = :s, sentiment_compound = :c, sentiment_version = :v, "
+                     "previous_scored_at = if_not_exists(scored_at, :prev), "
+                     "scored_at = :at, scored_day = :day REMOVE unscored")
+# A retry of a label update that went through (timeout, connection reset) would read its own
+# label back as UPDATED_OLD and cancel the review's aggregate delta: it is skipped instead.
+LABEL_CONDITION = "attribute_not_exists(scored_at) OR scored_at <> :at"
+
+# Process-wide memo: re-scraped reviews and short stock phrases are scored once.
+score_cache = ScoreCache(SENTIMENT_VERSION)
+
+def _score_texts(texts):
+    return [analyzer.polarity_scores(text) for text in texts]
+
+def compute_sentiment_compound(text):
+    return score_cache.get_or_score([text], _score_texts)[0]["compound"]
 
 def compute_sentiment_vader(text):
-    scores = analyzer.polarity_scores(text)
-    compound = scores["compound"]
-    if compound > 0.05:
-        return "POSITIVE"
-    elif compound < -0.05:
-        return "NEGATIVE"
+    return label_from_compound(compute_sentiment_compound(text))
+
+def build_score_cache(args):
+    if args.score_cache_table:
+        store = DynamoScoreStore(args.score_cache_table, resource=dynamodb)
+    elif args.no_score_cache:
+        store = None
     else:
-        return "NEUTRAL"
+        store = SqliteScoreStore()
+    return ScoreCache(SENTIMENT_VERSION, store=store)
 
-def main():
-    response = reviews_table.scan()
-    items = response.get("Items", [])
-    print(f"Found {len(items)} reviews to process.")
+def scan_reviews(segments=4, stats=None, full=False):
+    # Reads (and bills) the whole table; without `full`, only reviews that are
+    # unscored or scored by another version are returned.
+    return parallel_scan(
+        reviews_table,
+        total_segments=segments,
+        projection=SCAN_PROJECTION,
+        filter_expression=None if full else UNSCORED_FILTER,
+        expression_attribute_names=REVIEW_PROJECTION_NAMES,
+        expression_attribute_values=None if full else {":v": SENTIMENT_VERSION},
+        stats=stats
+    )
 
-    count = 0
-    for item in items:
-        review_id = item["review_id"]
-        text = item.get("text", "")
-        sentiment = compute_sentiment_vader(text)
-
-        reviews_table.update_item(
-            Key={"review_id": review_id},
-            UpdateExpression="SET sentiment = :s",
-            ExpressionAttributeValues={":s": sentiment}
+def query_unscored(stats=None):
+    # Reads only the UnscoredIndex backlog; falls back to the filtered scan without the index.
+    try:
+        yield from parallel_query(
+            reviews_table,
+            UNSCORED_INDEX,
+            "unscored",
+            range(UNSCORED_SHARDS),
+            projection=REVIEW_PROJECTION,
+            expression_attribute_names=REVIEW_PROJECTION_NAMES,
+            stats=stats
         )
-        count += 1
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ValidationException":
+            raise
+        print(f"[!] Index {UNSCORED_INDEX} unavailable, using the filtered scan instead.")
+        yield from scan_reviews(stats=stats)
+
+def iter_reviews(segments=4, stats=None, full=False, scan=False):
+    """
+    Reviews to score: by default the UnscoredIndex backlog, so the cost follows
+    the number of new reviews. `scan` also finds reviews labelled by another
+    scorer version (or written without the marker); `full` returns everything.
+    """
+    if full or scan:
+        return scan_reviews(segments=segments, stats=stats, full=full)
+    return query_unscored(stats=stats)
+
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Label unscored or stale reviews of the Reviews table with a VADER sentiment.")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments (one thread each).")
+    parser.add_argument("--full", action="store_true", help="Rescore every review, not only unscored or stale ones.")
+    parser.add_argument("--scan", action="store_true",
+                        help="Find unscored and stale reviews with a filtered table scan instead of the UnscoredIndex.")
+    parser.add_argument("--workers", type=int, default=1, help="Scoring processes (VADER is CPU-bound).")
+    parser.add_argument("--batch-size", type=int, default=2048, help="Reviews scored per score_many call.")
+    parser.add_argument("--chunksize", type=int, default=256, help="Reviews per task sent to a scoring process.")
+    parser.add_argument("--no-score-cache", action="store_true", help="Keep memoized scores in memory only.")
+    parser.add_argument("--score-cache-table", default=None, help="DynamoDB table (key text_hash) used as the persistent score cache.")
+    parser.add_argument("--write-workers", type=int, default=8, help="Concurrent update_item calls.")
+    parser.add_argument("--write-rate", type=float, default=25.0, help="Initial updates per second (adapts to throttling).")
+    parser.add_argument("--max-write-rate", type=float, default=None, help="Upper bound for the adaptive write rate.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    stats = ScanStats()
+    pool = make_scoring_pool(args.workers) if args.workers > 1 else None
+    writeback = WriteBack(reviews_table, workers=args.write_workers, rate=args.write_rate, max_rate=args.max_write_rate)
+    cache = build_score_cache(args)
+    aggregates = AggregateBuffer()
+
+    count = 0
+    try:
+        for batch in iter_batches(iter_reviews(segments=args.segments, stats=stats, full=args.full, scan=args.scan), args.batch_size):
+            scores = cache.get_or_score(
+                [item.get("text", "") for item in batch],
+                lambda misses: score_many(misses, workers=args.workers, chunksize=args.chunksize, pool=pool)
+            )
+            scored_at, scored_day = scored_timestamps()
+            for item, score in zip(batch, scores):
+                label = label_from_compound(score["compound"])
+                compound = to_decimal(score["compound"])
+                writeback.submit(
+                    {"review_id": item["review_id"]},
+                    UPDATE_EXPRESSION,
+                    {":s": label, ":c": compound, ":v": SENTIMENT_VERSION, ":at": scored_at, ":day": scored_day,
+                     ":prev": previous_scored_at(item)},
+                    on_updated=aggregates.on_updated(item.get("restaurant_id"), label, compound),
+                    condition=LABEL_CONDITION
+                )
+                count += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        writeback.close()
+        cache.close()
+    aggregate_writes = aggregates.flush()
 
-    print(f"Sentiment updated for {count} reviews.")
+    print(f"Scan: {stats}")
+    print(f"Scorer version {SENTIMENT_VERSION}: {count} reviews scored, {stats.scanned - stats.returned} skipped (already up to date).")
+    print(f"Score cache: {cache.stats} (hit ratio {cache.hit_ratio():.0%})")
+    print(f"Write-back: {writeback.summary()}")
+    print(f"Restaurant aggregates: {aggregate_writes.summary()}")
+    for key, *_ in writeback.failed:
+        print(f"    [!] Not updated: {key}")
+    if writeback.stats["already_applied"]:
+        print(f"    [!] {writeback.stats['already_applied']} labels were written by an attempt whose response was lost: "
+              f"their aggregate deltas are missing, run `python -m src.aggregates --rebuild`.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from src.db import THROTTLING_ERRORS
+from src.ratelimit import AdaptiveTokenBucket
+
+class WriteBack:
+    """
+    Runs update_item calls from a bounded thread pool, paced by an
+    AdaptiveTokenBucket fed with ReturnConsumedCapacity and throttling errors.
+    Keys still failing after `max_retries` are retried once more on close()
+    and then reported in `failed`. `on_updated(old_attributes)` is called
+    after a successful update with the UPDATED_OLD values of that item.
+    Past `deadline` (a time.monotonic() value) nothing is attempted any more:
+    the remaining updates go straight to `failed`. An update submitted with a
+    `condition` that fails is counted as already applied: conditions guard
+    non-idempotent updates (ADD) against being applied twice by a retry.
+    """
+
+    def __init__(self, table, workers=8, rate=25.0, max_rate=None, max_retries=6, backoff_base=0.05, backoff_max=5.0,
+                 deadline=None):
+        self.table = table
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = AdaptiveTokenBucket(rate=rate, capacity=rate, max_rate=max_rate)
+        self.failed = []
+        self.stats = {"updated": 0, "already_applied": 0, "throttled": 0, "retries": 0, "failed": 0, "consumed_units": 0.0}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers * 4)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="writeback")
+
+    def submit(self, key, update_expression, values, names=None, on_updated=None, condition=None):
+        self._slots.acquire()
+        future = self._executor.submit(self._update, key, update_expression, values, names, on_updated, condition)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _remaining(self):
+        return float("inf") if self.deadline is None else self.deadline - time.monotonic()
+
+    def _update(self, key, update_expression, values, names, on_updated=None, condition=None, max_retries=None):
+        kwargs = {
+            "Key": key,
+            "UpdateExpression": update_expression,
+            "ExpressionAttributeValues": values,
+            "ReturnConsumedCapacity": "TOTAL"
+        }
+        if names:
+            kwargs["ExpressionAttributeNames"] = names
+        if condition:
+            kwargs["ConditionExpression"] = condition
+        if on_updated is not None:
+            kwargs["ReturnValues"] = "UPDATED_OLD"
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            if attempt:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if delay >= self._remaining():
+                    break
+                self._count("retries")
+                time.sleep(delay)
+            if self._remaining() <= 0:
+                break
+            self.limiter.acquire()
+            try:
+                response = self.table.update_item(**kwargs)
+            except ClientError as e:
+                if e.response["Error"]["Code"] in THROTTLING_ERRORS:
+                    self._count("throttled")
+                    self.limiter.record_throttle()
+                    continue
+                if condition and e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    # An earlier attempt that looked failed (timeout, connection reset) went through.
+                    self._count("already_applied")
+                    return True
+                print(f"[!] update_item failed for {key}: {e.response['Error']['Code']}")
+                break
+            except Exception as e:
+                print(f"[!] update_item failed for {key}: {e.__class__.__name__}: {e}")
+                continue
+            units = float(response.get("ConsumedCapacity", {}).get("CapacityUnits", 1.0))
+            self.limiter.record_success(units)
+            self._count("updated")
+            self._count("consumed_units", units)
+            if on_updated is not None:
+                on_updated(response.get("Attributes", {}))
+            return True
+        with self._lock:
+            self.failed.append((key, update_expression, values, names, on_updated, condition))
+        return False
+
+    def close(self, deadline=None):
+        """
+        Waits for the submitted updates, retries the failed ones until `deadline`
+        (defaults to the one given to the constructor) and returns the keys
+        still not updated.
+        """
+        if deadline is not None:
+            self.deadline = deadline
+        self._executor.shutdown(wait=True)
+        retry, self.failed = self.failed, []
+        if retry:
+            print(f"Retrying {len(retry)} failed updates...")
+        for key, update_expression, values, names, on_updated, condition in retry:
+            self._update(key, update_expression, values, names, on_updated, condition, max_retries=self.max_retries * 2)
+        self.stats["failed"] = len(self.failed)
+        return [key for key, *_ in self.failed]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def summary(self):
+        return (f"{self.stats['updated']} updated, {self.stats['throttled']} throttled, "
+                f"{self.stats['retries']} retries, {self.stats['failed']} failed, "
+                f"{self.stats['consumed_units']:.1f} WCU, final rate {self.limiter.rate:.1f}/s")
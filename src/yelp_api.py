@@ -1,33 +1,140 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+
 from src.config import YELP_API_KEY, BASE_YELP_URL
+from src.ratelimit import TokenBucket
+
+YELP_PAGE_SIZE = 50        # max `limit` accepted by /businesses/search
+YELP_MAX_RESULTS = 240     # search results reachable through `offset`
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class YelpClient:
+    def __init__(self, api_key=YELP_API_KEY, base_url=BASE_YELP_URL, rate_limiter=None,
+                 max_retries=5, backoff_base=0.5, backoff_max=30.0, timeout=10, pool_size=10,
+                 cache=None, refresh=False):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.refresh = refresh
+        self.rate_limiter = rate_limiter or TokenBucket(rate=5, capacity=5)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "application/json"
+        })
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def request(self, path, params=None):
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"[WARNING] {e.__class__.__name__} on {path}, retrying in {delay:.2f}s.")
+                time.sleep(delay)
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                print(f"[WARNING] HTTP {response.status_code} on {path}, retrying in {delay:.2f}s.")
+                time.sleep(delay)
+                continue
+            return response
+
+    def get_json(self, endpoint, path, params=None, missing=None):
+        # `refresh` skips cache reads but still stores the fresh response.
+        if self.cache is not None and not self.refresh:
+            cached = self.cache.get(endpoint, path, params)
+            if cached is not None:
+                return cached
+        response = self.request(path, params=params)
+        if missing is not None and response.status_code == 404:
+            return missing
+        response.raise_for_status()
+        data = response.json()
+        if self.cache is not None:
+            self.cache.set(endpoint, path, params, data)
+        return data
+
+    def search_businesses(self, term="restaurants", location="Paris", total=10):
+        total = min(total, YELP_MAX_RESULTS)
+        businesses = []
+        offset = 0
+        while len(businesses) < total:
+            limit = min(YELP_PAGE_SIZE, total - len(businesses))
+            params = {
+                "term": term,
+                "location": location,
+                "limit": limit,
+                "offset": offset
+            }
+            data = self.get_json("search", "/businesses/search", params=params)
+            page = data.get("businesses", [])
+            businesses.extend(page)
+            offset += len(page)
+            if len(page) < limit or offset >= data.get("total", 0):
+                break
+        return businesses[:total]
+
+    def get_reviews(self, business_id):
+        data = self.get_json("reviews", f"/businesses/{business_id}/reviews", missing=False)
+        if data is False:
+            print(f"[WARNING] 404 Not Found for ID: {business_id}. Skipping reviews.")
+            return []
+        return data.get("reviews", [])
+
+    def get_reviews_many(self, business_ids, workers=4):
+        business_ids = list(business_ids)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = executor.map(self.get_reviews, business_ids)
+            return dict(zip(business_ids, results))
+
+    def close(self):
+        self.session.close()
+
+_default_client = None
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = YelpClient()
+    return _default_client
 
 def get_restaurants_by_location(term="restaurants", location="Paris", limit=10):
-    headers = {
-        "Authorization": f"Bearer {YELP_API_KEY}"
-    }
-    params = {
-        "term": term,
-        "location": location,
-        "limit": limit
-    }
-    url = f"{BASE_YELP_URL}/businesses/search"
-    response = requests.get(url, headers=headers, params=params)
-    response.raise_for_status()
-    data = response.json()
-    return data.get("businesses", [])
+    return get_default_client().search_businesses(term=term, location=location, total=limit)
 
 def get_reviews(business_id):
-    headers = {
-        "Authorization": f"Bearer {YELP_API_KEY}"
-    }
-    url = f"{BASE_YELP_URL}/businesses/{business_id}/reviews"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 404:
-        print(f"[WARNING] 404 Not Found for ID: {business_id}. Skipping reviews.")
-        return []
-
-    response.raise_for_status()
-    
-    data = response.json()
-    return data.get("reviews", [])
+    return get_default_client().get_reviews(business_id)
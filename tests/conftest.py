@@ -0,0 +1,59 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class StubServer:
+    """
+    Local HTTP server for offline tests. `routes` maps a path to a callable
+    taking the parsed query and returning (status, headers, body); every
+    request is recorded in `requests` as (path, query).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((url.path, query))
+                route = stub.routes.get(url.path)
+                status, headers, body = route(query) if route else (404, {}, b"")
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode("utf-8")
+                    headers = dict(headers, **{"Content-Type": "application/json"})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    server.start()
+    yield server
+    server.close()
@@ -0,0 +1,62 @@
+import threading
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from src.aggregates import AggregateBuffer, aggregate_summary, sentiment_delta
+
+
+class StubAggregatesTable:
+    """update_item applying `ADD` fields and the last_batch token; the first update of a
+    restaurant in `lost_responses` goes through but its response is lost."""
+
+    def __init__(self, lost_responses=()):
+        self.items = {}
+        self.lost_responses = set(lost_responses)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ConditionExpression=None, **kwargs):
+        restaurant_id = Key["restaurant_id"]
+        values = ExpressionAttributeValues
+        with self._lock:
+            self.calls += 1
+            item = self.items.setdefault(restaurant_id, {"restaurant_id": restaurant_id})
+            if ConditionExpression and item.get("last_batch") == values[":batch"]:
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "stub"}}, "UpdateItem")
+            fields = UpdateExpression.split(" SET ")[0][len("ADD "):].split(", ")
+            for field in (f.split(" ")[0] for f in fields):
+                item[field] = item.get(field, 0) + values[f":{field}"]
+            item["last_batch"] = values[":batch"]
+            if restaurant_id in self.lost_responses:
+                self.lost_responses.discard(restaurant_id)
+                raise ConnectionError("stub: response lost")
+        return {"ConsumedCapacity": {"CapacityUnits": 1.0}}
+
+
+def test_rescore_moves_the_review_between_buckets():
+    delta = sentiment_delta({"sentiment": "POSITIVE", "sentiment_compound": Decimal("0.6")}, "NEGATIVE", -0.4)
+    assert delta["review_count"] == 0
+    assert delta["positive_count"] == -1 and delta["negative_count"] == 1
+    assert round(delta["compound_sum"], 6) == -1.0
+
+
+def test_replayed_flush_is_applied_once():
+    table = StubAggregatesTable(lost_responses={"a1b2c3"})
+    buffer = AggregateBuffer(table=table)
+    buffer.on_updated("a1b2c3", "POSITIVE", Decimal("0.5"))({})
+    buffer.on_updated("a1b2c3", "NEGATIVE", Decimal("-0.5"))({})
+    writes = buffer.flush()
+    assert table.calls == 2
+    assert writes.stats["updated"] == 0 and writes.stats["already_applied"] == 1 and writes.failed == []
+    item = table.items["a1b2c3"]
+    assert item["review_count"] == 2 and item["positive_count"] == 1 and item["negative_count"] == 1
+
+
+def test_each_flush_carries_its_own_token():
+    table = StubAggregatesTable()
+    buffer = AggregateBuffer(table=table)
+    for _ in range(2):
+        buffer.on_updated("a1b2c3", "POSITIVE", Decimal("0.5"))({})
+        assert buffer.flush().stats["updated"] == 1
+    assert aggregate_summary(table.items["a1b2c3"]) == {"review_count": 2, "mean": 0.5, "stddev": 0.0}
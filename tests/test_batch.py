@@ -0,0 +1,24 @@
+from src.batch import Checkpoint
+
+
+def test_committed_restaurants_survive_a_restart(tmp_path):
+    path = str(tmp_path / "ingest.json")
+    checkpoint = Checkpoint(path)
+    checkpoint.mark_pending("Paris", "a1")
+    checkpoint.mark_pending("Paris", "b2")
+    assert checkpoint.done_restaurants("Paris") == set()
+    assert checkpoint.commit("Paris", city_done=True)
+    resumed = Checkpoint(path)
+    assert resumed.done_restaurants("Paris") == {"a1", "b2"}
+    assert resumed.is_city_done("Paris")
+
+
+def test_restaurant_with_a_failed_write_is_redone(tmp_path):
+    path = str(tmp_path / "ingest.json")
+    checkpoint = Checkpoint(path)
+    checkpoint.mark_pending("Lyon", "a1")
+    checkpoint.mark_pending("Lyon", "b2")
+    assert not checkpoint.commit("Lyon", city_done=True, failed={"b2"})
+    resumed = Checkpoint(path)
+    assert resumed.done_restaurants("Lyon") == {"a1"}
+    assert not resumed.is_city_done("Lyon")
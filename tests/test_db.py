@@ -0,0 +1,123 @@
+import threading
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+from src.db import RESTAURANTS_TABLE_NAME, REVIEWS_TABLE_NAME, TABLE_KEYS, BatchWriter, review_item
+
+
+class StubResource:
+    """In-memory DynamoDB resource: batch_write_item, and Table(name).put_item with attribute_not_exists.
+    Keys in `unprocessed` always come back in UnprocessedItems, `batch_error` is raised by every
+    batch_write_item, and the first put_item of a key in `lost_responses` is stored but raises."""
+
+    def __init__(self, unprocessed=(), batch_error=None, lost_responses=()):
+        self.tables = {}
+        self.unprocessed = set(unprocessed)
+        self.batch_error = batch_error
+        self.lost_responses = set(lost_responses)
+        self._lock = threading.Lock()
+
+    def Table(self, name):
+        return StubTable(self, name)
+
+    def stored(self, table_name):
+        return self.tables.setdefault(table_name, {})
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        if self.batch_error:
+            raise ClientError({"Error": {"Code": self.batch_error, "Message": "stub"}}, "BatchWriteItem")
+        unprocessed = {}
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                for request in requests:
+                    item = request["PutRequest"]["Item"]
+                    key = item[TABLE_KEYS[table_name]]
+                    if key in self.unprocessed:
+                        unprocessed.setdefault(table_name, []).append(request)
+                    else:
+                        self.stored(table_name)[key] = item
+        return {"UnprocessedItems": unprocessed, "ConsumedCapacity": []}
+
+
+class StubTable:
+    def __init__(self, resource, name):
+        self.resource = resource
+        self.name = name
+
+    def put_item(self, Item, ConditionExpression=None, **kwargs):
+        key = Item[TABLE_KEYS[self.name]]
+        with self.resource._lock:
+            stored = self.resource.stored(self.name)
+            if ConditionExpression and key in stored:
+                old = {k: TypeSerializer().serialize(v) for k, v in stored[key].items()}
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "stub"}, "Item": old},
+                                  "PutItem")
+            stored[key] = Item
+            if key in self.resource.lost_responses:
+                self.resource.lost_responses.discard(key)
+                raise ConnectionError("stub: response lost")
+        return {"ConsumedCapacity": {"TableName": self.name, "CapacityUnits": 1.0}}
+
+
+def new_review(review_id="r-1", text="Great food", restaurant_id="a1b2c3"):
+    return review_item(review_id, restaurant_id, text, Decimal("5"), "2025-03-01")
+
+
+def writer_for(resource):
+    return BatchWriter(resource=resource, max_retries=2, backoff_base=0)
+
+
+def test_second_put_of_an_existing_review_keeps_its_sentiment():
+    resource = StubResource()
+    scored = dict(new_review(), sentiment="POSITIVE", sentiment_compound=Decimal("0.8"))
+    del scored["unscored"]
+    resource.stored(REVIEWS_TABLE_NAME)["r-1"] = scored
+    with BatchWriter(resource=resource) as writer:
+        writer.put(REVIEWS_TABLE_NAME, new_review(), if_absent=True)
+        writer.put(REVIEWS_TABLE_NAME, new_review("r-2"), if_absent=True)
+    reviews = resource.stored(REVIEWS_TABLE_NAME)
+    assert reviews["r-1"] == scored
+    assert "unscored" in reviews["r-2"]
+    assert [item["review_id"] for _, item in writer.existing] == ["r-1"]
+    assert writer.stats["items"] == 1 and writer.stats["existing"] == 1 and writer.failed == []
+
+
+def test_unprocessed_items_are_failed_with_their_own_item():
+    resource = StubResource(unprocessed={"r-2"})
+    with writer_for(resource) as writer:
+        writer.put_restaurant("a1b2c3", "Le Sushi Bar", "Paris", Decimal("4.5"), "le-sushi-bar-paris")
+        for review_id in ("r-1", "r-2", "r-3"):
+            writer.put(REVIEWS_TABLE_NAME, new_review(review_id))
+    assert [(table_name, item["review_id"]) for table_name, item in writer.failed] == [(REVIEWS_TABLE_NAME, "r-2")]
+    assert writer.stats["items"] == 3 and writer.stats["failed"] == 1
+    assert sorted(resource.stored(REVIEWS_TABLE_NAME)) == ["r-1", "r-3"]
+
+
+def test_failed_batch_does_not_fail_the_conditional_puts():
+    resource = StubResource(batch_error="ValidationException")
+    with writer_for(resource) as writer:
+        writer.put_restaurant("a1b2c3", "Le Sushi Bar", "Paris", Decimal("4.5"), "le-sushi-bar-paris")
+        writer.put(REVIEWS_TABLE_NAME, new_review("r-1"), if_absent=True)
+    assert [(table_name, item["restaurant_id"]) for table_name, item in writer.failed] == [(RESTAURANTS_TABLE_NAME, "a1b2c3")]
+    assert list(resource.stored(REVIEWS_TABLE_NAME)) == ["r-1"]
+
+
+def test_failed_items_are_attributed_per_batch():
+    resource = StubResource(unprocessed={"r-2"})
+    writer = writer_for(resource)
+    writer.put(REVIEWS_TABLE_NAME, new_review("r-1", restaurant_id="a1"))
+    writer.flush()
+    assert writer.failed == []
+    writer.put(REVIEWS_TABLE_NAME, new_review("r-2", restaurant_id="b2"))
+    writer.close()
+    assert {item["restaurant_id"] for _, item in writer.failed} == {"b2"}
+
+
+def test_own_put_behind_a_lost_response_is_not_reported_existing():
+    resource = StubResource(lost_responses={"r-1"})
+    with writer_for(resource) as writer:
+        writer.put(REVIEWS_TABLE_NAME, new_review(), if_absent=True)
+    assert writer.existing == [] and writer.failed == []
+    assert writer.stats["items"] == 1 and writer.stats["retries"] == 1
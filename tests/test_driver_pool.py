@@ -0,0 +1,76 @@
+import pytest
+
+from src.driver_pool import DriverPool
+
+
+class StubDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise ConnectionRefusedError("chromedriver is gone")
+        return 1
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class StubFactory:
+    """Builds StubDrivers; the next `failures` calls raise like a Chrome that cannot start."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.drivers = []
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("chrome failed to start")
+        driver = StubDriver()
+        self.drivers.append(driver)
+        return driver
+
+
+def test_failed_driver_creation_gives_the_slot_back():
+    factory = StubFactory(failures=1)
+    pool = DriverPool(size=1, driver_factory=factory)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    # With a single slot, a lost slot would block forever here.
+    with pool.driver() as driver:
+        assert driver is factory.drivers[0]
+
+
+def test_dead_driver_is_replaced_on_acquire():
+    factory = StubFactory()
+    pool = DriverPool(size=1, driver_factory=factory)
+    with pool.driver() as driver:
+        pass
+    driver.alive = False
+    with pool.driver() as replacement:
+        assert replacement is not driver
+    assert pool.stats["replaced"] == 1 and driver.quit_calls == 1
+
+
+def test_driver_crashing_during_a_page_is_replaced():
+    factory = StubFactory()
+    pool = DriverPool(size=1, driver_factory=factory)
+    with pytest.raises(ValueError):
+        with pool.driver() as driver:
+            driver.alive = False
+            raise ValueError("page failed")
+    with pool.driver() as replacement:
+        assert replacement is not driver
+    assert pool.stats["replaced"] == 1
+
+
+def test_driver_is_recycled_after_max_pages():
+    factory = StubFactory()
+    with DriverPool(size=1, max_pages=2, driver_factory=factory) as pool:
+        for _ in range(3):
+            with pool.driver():
+                pass
+    assert len(factory.drivers) == 2
+    assert pool.stats["recycled"] == 1 and pool.stats["closed"] == 1
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from src import main
+from src.http_scraper import fetch_reviews_http, parse_reviews_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+
+
+def fixture_html(name):
+    with open(os.path.join(FIXTURES, f"{name}.html"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def yelp_pages(stub_server):
+    for name in ("le-sushi-bar-paris", "js-rendered-bistro-paris"):
+        stub_server.routes[f"/biz/{name}"] = lambda query, body=fixture_html(name): (200, {}, body)
+    stub_server.routes["/biz/empty-paris"] = lambda query: (200, {}, b"")
+    return stub_server
+
+
+def test_fetch_parses_reviews(yelp_pages):
+    timings = {}
+    reviews = fetch_reviews_http("le-sushi-bar-paris", base_url=yelp_pages.url, timings=timings)
+    assert reviews == parse_reviews_html(fixture_html("le-sushi-bar-paris"))
+    assert len(reviews) == 5
+    assert set(timings) == {"fetch", "parse"}
+
+
+def test_rating_and_date_stay_with_their_review():
+    # The page header carries the business rating, and the third review has no date.
+    reviews = parse_reviews_html(fixture_html("le-sushi-bar-paris"))
+    assert [(str(r["rating"]), r["time_created"]) for r in reviews] == [
+        ("5", "Jan 12, 2025"), ("4", "Dec 28, 2024"), ("4", ""), ("2", "Nov 3, 2024"), ("5", "Oct 19, 2024")
+    ]
+    assert reviews[2]["text"] == "Lovely staff, we will be back."
+
+
+def test_fetch_returns_none_without_review_selectors(yelp_pages):
+    assert fetch_reviews_http("js-rendered-bistro-paris", base_url=yelp_pages.url) is None
+    assert fetch_reviews_http("empty-paris", base_url=yelp_pages.url) is None
+
+
+def test_fetch_returns_none_on_http_error(yelp_pages):
+    assert fetch_reviews_http("unknown-paris", base_url=yelp_pages.url) is None
+
+
+@pytest.fixture
+def local_scrape_alias(yelp_pages, monkeypatch):
+    # Points the HTTP path at the stub server and records Selenium fallbacks.
+    fallbacks = []
+
+    def fetch(alias, **kwargs):
+        return fetch_reviews_http(alias, base_url=yelp_pages.url, **kwargs)
+
+    def selenium(pool, alias, **kwargs):
+        fallbacks.append(alias)
+        return {"reviews": [{"text": "from chrome"}], "timings": {}, "path": "selenium"}
+
+    monkeypatch.setattr(main, "fetch_reviews_http", fetch)
+    monkeypatch.setattr(main, "scrape_with_pool", selenium)
+    return fallbacks
+
+
+def test_auto_mode_uses_http_when_selectors_are_present(local_scrape_alias):
+    result = main.scrape_alias(None, "le-sushi-bar-paris", mode="auto")
+    assert result["path"] == "http"
+    assert len(result["reviews"]) == 5
+    assert local_scrape_alias == []
+
+
+@pytest.mark.parametrize("alias", ["js-rendered-bistro-paris", "empty-paris"])
+def test_auto_mode_falls_back_to_selenium(local_scrape_alias, alias):
+    result = main.scrape_alias(None, alias, mode="auto")
+    assert result["path"] == "selenium"
+    assert result["reviews"] == [{"text": "from chrome"}]
+    assert local_scrape_alias == [alias]
+
+
+def test_http_mode_never_falls_back(local_scrape_alias):
+    result = main.scrape_alias(None, "js-rendered-bistro-paris", mode="http")
+    assert result == {"reviews": [], "timings": result["timings"], "path": "http"}
+    assert local_scrape_alias == []
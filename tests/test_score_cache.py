@@ -0,0 +1,40 @@
+from src.score_cache import ScoreCache, SqliteScoreStore
+
+VERSION = "vader-3.3.2-t0.05"
+
+
+class CountingScorer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [{"compound": float(len(text))} for text in texts]
+
+
+def test_distinct_texts_are_scored_once():
+    cache, scorer = ScoreCache(VERSION), CountingScorer()
+    scores = cache.get_or_score(["Great  food", "Great food", "Bad"], scorer)
+    assert scorer.calls == [["Great food", "Bad"]]
+    assert scores[0] == scores[1]
+    assert cache.get_or_score(["Bad"], scorer) == [scores[2]]
+    assert len(scorer.calls) == 1 and cache.stats["memory_hits"] == 1
+
+
+def test_store_tier_is_read_after_an_eviction(tmp_path):
+    store = SqliteScoreStore(str(tmp_path / "scores.sqlite"))
+    cache, scorer = ScoreCache(VERSION, max_entries=1, store=store), CountingScorer()
+    cache.get_or_score(["first", "second"], scorer)
+    assert cache.stats["evictions"] == 1
+    cache.get_or_score(["first"], scorer)
+    assert len(scorer.calls) == 1 and cache.stats["store_hits"] == 1
+
+
+def test_scores_of_another_version_are_dropped(tmp_path):
+    path = str(tmp_path / "scores.sqlite")
+    scorer = CountingScorer()
+    ScoreCache("old-version", store=SqliteScoreStore(path)).get_or_score(["Great food"], scorer)
+    cache = ScoreCache(VERSION, store=SqliteScoreStore(path))
+    assert cache.stats["invalidated"] == 1
+    cache.get_or_score(["Great food"], scorer)
+    assert len(scorer.calls) == 2
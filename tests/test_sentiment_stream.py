@@ -0,0 +1,173 @@
+import importlib.util
+import json
+import os
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+LAMBDA_SRC = os.path.join(os.path.dirname(__file__), os.pardir,
+                          "amplify", "backend", "function", "SentimentIntensityAnalyzed", "src")
+CURRENT_VERSION = "vader-3.3.2-t0.05"  # the version the fixture labels are current for
+
+
+def load_lambda():
+    spec = importlib.util.spec_from_file_location("sentiment_lambda", os.path.join(LAMBDA_SRC, "index.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def lambda_module():
+    return load_lambda()
+
+
+class StubTable:
+    """update_item recorder; keys listed in `failing` get a non-retryable ClientError and
+    conditional updates of keys listed in `applied` fail their condition check."""
+
+    def __init__(self, failing=(), old_attributes=None, applied=()):
+        self.failing = set(failing)
+        self.applied = set(applied)
+        self.old_attributes = old_attributes or {}
+        self.updates = []
+        self._lock = threading.Lock()
+
+    def update_item(self, **kwargs):
+        key = next(iter(kwargs["Key"].values()))
+        if key in self.failing:
+            raise ClientError({"Error": {"Code": "ValidationException", "Message": "stub"}}, "UpdateItem")
+        if key in self.applied and "ConditionExpression" in kwargs:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "stub"}}, "UpdateItem")
+        with self._lock:
+            self.updates.append(kwargs)
+        return {"ConsumedCapacity": {"CapacityUnits": 1.0}, "Attributes": self.old_attributes.get(key, {})}
+
+    def updated_keys(self):
+        return sorted(next(iter(update["Key"].values())) for update in self.updates)
+
+
+@pytest.fixture
+def stream(lambda_module, monkeypatch):
+    # Runs stream_handler on the fixture against stub tables.
+    monkeypatch.setattr(lambda_module, "SENTIMENT_VERSION", CURRENT_VERSION)
+    monkeypatch.setattr(lambda_module, "SCORE_CACHE_TABLE", "")
+
+    def run(failing=(), old_attributes=None, event=None, applied=(), aggregates_failing=(), aggregates_applied=()):
+        reviews = StubTable(failing=failing, old_attributes=old_attributes, applied=applied)
+        aggregates = StubTable(failing=aggregates_failing, applied=aggregates_applied)
+        monkeypatch.setattr(lambda_module, "reviews_table", reviews)
+        monkeypatch.setattr(lambda_module, "aggregates_table", aggregates)
+        if event is None:
+            with open(os.path.join(LAMBDA_SRC, "stream_event.json")) as f:
+                event = json.load(f)
+        return lambda_module.stream_handler(event, None), reviews, aggregates
+
+    return run
+
+
+def test_scores_only_new_changed_or_stale_reviews(stream):
+    response, reviews, _ = stream()
+    assert response == {"batchItemFailures": []}
+    # r-002 (current label, INSERT), r-003 (text unchanged) and r-006 (REMOVE) are skipped.
+    assert reviews.updated_keys() == ["r-001", "r-004", "r-005"]
+
+
+def test_label_update_carries_the_current_version(stream):
+    _, reviews, _ = stream()
+    by_key = {update["Key"]["review_id"]: update for update in reviews.updates}
+    values = by_key["r-004"]["ExpressionAttributeValues"]
+    assert values[":v"] == CURRENT_VERSION
+    assert values[":s"] == "NEGATIVE"
+    assert values[":day"] == values[":at"][:10]
+    assert "REMOVE unscored" in by_key["r-004"]["UpdateExpression"]
+
+
+def test_label_update_is_conditional_on_its_scored_at(stream):
+    _, reviews, _ = stream()
+    update = reviews.updates[0]
+    assert "scored_at <> :at" in update["ConditionExpression"]
+
+
+def test_replayed_label_update_is_not_counted_again(stream):
+    # The first attempt went through: the replay is skipped instead of reading its own label back.
+    response, reviews, aggregates = stream(applied={"r-004"})
+    assert response == {"batchItemFailures": []}
+    assert reviews.updated_keys() == ["r-001", "r-005"]
+    assert aggregates.updates[0]["ExpressionAttributeValues"][":review_count"] == 2
+
+
+def test_review_modified_twice_is_scored_on_its_last_image(stream):
+    def record(sequence_number, text):
+        return {"eventName": "MODIFY", "dynamodb": {
+            "SequenceNumber": sequence_number,
+            "OldImage": {"review_id": {"S": "r-8"}, "text": {"S": "Old."}},
+            "NewImage": {"review_id": {"S": "r-8"}, "restaurant_id": {"S": "a1b2c3"}, "text": {"S": text}}
+        }}
+    event = {"Records": [record("1", "Wonderful, loved it."), record("2", "Terrible, never again.")]}
+    response, reviews, _ = stream(event=event)
+    assert response == {"batchItemFailures": []}
+    assert len(reviews.updates) == 1
+    assert reviews.updates[0]["ExpressionAttributeValues"][":s"] == "NEGATIVE"
+    response, _, _ = stream(event=event, failing={"r-8"})
+    assert response == {"batchItemFailures": [{"itemIdentifier": "1"}, {"itemIdentifier": "2"}]}
+
+
+def test_own_label_updates_do_not_loop(stream, lambda_module):
+    # The MODIFY produced by our own update (label only, same text) is skipped.
+    record = {
+        "eventName": "MODIFY",
+        "dynamodb": {
+            "SequenceNumber": "9",
+            "OldImage": {"review_id": {"S": "r-9"}, "text": {"S": "Nice."}},
+            "NewImage": {"review_id": {"S": "r-9"}, "text": {"S": "Nice."}, "sentiment": {"S": "POSITIVE"},
+                         "sentiment_version": {"S": CURRENT_VERSION}}
+        }
+    }
+    response, reviews, aggregates = stream(event={"Records": [record]})
+    assert response == {"batchItemFailures": []}
+    assert reviews.updates == [] and aggregates.updates == []
+
+
+def test_failed_write_is_reported_by_sequence_number(stream):
+    response, reviews, _ = stream(failing={"r-004"})
+    assert response == {"batchItemFailures": [{"itemIdentifier": "111100000000000000000004"}]}
+    assert reviews.updated_keys() == ["r-001", "r-005"]
+
+
+def test_unreadable_record_is_reported(stream):
+    record = {"eventName": "INSERT", "dynamodb": {"SequenceNumber": "7", "NewImage": {"review_id": {"?": "r-7"}}}}
+    response, reviews, _ = stream(event={"Records": [record]})
+    assert response == {"batchItemFailures": [{"itemIdentifier": "7"}]}
+    assert reviews.updates == []
+
+
+def test_aggregates_replace_the_old_contribution(stream):
+    old = {"r-004": {"sentiment": "POSITIVE", "sentiment_compound": 0.4}}
+    _, _, aggregates = stream(old_attributes=old)
+    assert len(aggregates.updates) == 1
+    values = aggregates.updates[0]["ExpressionAttributeValues"]
+    # Three reviews scored, one of them already counted as POSITIVE.
+    assert values[":review_count"] == 2
+    assert values[":negative_count"] == 1
+
+
+def test_aggregate_update_is_conditional_on_the_batch_token(stream):
+    _, _, aggregates = stream()
+    update = aggregates.updates[0]
+    assert "last_batch = :batch" in update["UpdateExpression"]
+    assert ":batch" in update["ConditionExpression"]
+
+
+def test_already_applied_aggregate_is_not_a_failure(stream):
+    response, _, aggregates = stream(aggregates_applied={"a1b2c3"})
+    assert response == {"batchItemFailures": []}
+    assert aggregates.updates == []
+
+
+def test_failed_aggregate_is_logged_not_replayed(stream, capsys):
+    response, reviews, _ = stream(aggregates_failing={"a1b2c3"})
+    assert reviews.updated_keys() == ["r-001", "r-004", "r-005"]
+    assert response == {"batchItemFailures": []}
+    assert "AGGREGATE_DRIFT restaurants=1" in capsys.readouterr().out
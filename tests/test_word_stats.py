@@ -0,0 +1,113 @@
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from src.word_stats import LocalPartialStore, WordPartial, update_partials, utc_timestamp
+
+VERSION = "vader-3.3.2-t0.05"
+START = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class StubReviews:
+    """Reviews table with the scorer's update semantics and the loader update_partials expects."""
+
+    def __init__(self):
+        self.items = {}
+
+    def score(self, review_id, text, sentiment, moment, version=VERSION):
+        item = self.items.setdefault(review_id, {"review_id": review_id})
+        # previous_scored_at = if_not_exists(scored_at, :prev)
+        item["previous_scored_at"] = item.get("scored_at") or ("unknown" if item.get("sentiment") else "")
+        item.update(text=text, sentiment=sentiment, sentiment_version=version, scored_at=utc_timestamp(moment))
+
+    def label_legacy(self, review_id, text, sentiment):
+        # Labelled before scored_at existed.
+        self.items[review_id] = {"review_id": review_id, "text": text, "sentiment": sentiment, "sentiment_version": VERSION}
+
+    def load(self, since, until, version=None, segment=None):
+        for item in self.items.values():
+            scored_at = item.get("scored_at")
+            if version is not None and item["sentiment_version"] != version:
+                continue
+            if since is None:
+                if scored_at and scored_at > until:
+                    continue
+                if segment and zlib.crc32(item["review_id"].encode()) % segment[1] != segment[0]:
+                    continue
+            elif not scored_at or not since < scored_at <= until:
+                continue
+            yield dict(item)
+
+    def expected(self):
+        return WordPartial().add_items(list(self.items.values()))
+
+
+def run(store, reviews, moment, **kwargs):
+    return update_partials(store, reviews.load, now=moment, lag_seconds=0, **kwargs)
+
+
+def assert_matches(total, reviews):
+    expected = reviews.expected()
+    assert total.reviews == expected.reviews
+    assert total.labels == expected.labels
+    assert dict(zip(total.vocabulary, total.freq.tolist())) == \
+        {w: n for w, n in zip(expected.vocabulary, expected.freq.tolist()) if n}
+
+
+def test_incremental_runs_add_new_reviews(tmp_path):
+    store, reviews = LocalPartialStore(str(tmp_path)), StubReviews()
+    reviews.score("r1", "great pasta", "POSITIVE", START)
+    _, report = run(store, reviews, START + timedelta(minutes=1))
+    assert report["rebuilt"]
+    reviews.score("r2", "cold pasta", "NEGATIVE", START + timedelta(days=1))
+    total, report = run(store, reviews, START + timedelta(days=1, minutes=1))
+    assert report["new_reviews"] == 1 and not report["recounted_days"]
+    assert_matches(total, reviews)
+
+
+def test_rescored_review_is_counted_once(tmp_path):
+    store, reviews = LocalPartialStore(str(tmp_path)), StubReviews()
+    reviews.score("r1", "great pasta", "POSITIVE", START)
+    reviews.score("r2", "slow service", "NEGATIVE", START)
+    run(store, reviews, START + timedelta(minutes=1))
+    reviews.score("r1", "great pasta, rude waiter", "NEUTRAL", START + timedelta(days=1))
+    total, report = run(store, reviews, START + timedelta(days=1, minutes=1))
+    assert report["recounted_days"] == ["2025-03-01"] and not report["rebuilt"]
+    assert_matches(total, reviews)
+
+
+def test_review_rescored_twice_between_runs_triggers_a_rebuild(tmp_path):
+    store, reviews = LocalPartialStore(str(tmp_path)), StubReviews()
+    reviews.score("r1", "great pasta", "POSITIVE", START)
+    run(store, reviews, START + timedelta(minutes=1))
+    reviews.score("r1", "great pasta", "POSITIVE", START + timedelta(hours=1))
+    reviews.score("r1", "awful pasta", "NEGATIVE", START + timedelta(hours=2))
+    total, report = run(store, reviews, START + timedelta(hours=3))
+    assert report["rebuilt"]
+    assert_matches(total, reviews)
+
+
+def test_rescored_legacy_review_triggers_a_rebuild(tmp_path):
+    store, reviews = LocalPartialStore(str(tmp_path)), StubReviews()
+    reviews.label_legacy("r1", "great pasta", "POSITIVE")
+    run(store, reviews, START)
+    reviews.score("r1", "great pasta", "POSITIVE", START + timedelta(hours=1))
+    total, report = run(store, reviews, START + timedelta(hours=2))
+    assert report["rebuilt"]
+    assert_matches(total, reviews)
+
+
+def test_rebuild_resumes_across_runs(tmp_path):
+    store, reviews = LocalPartialStore(str(tmp_path)), StubReviews()
+    for i in range(20):
+        reviews.score(f"r{i}", f"dish {i} was fine", "POSITIVE" if i % 2 else "NEUTRAL", START + timedelta(hours=i))
+    # A deadline already reached: each run folds a single segment.
+    progress = []
+    for _ in range(4):
+        total, report = run(store, reviews, START + timedelta(days=2), deadline=time.monotonic() - 1, rebuild_segments=4)
+        progress.append(report["rebuild_progress"])
+    assert progress == ["1/4", "2/4", "3/4", None]
+    assert report["rebuilt"] and store.get("rebuild.json") is None
+    assert_matches(total, reviews)
+    # Runs during the rebuild returned no total: there was no previous one.
+    assert run(store, reviews, START + timedelta(days=2, minutes=1))[1]["new_reviews"] == 0
@@ -0,0 +1,65 @@
+import time
+
+from botocore.exceptions import ClientError
+
+from src.writeback import WriteBack
+
+
+class StubTable:
+    """update_item raising the queued `errors` first, then returning `old_attributes`."""
+
+    def __init__(self, errors=(), old_attributes=None):
+        self.errors = list(errors)
+        self.old_attributes = old_attributes or {}
+        self.calls = []
+
+    def update_item(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"ConsumedCapacity": {"CapacityUnits": 1.0}, "Attributes": self.old_attributes}
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": "stub"}}, "UpdateItem")
+
+
+def writeback(table, **kwargs):
+    return WriteBack(table, workers=2, rate=1000.0, backoff_base=0, **kwargs)
+
+
+def test_throttled_update_is_retried_and_reports_its_old_values():
+    table = StubTable(errors=[client_error("ProvisionedThroughputExceededException")], old_attributes={"sentiment": "NEUTRAL"})
+    seen = []
+    with writeback(table) as wb:
+        wb.submit({"review_id": "r-1"}, "SET sentiment = :s", {":s": "POSITIVE"}, on_updated=seen.append)
+    assert seen == [{"sentiment": "NEUTRAL"}]
+    assert wb.stats["throttled"] == 1 and wb.stats["updated"] == 1 and wb.failed == []
+    assert table.calls[0]["ReturnValues"] == "UPDATED_OLD"
+
+
+def test_failed_condition_counts_as_already_applied():
+    table = StubTable(errors=[ConnectionError("reset"), client_error("ConditionalCheckFailedException")])
+    seen = []
+    with writeback(table) as wb:
+        wb.submit({"review_id": "r-1"}, "SET scored_at = :at", {":at": "2025-03-01T12:00:00Z"}, on_updated=seen.append,
+                  condition="attribute_not_exists(scored_at) OR scored_at <> :at")
+    assert wb.stats["already_applied"] == 1 and wb.stats["updated"] == 0 and wb.failed == []
+    assert seen == []
+    assert "ConditionExpression" in table.calls[1]
+
+
+def test_unconditional_check_failure_is_a_failure():
+    table = StubTable(errors=[client_error("ConditionalCheckFailedException")] * 3)
+    with writeback(table) as wb:
+        wb.submit({"review_id": "r-1"}, "SET sentiment = :s", {":s": "POSITIVE"})
+    assert [key for key, *_ in wb.failed] == [{"review_id": "r-1"}]
+    assert wb.stats["failed"] == 1 and wb.stats["already_applied"] == 0
+
+
+def test_nothing_is_attempted_past_the_deadline():
+    table = StubTable()
+    wb = writeback(table, deadline=time.monotonic() - 1)
+    wb.submit({"review_id": "r-1"}, "SET sentiment = :s", {":s": "POSITIVE"})
+    assert wb.close() == [{"review_id": "r-1"}]
+    assert table.calls == []
@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from src.ratelimit import TokenBucket
+from src.yelp_api import YelpClient, parse_retry_after
+
+BUSINESSES = [{"id": f"biz-{i}", "alias": f"biz-{i}-paris"} for i in range(120)]
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault("rate_limiter", TokenBucket(rate=1000))
+    kwargs.setdefault("backoff_base", 0.01)
+    return YelpClient(api_key="test-key", base_url=server.url, **kwargs)
+
+
+def search_route(query):
+    offset, limit = int(query["offset"]), int(query["limit"])
+    return 200, {}, {"businesses": BUSINESSES[offset:offset + limit], "total": len(BUSINESSES)}
+
+
+def test_search_paginates_with_offset(stub_server):
+    stub_server.routes["/businesses/search"] = search_route
+    businesses = make_client(stub_server).search_businesses(location="Paris", total=110)
+    assert [b["id"] for b in businesses] == [b["id"] for b in BUSINESSES[:110]]
+    offsets = [(q["offset"], q["limit"]) for _, q in stub_server.requests]
+    assert offsets == [("0", "50"), ("50", "50"), ("100", "10")]
+
+
+def test_search_stops_at_the_last_page(stub_server):
+    stub_server.routes["/businesses/search"] = search_route
+    businesses = make_client(stub_server).search_businesses(location="Paris", total=200)
+    assert len(businesses) == len(BUSINESSES)
+    assert len(stub_server.requests) == 3
+
+
+def test_retries_429_and_honors_retry_after(stub_server):
+    calls = []
+
+    def throttled(query):
+        calls.append(query)
+        if len(calls) < 3:
+            return 429, {"Retry-After": "0"}, {"error": "too many requests"}
+        return 200, {}, {"reviews": [{"text": "ok"}]}
+
+    stub_server.routes["/businesses/biz-1/reviews"] = throttled
+    assert make_client(stub_server).get_reviews("biz-1") == [{"text": "ok"}]
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.routes["/businesses/biz-1/reviews"] = lambda query: (503, {"Retry-After": "0"}, b"")
+    with pytest.raises(requests.HTTPError):
+        make_client(stub_server, max_retries=2).get_reviews("biz-1")
+    assert len(stub_server.requests) == 3
+
+
+def test_missing_business_has_no_reviews(stub_server):
+    assert make_client(stub_server).get_reviews("unknown") == []
+
+
+def test_get_reviews_many_fans_out(stub_server):
+    for b in BUSINESSES[:8]:
+        stub_server.routes[f"/businesses/{b['id']}/reviews"] = (
+            lambda query, biz=b["id"]: (200, {}, {"reviews": [{"text": biz}]})
+        )
+    ids = [b["id"] for b in BUSINESSES[:8]]
+    reviews = make_client(stub_server).get_reviews_many(ids, workers=4)
+    assert list(reviews) == ids
+    assert all(reviews[biz] == [{"text": biz}] for biz in ids)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None